@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""Availability of modalities by subject and session."""
+
+import logging
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+from .index import IndexRecord
+from .query import get_relative_path_datatype
+
+LOGGER = logging.getLogger(__name__)
+
+
+# Entity keys used to group files.
+SUBJECT_KEY = "sub"
+SESSION_KEY = "ses"
+TRACER_KEY = "trc"
+
+# Default extensions of the files counted as available images.
+IMAGE_EXTENSIONS = (".nii", ".nii.gz")
+
+
+class ModalityKey(NamedTuple):
+    """
+    A kind of file in a session. In queries, None matches any value. This is
+    distinct from the models.enum.Modality enum of modality names.
+
+    Attributes:
+        datatype:
+            The datatype, e.g. "anat" or "pet".
+
+        suffix:
+            The suffix, e.g. "T1w" or "pet".
+
+        tracer:
+            The value of the trc entity, e.g. "18FAV45", or None.
+    """
+
+    datatype: Optional[str]
+    suffix: Optional[str]
+    tracer: Optional[str] = None
+
+
+# A modality in a query: a ModalityKey instance with None as a wildcard, or a
+# suffix that matches all datatypes and tracers.
+ModalityArg = Union[ModalityKey, Tuple, str]
+
+# A session of a subject. The session is None for subjects without sessions.
+Visit = Tuple[str, Optional[str]]
+
+
+class AvailabilityMatrix:
+    """
+    Table of the modalities available in each session of each subject,
+    stored as one bitmask over the sessions per modality so that cohort
+    filters are computed with integer operations instead of traversals.
+    """
+
+    def __init__(self, records: Iterable[IndexRecord], extensions=IMAGE_EXTENSIONS):
+        """
+        Args:
+            records:
+                The records of the paths of a dataset, e.g. from
+                BIDSDataset.iter_inventory_records(). Directories and files
+                without a subject are ignored.
+
+            extensions:
+                The extensions of the files to count, or None to count all
+                files.
+        """
+        if extensions is not None:
+            extensions = frozenset(extensions)
+        visit_modalities: Dict[Visit, set] = {}
+        for record in records:
+            if record.is_dir:
+                continue
+            if extensions is not None and record.extension not in extensions:
+                continue
+            entities = dict(record.entities)
+            sub = entities.get(SUBJECT_KEY)
+            if sub is None:
+                continue
+            datatype = get_relative_path_datatype(record.path)
+            modality = ModalityKey(datatype, record.suffix, entities.get(TRACER_KEY))
+            visit = (str(sub), entities.get(SESSION_KEY))
+            visit_modalities.setdefault(visit, set()).add(modality)
+
+        self.visits: List[Visit] = sorted(
+            visit_modalities, key=lambda visit: (visit[0], visit[1] or "")
+        )
+        self.modalities: List[ModalityKey] = sorted(
+            set().union(*visit_modalities.values()),
+            key=lambda modality: tuple(value or "" for value in modality),
+        )
+        self.subjects: List[str] = sorted({sub for sub, _ses in self.visits})
+        self._visit_ids = {visit: i for i, visit in enumerate(self.visits)}
+        self._masks: Dict[ModalityKey, int] = dict.fromkeys(self.modalities, 0)
+        self._subject_masks: Dict[str, int] = dict.fromkeys(self.subjects, 0)
+        for i, visit in enumerate(self.visits):
+            bit = 1 << i
+            self._subject_masks[visit[0]] |= bit
+            for modality in visit_modalities[visit]:
+                self._masks[modality] |= bit
+        LOGGER.debug(
+            "Found %d modalities in %d sessions of %d subjects.",
+            len(self.modalities),
+            len(self.visits),
+            len(self.subjects),
+        )
+
+    def __repr__(self):
+        return (
+            f"{self.__class__.__qualname__}({len(self.subjects)} subjects, "
+            f"{len(self.visits)} sessions, {len(self.modalities)} modalities)"
+        )
+
+    def get_mask(self, modality: ModalityArg) -> int:
+        """
+        Get the bitmask of the sessions in which a modality is available.
+
+        Args:
+            modality:
+                A ModalityKey instance or tuple, in which None matches any value,
+                or a suffix that matches all datatypes and tracers.
+
+        Returns:
+            The bitmask, in which bit i is set for the session visits[i].
+        """
+        if isinstance(modality, str):
+            pattern = ModalityKey(None, modality, None)
+        else:
+            pattern = ModalityKey(*modality)
+        mask = self._masks.get(pattern)
+        if mask is not None and None not in pattern:
+            return mask
+        mask = 0
+        for candidate, candidate_mask in self._masks.items():
+            if all(
+                value is None or value == other
+                for value, other in zip(pattern, candidate)
+            ):
+                mask |= candidate_mask
+        return mask
+
+    def get_visits(self, mask: int) -> List[Visit]:
+        """
+        Get the sessions of a bitmask.
+
+        Returns:
+            The list of (subject, session) tuples, sorted by subject and
+            session.
+        """
+        return [visit for i, visit in enumerate(self.visits) if mask >> i & 1]
+
+    def get_complete_mask(self, modalities: Sequence[ModalityArg]) -> int:
+        """
+        Get the bitmask of the sessions in which all of the given modalities
+        are available.
+        """
+        mask = (1 << len(self.visits)) - 1
+        for modality in modalities:
+            mask &= self.get_mask(modality)
+        return mask
+
+    def is_available(self, sub: str, ses: Optional[str], modality: ModalityArg) -> bool:
+        """
+        Check if a modality is available in a session.
+        """
+        i = self._visit_ids.get((sub, ses))
+        if i is None:
+            return False
+        return bool(self.get_mask(modality) >> i & 1)
+
+    def select_sessions(self, *modalities: ModalityArg) -> List[Visit]:
+        """
+        Get the sessions in which all of the given modalities are available,
+        e.g. select_sessions("T1w", ("pet", "pet", "18FAV45")).
+
+        Returns:
+            The list of (subject, session) tuples.
+        """
+        return self.get_visits(self.get_complete_mask(modalities))
+
+    def select_subjects(
+        self, *modalities: ModalityArg, min_sessions: int = 1
+    ) -> Dict[str, List[Optional[str]]]:
+        """
+        Get the subjects with at least a given number of sessions in which all
+        of the given modalities are available.
+
+        Args:
+            *modalities:
+                The modalities. See get_mask().
+
+            min_sessions:
+                The minimum number of complete sessions.
+
+        Returns:
+            A dict mapping the selected subjects to the sorted list of their
+            complete sessions, i.e. their timepoints.
+        """
+        mask = self.get_complete_mask(modalities)
+        selected = {}
+        for sub in self.subjects:
+            subject_mask = mask & self._subject_masks[sub]
+            if subject_mask.bit_count() >= min_sessions:
+                selected[sub] = [ses for _sub, ses in self.get_visits(subject_mask)]
+        return selected
+
+    def to_rows(self) -> List[Dict]:
+        """
+        Get the table as rows, e.g. to build a data frame.
+
+        Returns:
+            A list of dicts, one per session, mapping "sub" and "ses" to the
+            labels and each modality to a boolean.
+        """
+        rows = []
+        for i, (sub, ses) in enumerate(self.visits):
+            row = {SUBJECT_KEY: sub, SESSION_KEY: ses}
+            for modality, mask in self._masks.items():
+                row[modality] = bool(mask >> i & 1)
+            rows.append(row)
+        return rows
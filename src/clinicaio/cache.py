@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""In-process cache of the data loaded from files."""
+
+import collections
+import logging
+import sys
+import threading
+from typing import Any, Callable, Hashable, NamedTuple, Optional
+
+from .path import PathArg, get_path
+
+LOGGER = logging.getLogger(__name__)
+
+
+# Default maximum size of the shared cache in bytes.
+DEFAULT_MAX_BYTES = 256 << 20
+
+
+class CacheStats(NamedTuple):
+    """
+    Statistics of a cache.
+
+    Attributes:
+        hits:
+            The number of lookups that found a valid value.
+
+        misses:
+            The number of lookups that loaded the value from the file.
+
+        evictions:
+            The number of values removed to stay within the size limit.
+
+        entries:
+            The current number of values.
+
+        bytes:
+            The current estimated size of the values in bytes.
+    """
+
+    hits: int
+    misses: int
+    evictions: int
+    entries: int
+    bytes: int
+
+
+def estimate_size(value: Any) -> int:
+    """
+    Estimate the memory used by a value, including the items of containers.
+    Objects with an nbytes attribute, such as numpy arrays, are counted by
+    their data size.
+
+    Args:
+        value:
+            The value.
+
+    Returns:
+        The estimated size in bytes.
+    """
+    seen = set()
+
+    def estimate(obj):
+        if id(obj) in seen:
+            return 0
+        seen.add(id(obj))
+        nbytes = getattr(obj, "nbytes", None)
+        if isinstance(nbytes, int):
+            return nbytes
+        size = sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            size += sum(estimate(key) + estimate(item) for key, item in obj.items())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            size += sum(estimate(item) for item in obj)
+        return size
+
+    return estimate(value)
+
+
+class LRUCache:
+    """
+    Thread-safe LRU cache of the data loaded from files, bounded by the
+    estimated size of the values in bytes.
+
+    Values are keyed by a kind (e.g. "json"), the path and modification time of
+    the file and optional loader arguments, so values of modified files are
+    never returned. The cached values are shared and must not be modified.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        sizeof: Callable[[Any], int] = estimate_size,
+    ):
+        """
+        Args:
+            max_bytes:
+                The maximum total size of the values in bytes.
+
+            sizeof:
+                The function used to estimate the size of the values.
+        """
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self._data = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def __repr__(self):
+        return f"{self.__class__.__qualname__}({self.stats()})"
+
+    def stats(self) -> CacheStats:
+        """
+        Get the statistics of this cache.
+
+        Returns:
+            The CacheStats instance.
+        """
+        with self._lock:
+            return CacheStats(
+                self._hits, self._misses, self._evictions, len(self._data), self._bytes
+            )
+
+    def clear(self):
+        """
+        Remove all values from the cache. The statistics are kept.
+        """
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def resize(self, max_bytes: int):
+        """
+        Change the size limit, evicting values if necessary.
+
+        Args:
+            max_bytes:
+                The new maximum total size of the values in bytes.
+        """
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def _evict(self):
+        """
+        Remove the least recently used values until the cache fits its size
+        limit. This must be called with the lock held.
+        """
+        data = self._data
+        while self._bytes > self.max_bytes and data:
+            _key, (_value, size) = data.popitem(last=False)
+            self._bytes -= size
+            self._evictions += 1
+
+    def get_or_load(
+        self,
+        kind: str,
+        path: PathArg,
+        loader: Callable[..., Any],
+        *args: Hashable,
+    ) -> Any:
+        """
+        Get a value from the cache, loading it if necessary. Concurrent lookups
+        of the same missing value may load it more than once.
+
+        Args:
+            kind:
+                The kind of data, which distinguishes the values of different
+                loaders for the same file.
+
+            path:
+                The path to the file. BIDSPath instances are accepted.
+
+            loader:
+                The function that loads the value. It is called with the
+                pathlib.Path of the file and the additional arguments.
+
+            *args:
+                Additional hashable arguments of the loader, which are part of
+                the key.
+
+        Returns:
+            The value.
+
+        Raises:
+            OSError:
+                The file could not be accessed. Errors raised by the loader are
+                propagated.
+        """
+        path = get_path(path)
+        key = (kind, str(path), path.stat().st_mtime_ns, args)
+        with self._lock:
+            try:
+                value, _size = self._data[key]
+            except KeyError:
+                self._misses += 1
+            else:
+                self._hits += 1
+                self._data.move_to_end(key)
+                return value
+        value = loader(path, *args)
+        size = self.sizeof(value)
+        if size > self.max_bytes:
+            LOGGER.debug("Not caching %s of %s: %d bytes", kind, path, size)
+            return value
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._data[key] = (value, size)
+            self._bytes += size
+            self._evict()
+        return value
+
+
+# The cache shared by the loaders of this package.
+SHARED_CACHE = LRUCache()
+
+
+def get_cache(cache: Optional[LRUCache] = None) -> LRUCache:
+    """
+    Get the given cache, or the shared cache if None.
+    """
+    return SHARED_CACHE if cache is None else cache
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Locations of the files that this package derives from datasets. This module
+has no dependencies within the package so that it is cheap to import.
+"""
+
+import os
+import pathlib
+import threading
+from typing import Union
+
+
+def get_cache_dir() -> pathlib.Path:
+    """
+    Get the directory of this package in the user's cache directory, which
+    holds the files derived from datasets so that datasets are not modified.
+
+    Returns:
+        The path to the directory, which may not exist.
+    """
+    cache_dir = os.environ.get("XDG_CACHE_HOME")
+    if cache_dir:
+        cache_dir = pathlib.Path(cache_dir)
+    else:
+        cache_dir = pathlib.Path.home() / ".cache"
+    return cache_dir / "clinicaio"
+
+
+def get_path_digest(path: Union[str, os.PathLike]) -> str:
+    """
+    Get a digest of the absolute form of a path, used to name the cache files
+    derived from it.
+    """
+    # Imported here because it loads OpenSSL, which is slow to import and only
+    # needed when a cache file is located.
+    import hashlib  # pylint: disable=import-outside-toplevel
+
+    path = pathlib.Path(path).absolute()
+    return hashlib.sha1(str(path).encode("utf-8")).hexdigest()
+
+
+def get_temporary_path(path: pathlib.Path) -> pathlib.Path:
+    """
+    Get a hidden path next to a file, where it is written before it is
+    atomically moved into place. The name is unique to the calling process and
+    thread so that concurrent writers of the same file do not interfere.
+    """
+    return path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
@@ -1,13 +1,14 @@
 #!/usr/bin/env python3
 """Path functions and classes."""
 
-import functools
 import logging
+import pathlib
 from typing import Optional, Callable, Union
 
 from .entities import Entity, EntityArg, EntityValue
 from .exception import BIDSPathError
 from .path import BIDSPath
+from .scan import ParallelLister, scan_directory
 
 LOGGER = logging.getLogger(__name__)
 
@@ -41,10 +42,27 @@ class BIDSDirectory(BIDSPath, metaclass=_BIDSDirectoryMetaclass):
             suffixes to subclasses of BIDSPath or BIDSDirectory. Currently
             SUBCLASSES_BY_ENTITY will take precedence but this behavior may be
             configured by overriding the maybe_convert_child method.
+
+        SCAN_MAX_WORKERS:
+            The default number of threads used to list directories in
+            recurse_directory(). If None, directories are listed serially.
+            Increase this on high-latency filesystems such as NFS. This may
+            also be set on instances.
+
+        CACHE_CHECK_MTIME:
+            If True, the cached mappings of the generated entity properties
+            (e.g. subjects) are checked against the modification time of the
+            directory on every access. This may also be set on instances.
     """
 
     SUBCLASSES_BY_ENTITY = {}
     SUBCLASSES_BY_SUFFIX = {}
+    SCAN_MAX_WORKERS = None
+    CACHE_CHECK_MTIME = False
+
+    # An optional BIDSIndex instance used to list this directory and its
+    # subdirectories instead of the filesystem.
+    index = None
 
     def maybe_convert_child(self, bids_path: BIDSPath):
         for key, dct in (
@@ -62,6 +80,38 @@ class BIDSDirectory(BIDSPath, metaclass=_BIDSDirectoryMetaclass):
                 return subcls.from_bids_path(bids_path)
         return bids_path
 
+    def get_index(self):
+        """
+        Get the index set on this directory or its closest ancestor.
+
+        Returns:
+            The BIDSIndex instance, or None if there is no index.
+        """
+        node = self
+        while isinstance(node, BIDSPath):
+            index = getattr(node, "index", None)
+            if index is not None:
+                return index
+            node = node.parent
+        return None
+
+    def list_children(self):
+        """
+        List this directory. This is the single point through which the
+        filesystem is listed when navigating a dataset. If an index is
+        available, the listing is retrieved from the index instead.
+
+        Returns:
+            The list of ChildEntry instances for this directory, sorted by name.
+        """
+        index = self.get_index()
+        if index is not None:
+            children = index.list_children(self.path)
+            if children is not None:
+                return children
+            LOGGER.debug("%s is not in %s", self, index)
+        return scan_directory(self.path)
+
     def get_child_paths(self, include_files: bool = True, include_dirs: bool = True):
         """
         Get an iterator over file paths in this directory.
@@ -76,33 +126,36 @@ class BIDSDirectory(BIDSPath, metaclass=_BIDSDirectoryMetaclass):
         Returns:
             The iterator over Path instances of the selected paths.
         """
-        paths = sorted(self.path.iterdir())
-        if include_files and include_dirs:
-            yield from paths
-            return
-        for path in paths:
-            is_dir = path.is_dir()
-            if is_dir:
+        path = self.path
+        for entry in self.list_children():
+            if entry.is_dir:
                 if include_dirs:
-                    yield path
+                    yield path / entry.name
             elif include_files:
-                yield path
+                yield path / entry.name
 
-    def get_child_bids_paths(self, **kwargs):
+    def get_child_bids_paths(
+        self, include_files: bool = True, include_dirs: bool = True
+    ):
         """
         An iterable of BIDSPath instances of paths in this directory.
 
         Args:
-            **kwargs:
-                Keyword arguments passed through to get_paths.
+            include_files:
+                Include file (i.e. non-directory) paths.
+
+            include_dirs:
+                Include directory paths.
 
         Returns:
             An iterator over BIDSPath instances.
         """
-        path = self.path
-        for child_path in self.get_child_paths(**kwargs):
-            subpath = child_path.relative_to(path)
-            yield self.__div__(subpath)
+        for entry in self.list_children():
+            if entry.is_dir:
+                if include_dirs:
+                    yield self.get_child(entry.name, True)
+            elif include_files:
+                yield self.get_child(entry.name, False)
 
     @property
     def child_entities(self):
@@ -191,11 +244,54 @@ class BIDSDirectory(BIDSPath, metaclass=_BIDSDirectoryMetaclass):
                 )
         return mapping
 
+    def get_cached_child_mapping(self, entity: EntityArg):
+        """
+        Get the mapping returned by get_child_mapping_by_entity() for the given
+        entity, cached on this instance. The cache is cleared by refresh(). If
+        CACHE_CHECK_MTIME is True, the cached mapping is also discarded when
+        the modification time of this directory changes.
+
+        Args:
+            entity:
+                The target entity.
+
+        Returns:
+            The cached dict mapping entity values to children of this
+            directory. It should not be modified.
+        """
+        entity = Entity.convert(entity)
+        mtime_ns = self.path.stat().st_mtime_ns if self.CACHE_CHECK_MTIME else None
+        cache = self.__dict__.setdefault("_child_mapping_cache", {})
+        try:
+            cached_mtime_ns, mapping = cache[entity]
+        except KeyError:
+            pass
+        else:
+            if cached_mtime_ns == mtime_ns:
+                return mapping
+            LOGGER.debug("Discarding stale %s mapping of %s.", entity, self)
+        mapping = self.get_child_mapping_by_entity(entity)
+        cache[entity] = (mtime_ns, mapping)
+        return mapping
+
+    def refresh(self):
+        """
+        Clear the data cached on this instance, such as the mappings of the
+        generated entity properties (e.g. subjects) and the list of JSON
+        sidecars.
+        """
+        self.__dict__.pop("_child_mapping_cache", None)
+        self.__dict__.pop("_sidecar_cache", None)
+
     def recurse_directory(
         self,
         filter_func: Optional[
             Callable[[Union[BIDSPath, "BIDSDirectory"]], bool]
         ] = None,
+        prune_func: Optional[Callable[["BIDSDirectory"], bool]] = None,
+        max_depth: Optional[int] = None,
+        max_workers: Optional[int] = None,
+        on_error: Optional[Callable[[pathlib.Path, Exception], None]] = None,
     ):
         """
         Recurse paths within this directory.
@@ -204,29 +300,168 @@ class BIDSDirectory(BIDSPath, metaclass=_BIDSDirectoryMetaclass):
             filter_func:
                 A optional function that accepts a BIDSPath argument and returns
                 a boolean to indicate if the path should be included in the
-                results (True) or not (False).
+                results (True) or not (False). Excluded directories are still
+                recursed.
+
+            prune_func:
+                An optional function that accepts a BIDSDirectory argument and
+                returns True if the directory and all of its contents should
+                be skipped. Pruned directories are neither listed nor yielded.
+
+            max_depth:
+                An optional maximum depth of the yielded paths, as given by
+                their depth attribute. Directories at the maximum depth are
+                yielded but not listed.
+
+            max_workers:
+                The maximum number of threads used to list directories
+                concurrently, which hides the latency of remote filesystems.
+                If None, SCAN_MAX_WORKERS is used. Directories are listed
+                serially if the value is None or less than 2. The results are
+                the same in all cases.
+
+            on_error:
+                An optional function called with the path and the exception
+                when a child path cannot be created from its name, e.g. because
+                of duplicate entities. The child is then skipped and the
+                traversal continues. If None, the exception is raised.
 
         Returns:
             A generator over all directories and files in this directory, as
             instances of BIDSDirectory and BIDSPath, respectively, or subclasses
             thereof.
         """
-        for subdir in self.get_child_bids_paths(include_files=False):
+        depth = self.depth or 0
+        if max_depth is not None and depth >= max_depth:
+            return
+        if max_workers is None:
+            max_workers = self.SCAN_MAX_WORKERS
+        if max_workers is None or max_workers < 2:
+            yield from self._recurse_directory(
+                filter_func, prune_func, max_depth, depth, None, on_error
+            )
+            return
+        with ParallelLister(max_workers) as lister:
+            yield from self._recurse_directory(
+                filter_func, prune_func, max_depth, depth, lister, on_error
+            )
+
+    def _recurse_directory(
+        self, filter_func, prune_func, max_depth, depth, lister, on_error
+    ):
+        """
+        Internal implementation of recurse_directory.
+
+        Args:
+            filter_func, prune_func, max_depth, on_error:
+                Same as recurse_directory.
+
+            depth:
+                The depth of this directory.
+
+            lister:
+                An optional ParallelLister instance.
+
+        Returns:
+            Same as recurse_directory.
+        """
+        # List each directory only once and reuse the entry types from the
+        # listing. Subdirectories are yielded and recursed before files.
+        child_depth = depth + 1
+        descend = max_depth is None or child_depth < max_depth
+        if lister is None:
+            entries = self.list_children()
+        else:
+            entries = lister.list_children(self)
+        subdirs = []
+        files = []
+        for entry in entries:
+            if not entry.is_dir:
+                files.append(entry.name)
+                continue
+            subdir = self._get_child_or_report(entry.name, True, on_error)
+            if subdir is None:
+                continue
+            if prune_func is None or not prune_func(subdir):
+                subdirs.append(subdir)
+        if descend and lister is not None:
+            for subdir in subdirs:
+                lister.prefetch(subdir)
+        for subdir in subdirs:
             if filter_func is None or filter_func(subdir):
                 yield subdir
-            yield from subdir.recurse_directory(filter_func=filter_func)
-        for path in self.get_child_bids_paths(include_dirs=False):
+            if descend:
+                yield from subdir._recurse_directory(
+                    filter_func, prune_func, max_depth, child_depth, lister, on_error
+                )
+        for name in files:
+            path = self._get_child_or_report(name, False, on_error)
+            if path is None:
+                continue
             if filter_func is None or filter_func(path):
                 yield path
 
-    def check(self):
+    def _get_child_or_report(self, name, is_dir, on_error):
+        """
+        Create a child path with get_child() and pass any error to on_error.
+
+        Returns:
+            The child path, or None if it could not be created and on_error
+            is set.
+        """
+        if on_error is None:
+            return self.get_child(name, is_dir)
+        try:
+            return self.get_child(name, is_dir)
+        except (ValueError, BIDSPathError) as err:
+            on_error(self.path / name, err)
+            return None
+
+    def check(self, recursive: bool = True):
+        """
+        Check for errors in this directory.
+
+        Args:
+            recursive:
+                If True, also check all paths within this directory with
+                validate() and report all violations at once.
+
+        Raises:
+            BIDSPathError:
+                The check failed. If recursive is True, the exception is a
+                ValidationError with the report of all violations.
+        """
         super().check()
         # Ensure that this is a dictionary.
         path = self.path
         if path.exists() and not path.is_dir():
             raise BIDSPathError(f"{path} is not a directory.")
-        for path in self.recurse_directory():
-            path.check()
+        if recursive:
+            self.validate().raise_for_violations()
+
+    def validate(self, max_workers: Optional[int] = None, cache=None):
+        """
+        Check this directory and all paths within it on a thread pool and
+        collect all violations.
+
+        Args:
+            max_workers:
+                The maximum number of paths checked concurrently. If None,
+                SCAN_MAX_WORKERS is used.
+
+            cache:
+                An optional ValidationCache instance. If given, only the paths
+                that have changed since their last validation are checked.
+
+        Returns:
+            The ValidationReport instance.
+        """
+        # Imported here because the validation module depends on this one.
+        from .validation import validate_directory
+
+        if max_workers is None:
+            max_workers = self.SCAN_MAX_WORKERS
+        return validate_directory(self, max_workers=max_workers, cache=cache)
 
     @classmethod
     def add_custom_subclass_methods(cls):
@@ -243,10 +478,11 @@ class BIDSDirectory(BIDSPath, metaclass=_BIDSDirectoryMetaclass):
             # of a seclected subclass for that entity
             @property
             def entities_property(self, entity=entity):
-                return self.get_child_mapping_by_entity(entity)
+                return self.get_cached_child_mapping(entity)
 
             entities_property.__doc__ = (
-                f"This directory's {plural} as instances of {cls_name}."
+                f"This directory's {plural} as instances of {cls_name}. The "
+                "mapping is cached until refresh() is called."
             )
             entities_property_name = plural
             setattr(cls, entities_property_name, entities_property)
@@ -255,10 +491,12 @@ class BIDSDirectory(BIDSPath, metaclass=_BIDSDirectoryMetaclass):
             )
 
             # Define the accessor method to retrieve specific entities by value.
+            # The attribute name is bound as a default argument to capture its
+            # current value in the loop. functools.partial cannot be used here
+            # because partial objects are not bound as methods.
             def get_entity(self, label: EntityValue, _attr=plural):
                 return getattr(self, _attr).get(label)
 
-            get_entity = functools.partial(get_entity, _attr=plural)
             get_entity.__name__ = f"get_{display_name}"
             get_entity.__doc__ = f"""
             Get one {display_name} by entity value. This assumes that there is
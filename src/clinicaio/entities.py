@@ -30,10 +30,9 @@ class Entity(enum.StrEnum):
         """
         if isinstance(arg, cls):
             return arg
-        try:
-            return cls[arg]
-        except KeyError:
-            return arg
+        # Look up the argument in a precomputed table instead of relying on the
+        # KeyError raised by cls[arg] for every unrecognized argument.
+        return _MEMBERS_BY_NAME.get(arg, arg)
 
     @property
     def display_name(self):
@@ -52,5 +51,8 @@ class Entity(enum.StrEnum):
         return f"{self.display_name}s"
 
 
+# Table of members by name for Entity.convert.
+_MEMBERS_BY_NAME = dict(Entity.__members__)
+
 EntityArg = Union[str, Entity]
 EntityValue = Union[str, int]
@@ -0,0 +1,454 @@
+#!/usr/bin/env python3
+"""Managed cache of decompressed images for training reads."""
+
+import concurrent.futures
+import hashlib
+import logging
+import math
+import pathlib
+import shutil
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Iterable, List, Optional
+
+from .cachedir import get_path_digest, get_temporary_path
+from .exception import BIDSPathError
+from .models.enum import Extension
+from .nifti import is_gzipped, read_nifti_array, read_nifti_header
+from .path import BIDSPath, PathArg, get_path, split_extensions
+
+LOGGER = logging.getLogger(__name__)
+
+
+# Extension of NumPy array files.
+NPY_EXTENSION = ".npy"
+
+# Extensions of the supported cache formats.
+IMAGE_CACHE_EXTENSIONS = (Extension.NIFTI.value, NPY_EXTENSION, Extension.PT.value)
+
+# Directory of the cached images of dataset paths, as in CAPS directories.
+SUBJECTS_DIR = "subjects"
+
+# Directory of the cached images of other paths.
+OTHER_DIR = "other"
+
+# Size of the blocks read when copying or hashing images.
+_BLOCK_SIZE = 1 << 20
+
+
+class ImageCacheError(BIDSPathError):
+    """Exceptions raised by the image cache."""
+
+
+def hash_file(path: PathArg) -> str:
+    """
+    Compute the SHA-256 digest of a file.
+
+    Args:
+        path:
+            The path to the file.
+
+    Returns:
+        The hexadecimal digest.
+    """
+    digest = hashlib.sha256()
+    with get_path(path).open("rb") as handle:
+        while block := handle.read(_BLOCK_SIZE):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _decompress_gzip(src, dst):
+    """
+    Decompress all members of a gzip stream, such as the concatenated members
+    of files compressed in blocks by bgzip.
+    """
+    decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16)
+    while block := src.read(_BLOCK_SIZE):
+        while block:
+            dst.write(decompressor.decompress(block))
+            if decompressor.eof:
+                # Continue with the next member of multi-member files.
+                block = decompressor.unused_data
+                decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16)
+            else:
+                block = b""
+    dst.write(decompressor.flush())
+
+
+def convert_image(source: PathArg, target: PathArg):
+    """
+    Convert a NIfTI image to a fast-loading form. This is a module-level
+    function so that it can run on a process pool.
+
+    Args:
+        source:
+            The path to the .nii or .nii.gz image.
+
+        target:
+            The path to the converted image. The format is determined by the
+            extension: ".nii" for uncompressed NIfTI images, ".npy" for NumPy
+            arrays (which requires numpy) and ".pt" for PyTorch tensors (which
+            requires torch). The arrays have the shape of the image and the
+            byte order of the file, without scaling.
+    """
+    source = get_path(source)
+    target = get_path(target)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = get_temporary_path(target)
+    extension = target.suffix
+    try:
+        if extension == Extension.NIFTI.value:
+            with source.open("rb") as src, tmp_path.open("wb") as dst:
+                if is_gzipped(source):
+                    _decompress_gzip(src, dst)
+                    header = read_nifti_header(source)
+                    size = header.vox_offset + math.prod(header.shape) * (
+                        header.bitpix // 8
+                    )
+                    if dst.tell() < size:
+                        raise ImageCacheError(
+                            f"{source} is truncated: {dst.tell()} of {size} bytes."
+                        )
+                else:
+                    shutil.copyfileobj(src, dst, _BLOCK_SIZE)
+        elif extension == NPY_EXTENSION:
+            array = read_nifti_array(source)
+            import numpy
+
+            with tmp_path.open("wb") as dst:
+                numpy.save(dst, array)
+        elif extension == Extension.PT.value:
+            try:
+                import torch
+            except ImportError as err:
+                raise ImportError("Caching images as tensors requires torch.") from err
+            tensor = torch.from_numpy(read_nifti_array(source).copy())
+            with tmp_path.open("wb") as dst:
+                torch.save(tensor, dst)
+        else:
+            raise ImageCacheError(f"Unsupported cache format: {extension}")
+        tmp_path.replace(target)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+
+class ImageCache:
+    """
+    Disk cache of decompressed copies of images, laid out as a CAPS directory.
+
+    Entries are produced from the source images on demand or in bulk on a
+    process pool and are invalidated when the size or modification time of
+    their source changes. If hashes are enabled, entries whose source has a new
+    modification time but the same content are kept. When a disk budget is
+    set, the least recently used entries are removed to stay within it.
+
+    The entries are recorded in an SQLite database in the cache directory so
+    the cache can be shared by processes.
+    """
+
+    def __init__(
+        self,
+        root: PathArg,
+        extension: str = Extension.NIFTI.value,
+        budget: Optional[int] = None,
+        use_hash: bool = False,
+    ):
+        """
+        Args:
+            root:
+                The cache directory. Use a separate directory for each dataset
+                because the entries of dataset paths mirror its layout.
+
+            extension:
+                The extension of the cached images, which determines their
+                format. See convert_image().
+
+            budget:
+                The maximum total size of the cached images in bytes, or None
+                for no limit.
+
+            use_hash:
+                If True, store the SHA-256 digest of the sources and use it to
+                validate entries when the modification time of their source
+                changes. Hashing requires reading the whole source.
+        """
+        if extension not in IMAGE_CACHE_EXTENSIONS:
+            raise ImageCacheError(f"Unsupported cache format: {extension}")
+        self.root = get_path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.extension = extension
+        self.budget = budget
+        self.use_hash = use_hash
+        self._lock = threading.RLock()
+        try:
+            self._connection = sqlite3.connect(
+                self.root / "cache.sqlite", check_same_thread=False, timeout=60
+            )
+            with self._connection as con:
+                con.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS entries (
+                        path TEXT PRIMARY KEY,
+                        source TEXT NOT NULL,
+                        source_size INTEGER NOT NULL,
+                        source_mtime_ns INTEGER NOT NULL,
+                        source_hash TEXT,
+                        size INTEGER NOT NULL,
+                        atime REAL NOT NULL
+                    )
+                    """
+                )
+        except sqlite3.Error as err:
+            raise ImageCacheError(
+                f"Failed to open the cache {self.root}: {err}"
+            ) from err
+
+    def close(self):
+        """
+        Close the database connection.
+        """
+        with self._lock:
+            self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_args):
+        self.close()
+
+    def __repr__(self):
+        return f"{self.__class__.__qualname__}({self.root}, {self.extension})"
+
+    def get_entry_path(self, source: PathArg) -> pathlib.Path:
+        """
+        Get the path of the cached image of a source.
+
+        Args:
+            source:
+                The source image. The entries of paths in a dataset mirror the
+                dataset's subject directories, e.g.
+                subjects/sub-01/ses-M000/anat/sub-01_ses-M000_T1w.nii. Other
+                paths are cached by digest.
+
+        Returns:
+            The path of the entry, which may not exist.
+        """
+        if isinstance(source, BIDSPath) and isinstance(source.parent, BIDSPath):
+            parts = source.relative_path.parts[1:]
+            stem, _ = split_extensions(parts[-1])
+            return self.root.joinpath(
+                SUBJECTS_DIR, *parts[:-1], f"{stem}{self.extension}"
+            )
+        source = get_path(source)
+        stem, _ = split_extensions(source.name)
+        return (
+            self.root / OTHER_DIR / get_path_digest(source) / f"{stem}{self.extension}"
+        )
+
+    def _is_valid(self, entry_path: pathlib.Path, source: pathlib.Path, stat):
+        """
+        Check if an entry is valid for the current state of its source.
+        """
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT source_size, source_mtime_ns, source_hash FROM entries "
+                "WHERE path = ?",
+                (str(entry_path),),
+            ).fetchone()
+        if row is None or not entry_path.exists():
+            return False
+        size, mtime_ns, digest = row
+        if size != stat.st_size:
+            return False
+        if mtime_ns == stat.st_mtime_ns:
+            return True
+        if not (self.use_hash and digest) or hash_file(source) != digest:
+            return False
+        LOGGER.debug("Keeping %s for touched source %s", entry_path, source)
+        with self._lock, self._connection as con:
+            con.execute(
+                "UPDATE entries SET source_mtime_ns = ? WHERE path = ?",
+                (stat.st_mtime_ns, str(entry_path)),
+            )
+        return True
+
+    def _record(self, entry_path: pathlib.Path, source: pathlib.Path, stat):
+        """
+        Record a new entry in the database.
+        """
+        digest = hash_file(source) if self.use_hash else None
+        with self._lock, self._connection as con:
+            con.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    str(entry_path),
+                    str(source),
+                    stat.st_size,
+                    stat.st_mtime_ns,
+                    digest,
+                    entry_path.stat().st_size,
+                    time.time(),
+                ),
+            )
+
+    def _touch(self, entry_paths: Iterable[pathlib.Path]):
+        """
+        Update the access times of entries.
+        """
+        now = time.time()
+        with self._lock, self._connection as con:
+            con.executemany(
+                "UPDATE entries SET atime = ? WHERE path = ?",
+                ((now, str(path)) for path in entry_paths),
+            )
+
+    def get(self, source: PathArg) -> pathlib.Path:
+        """
+        Get the cached image of a source, producing it if necessary.
+
+        Args:
+            source:
+                The source image.
+
+        Returns:
+            The path of the cached image.
+        """
+        return self.fill([source], max_workers=1)[0]
+
+    def fill(
+        self, sources: Iterable[PathArg], max_workers: Optional[int] = None
+    ) -> List[pathlib.Path]:
+        """
+        Produce the missing or stale cached images of many sources on a process
+        pool. Other entries are then evicted if necessary, but not those of the
+        given sources, so a batch larger than the budget exceeds it until a
+        later call.
+
+        Args:
+            sources:
+                The source images.
+
+            max_workers:
+                The maximum number of processes. If 1, the images are produced
+                in this process.
+
+        Returns:
+            The list of paths of the cached images, in the same order as the
+            sources.
+        """
+        sources = list(sources)
+        entry_paths = [self.get_entry_path(source) for source in sources]
+        pending = {}
+        for source, entry_path in zip(sources, entry_paths):
+            source = get_path(source)
+            try:
+                stat = source.stat()
+            except OSError as err:
+                raise ImageCacheError(f"Failed to stat {source}: {err}") from err
+            if entry_path not in pending and not self._is_valid(
+                entry_path, source, stat
+            ):
+                pending[entry_path] = (source, stat)
+
+        if pending:
+            LOGGER.debug("Caching %d images in %s", len(pending), self)
+            if max_workers == 1:
+                for entry_path, (source, _stat) in pending.items():
+                    convert_image(source, entry_path)
+            else:
+                with concurrent.futures.ProcessPoolExecutor(
+                    max_workers=max_workers
+                ) as executor:
+                    futures = [
+                        executor.submit(convert_image, source, entry_path)
+                        for entry_path, (source, _stat) in pending.items()
+                    ]
+                    for future in futures:
+                        future.result()
+            for entry_path, (source, stat) in pending.items():
+                self._record(entry_path, source, stat)
+
+        self._touch(entry_paths)
+        self.evict(keep=entry_paths)
+        return entry_paths
+
+    def load(self, source: PathArg):
+        """
+        Load the cached image of a source, producing it if necessary.
+
+        Args:
+            source:
+                The source image.
+
+        Returns:
+            A read-only numpy.memmap for the ".nii" and ".npy" formats or a
+            torch.Tensor for the ".pt" format.
+        """
+        entry_path = self.get(source)
+        if self.extension == Extension.NIFTI.value:
+            from .nifti import memmap_nifti
+
+            return memmap_nifti(entry_path)
+        if self.extension == NPY_EXTENSION:
+            import numpy
+
+            return numpy.load(entry_path, mmap_mode="r")
+        import torch
+
+        return torch.load(entry_path)
+
+    @property
+    def total_size(self) -> int:
+        """
+        The total size of the cached images in bytes.
+        """
+        with self._lock:
+            (size,) = self._connection.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM entries"
+            ).fetchone()
+        return size
+
+    def evict(
+        self,
+        budget: Optional[int] = None,
+        keep: Iterable[pathlib.Path] = (),
+    ) -> int:
+        """
+        Remove the least recently used entries until the cache fits its budget.
+
+        Args:
+            budget:
+                The budget in bytes. If None, the budget of the cache is used.
+
+            keep:
+                Entries that must not be removed, e.g. those in use.
+
+        Returns:
+            The number of removed entries.
+        """
+        if budget is None:
+            budget = self.budget
+        if budget is None:
+            return 0
+        keep = {str(path) for path in keep}
+        removed = []
+        with self._lock, self._connection as con:
+            total = self.total_size
+            for path, size in con.execute(
+                "SELECT path, size FROM entries ORDER BY atime"
+            ).fetchall():
+                if total <= budget:
+                    break
+                if path in keep:
+                    continue
+                pathlib.Path(path).unlink(missing_ok=True)
+                removed.append((path,))
+                total -= size
+            con.executemany("DELETE FROM entries WHERE path = ?", removed)
+        if removed:
+            LOGGER.debug("Evicted %d entries from %s", len(removed), self)
+        return len(removed)
@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+"""Persistent SQLite inventory of the paths in a dataset."""
+
+import json
+import logging
+import os
+import pathlib
+import sqlite3
+import threading
+from typing import Iterator, List, NamedTuple, Optional, Tuple
+
+from .cachedir import get_cache_dir, get_path_digest
+from .exception import BIDSPathError
+from .path import PathArg, get_path, parse_name
+from .scan import ChildEntry
+
+LOGGER = logging.getLogger(__name__)
+
+
+# Separator of relative paths stored in the index.
+INDEX_PATH_SEPARATOR = "/"
+
+# Increment this when the tables change to force a rebuild of existing indices.
+INDEX_FORMAT_VERSION = 2
+
+
+class BIDSIndexError(BIDSPathError):
+    """Exceptions raised by the index."""
+
+
+class IndexRecord(NamedTuple):
+    """
+    A single path in the index.
+
+    Attributes:
+        path:
+            The path relative to the root of the indexed directory, with "/" as
+            the separator.
+
+        is_dir:
+            True if the path is a directory.
+
+        entities:
+            A tuple of (key, value) pairs of the path's entities.
+
+        suffix:
+            The suffix of the path, or None.
+
+        extension:
+            The full extension of the path, e.g. ".nii.gz", or an empty string.
+
+        size:
+            The size of the file in bytes.
+
+        mtime_ns:
+            The modification time of the file in nanoseconds.
+    """
+
+    path: str
+    is_dir: bool
+    entities: Tuple[Tuple[str, str], ...]
+    suffix: Optional[str]
+    extension: str
+    size: int
+    mtime_ns: int
+
+
+def get_default_index_path(root: PathArg) -> pathlib.Path:
+    """
+    Get the default location of the index for a directory. Indices are stored
+    in the user's cache directory by default so that datasets are not modified.
+
+    Args:
+        root:
+            The indexed directory.
+
+    Returns:
+        The path to the SQLite file.
+    """
+    return get_cache_dir() / "index" / f"{get_path_digest(get_path(root))}.sqlite"
+
+
+def _join(parent: str, name: str) -> str:
+    """
+    Join a name to a relative path in the index.
+    """
+    if parent:
+        return f"{parent}{INDEX_PATH_SEPARATOR}{name}"
+    return name
+
+
+class BIDSIndex:
+    """
+    Persistent inventory of a directory tree in an SQLite database.
+
+    The index stores the listing of every directory along with the parsed
+    entities, suffix, extension, size and modification time of every path.
+    Refreshing the index only lists directories whose modification times have
+    changed since the last refresh. Note that modifying the contents of an
+    existing file does not change the modification time of its directory so
+    such changes are only detected by a full refresh.
+
+    The index can be shared between threads.
+    """
+
+    def __init__(self, root: PathArg, index_path: Optional[PathArg] = None):
+        """
+        Args:
+            root:
+                The root directory to index.
+
+            index_path:
+                The path to the SQLite file. If None, the path returned by
+                get_default_index_path() is used.
+        """
+        self.root = get_path(root).absolute()
+        if index_path is None:
+            index_path = get_default_index_path(self.root)
+        self.index_path = get_path(index_path)
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.RLock()
+        LOGGER.debug("Opening index %s for %s", self.index_path, self.root)
+        try:
+            self._connection = sqlite3.connect(self.index_path, check_same_thread=False)
+            self._create_tables()
+        except sqlite3.Error as err:
+            raise BIDSIndexError(f"Failed to open {self.index_path}: {err}") from err
+
+    def _create_tables(self):
+        """
+        Create the tables if necessary, discarding indices of other formats.
+        """
+        con = self._connection
+        (version,) = con.execute("PRAGMA user_version").fetchone()
+        with con:
+            if version != INDEX_FORMAT_VERSION:
+                con.execute("DROP TABLE IF EXISTS directories")
+                con.execute("DROP TABLE IF EXISTS entries")
+                con.execute(f"PRAGMA user_version = {INDEX_FORMAT_VERSION}")
+            con.execute(
+                """
+                CREATE TABLE IF NOT EXISTS directories (
+                    path TEXT PRIMARY KEY,
+                    mtime_ns INTEGER NOT NULL
+                )
+                """
+            )
+            con.execute(
+                """
+                CREATE TABLE IF NOT EXISTS entries (
+                    parent TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    is_dir INTEGER NOT NULL,
+                    entities TEXT NOT NULL,
+                    suffix TEXT,
+                    extension TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    PRIMARY KEY (parent, name)
+                )
+                """
+            )
+
+    def close(self):
+        """
+        Close the database connection.
+        """
+        with self._lock:
+            self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_args):
+        self.close()
+
+    def __repr__(self):
+        return f"{self.__class__.__qualname__}({self.root}, {self.index_path})"
+
+    def get_relative_path(self, path: PathArg) -> Optional[str]:
+        """
+        Get the relative path used as a key in the index.
+
+        Args:
+            path:
+                A path within the root directory.
+
+        Returns:
+            The relative path as a string, or None if the path is not within the
+            root directory.
+        """
+        path = get_path(path)
+        try:
+            relpath = path.absolute().relative_to(self.root)
+        except ValueError:
+            return None
+        return relpath.as_posix() if relpath.parts else ""
+
+    def list_children(self, path: PathArg) -> Optional[List[ChildEntry]]:
+        """
+        List a directory from the index.
+
+        Args:
+            path:
+                The directory to list.
+
+        Returns:
+            The list of ChildEntry instances sorted by name, or None if the
+            directory is not in the index.
+        """
+        relpath = self.get_relative_path(path)
+        if relpath is None:
+            return None
+        with self._lock:
+            con = self._connection
+            if (
+                con.execute(
+                    "SELECT 1 FROM directories WHERE path = ?", (relpath,)
+                ).fetchone()
+                is None
+            ):
+                return None
+            rows = con.execute(
+                "SELECT name, is_dir FROM entries WHERE parent = ? ORDER BY name",
+                (relpath,),
+            ).fetchall()
+        return [ChildEntry(name, bool(is_dir)) for name, is_dir in rows]
+
+    def iter_records(self, prefix: str = "") -> Iterator[IndexRecord]:
+        """
+        Iterate over the records in the index in depth-first order with
+        subdirectories before files, as in BIDSDirectory.recurse_directory.
+
+        Args:
+            prefix:
+                An optional relative path of a directory in the index. Only
+                records within this directory will be returned.
+
+        Returns:
+            A generator over IndexRecord instances.
+        """
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT parent, name, is_dir, entities, suffix, extension, size, "
+                "mtime_ns FROM entries"
+            ).fetchall()
+        children = {}
+        for parent, *row in rows:
+            children.setdefault(parent, []).append(row)
+
+        def recurse(parent):
+            files = []
+            for name, is_dir, entities, suffix, ext, size, mtime_ns in sorted(
+                children.get(parent, ())
+            ):
+                record = IndexRecord(
+                    _join(parent, name),
+                    bool(is_dir),
+                    tuple(tuple(pair) for pair in json.loads(entities)),
+                    suffix,
+                    ext,
+                    size,
+                    mtime_ns,
+                )
+                if is_dir:
+                    yield record
+                    yield from recurse(record.path)
+                else:
+                    files.append(record)
+            yield from files
+
+        return recurse(prefix)
+
+    def refresh(self, full: bool = False) -> int:
+        """
+        Update the index with the current state of the filesystem.
+
+        Args:
+            full:
+                If True, list every directory even if its modification time has
+                not changed. This detects changes to the size and modification
+                times of existing files.
+
+        Returns:
+            The number of directories that were listed.
+        """
+        with self._lock, self._connection as con:
+            stored = dict(con.execute("SELECT path, mtime_ns FROM directories"))
+            n_listed = 0
+            stack = [""]
+            while stack:
+                relpath = stack.pop()
+                dir_path = self.root / relpath if relpath else self.root
+                try:
+                    mtime_ns = dir_path.stat().st_mtime_ns
+                except OSError as err:
+                    LOGGER.warning("Failed to stat %s: %s", dir_path, err)
+                    self._remove_directory(con, relpath)
+                    continue
+                if not full and stored.get(relpath) == mtime_ns:
+                    subdirs = [
+                        name
+                        for (name,) in con.execute(
+                            "SELECT name FROM entries WHERE parent = ? AND is_dir",
+                            (relpath,),
+                        )
+                    ]
+                else:
+                    subdirs = self._update_directory(con, relpath, dir_path)
+                    con.execute(
+                        "INSERT OR REPLACE INTO directories VALUES (?, ?)",
+                        (relpath, mtime_ns),
+                    )
+                    n_listed += 1
+                stack.extend(_join(relpath, name) for name in subdirs)
+        LOGGER.debug("Listed %d directories while refreshing %s", n_listed, self)
+        return n_listed
+
+    def _update_directory(self, con, relpath: str, dir_path: pathlib.Path):
+        """
+        Replace the entries of a directory.
+
+        Args:
+            con:
+                The database connection.
+
+            relpath:
+                The relative path of the directory.
+
+            dir_path:
+                The full path of the directory.
+
+        Returns:
+            The list of names of the subdirectories.
+        """
+        old_subdirs = {
+            name
+            for (name,) in con.execute(
+                "SELECT name FROM entries WHERE parent = ? AND is_dir", (relpath,)
+            )
+        }
+        rows = []
+        subdirs = []
+        with os.scandir(dir_path) as entries:
+            for entry in entries:
+                name = entry.name
+                is_dir = entry.is_dir()
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    LOGGER.warning("Failed to stat %s", entry.path)
+                    continue
+                parsed = parse_name(name)
+                rows.append(
+                    (
+                        relpath,
+                        name,
+                        is_dir,
+                        json.dumps(parsed.entities),
+                        parsed.suffix,
+                        "".join(parsed.extensions),
+                        stat.st_size,
+                        stat.st_mtime_ns,
+                    )
+                )
+                if is_dir:
+                    subdirs.append(name)
+        for name in old_subdirs.difference(subdirs):
+            self._remove_directory(con, _join(relpath, name))
+        con.execute("DELETE FROM entries WHERE parent = ?", (relpath,))
+        con.executemany(
+            "INSERT INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+        return subdirs
+
+    @staticmethod
+    def _remove_directory(con, relpath: str):
+        """
+        Remove a directory and all of its contents from the index.
+
+        Args:
+            con:
+                The database connection.
+
+            relpath:
+                The relative path of the directory. The empty string is the
+                root, whose removal empties the index.
+        """
+        if not relpath:
+            # Stored paths have no leading separator, so the bounds below would
+            # not match them.
+            con.execute("DELETE FROM directories")
+            con.execute("DELETE FROM entries")
+            return
+        # "/" is immediately followed by "0" in the code point order so this
+        # selects all paths within the directory without escaping LIKE
+        # patterns.
+        lower = f"{relpath}{INDEX_PATH_SEPARATOR}"
+        upper = f"{relpath}0"
+        for table, column in (("directories", "path"), ("entries", "parent")):
+            con.execute(
+                f"DELETE FROM {table} WHERE {column} = ? "
+                f"OR ({column} >= ? AND {column} < ?)",
+                (relpath, lower, upper),
+            )
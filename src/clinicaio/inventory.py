@@ -0,0 +1,551 @@
+#!/usr/bin/env python3
+"""Flat, shareable inventory of the paths of a dataset."""
+
+import logging
+import mmap
+import pathlib
+import struct
+from multiprocessing import resource_tracker, shared_memory
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .cachedir import get_temporary_path
+from .exception import BIDSPathError
+from .index import INDEX_PATH_SEPARATOR, IndexRecord
+from .path import PathArg, get_path
+from .query import (
+    DATATYPE_KEY,
+    EXTENSION_KEY,
+    SUFFIX_KEY,
+    get_relative_path_datatype,
+)
+
+LOGGER = logging.getLogger(__name__)
+
+
+# Magic bytes of inventories. Change the version when the layout changes.
+INVENTORY_MAGIC = b"CIOINV02"
+
+# Header after the magic bytes: numbers of labels, records and entities per
+# record, offsets of the label offsets, label data, path offsets, path data,
+# records and root path, length of the root path, number of postings and
+# offsets of the posting table and of the record indices of the postings.
+_HEADER = struct.Struct("<13Q")
+
+# Fixed fields of records: path, suffix, extension and datatype label IDs,
+# directory flag, size and modification time. They are followed by
+# max_entities pairs of key and value label IDs.
+_RECORD_FIELDS = "IIIIB3xqq"
+
+# Label ID of missing values.
+NO_LABEL = 0xFFFFFFFF
+
+# Key IDs of the postings of the fields that are not entities.
+_FIELD_KEY_IDS = {
+    SUFFIX_KEY: NO_LABEL - 1,
+    EXTENSION_KEY: NO_LABEL - 2,
+    DATATYPE_KEY: NO_LABEL - 3,
+}
+
+# Entries of the posting table: key and value label IDs, and offset and count
+# of the sorted record indices of the posting.
+_POSTING = struct.Struct("<IIQQ")
+
+# Offset of the directory flag in records.
+_IS_DIR_OFFSET = 16
+
+# Kinds of storage of inventories.
+SHM_SOURCE = "shm"
+FILE_SOURCE = "file"
+
+
+class InventoryError(BIDSPathError):
+    """Exceptions raised by inventories."""
+
+
+def _get_record_struct(max_entities: int) -> struct.Struct:
+    """
+    Get the struct of the records of an inventory.
+    """
+    return struct.Struct(f"<{_RECORD_FIELDS}{2 * max_entities}I")
+
+
+def _pack_strings(strings: List[str]) -> Tuple[bytes, bytes]:
+    """
+    Pack strings into an offset table and a data blob.
+    """
+    encoded = [string.encode("utf-8") for string in strings]
+    offsets = [0]
+    for data in encoded:
+        offsets.append(offsets[-1] + len(data))
+    return struct.pack(f"<{len(offsets)}Q", *offsets), b"".join(encoded)
+
+
+def _align(size: int) -> int:
+    """
+    Round a size up to a multiple of 8.
+    """
+    return (size + 7) & ~7
+
+
+def build_inventory(root: str, records: Iterable[IndexRecord]) -> bytes:
+    """
+    Build the flat layout of an inventory.
+
+    Args:
+        root:
+            The absolute path of the dataset as a string.
+
+        records:
+            The records of the paths in the dataset, e.g. from
+            BIDSIndex.iter_records() or BIDSDataset.iter_inventory_records().
+
+    Returns:
+        The layout as bytes.
+    """
+    records = list(records)
+    label_ids: Dict[str, int] = {}
+
+    def label_id(label):
+        if label is None:
+            return NO_LABEL
+        try:
+            return label_ids[label]
+        except KeyError:
+            return label_ids.setdefault(label, len(label_ids))
+
+    max_entities = max((len(record.entities) for record in records), default=0)
+    record_struct = _get_record_struct(max_entities)
+    packed_records = []
+    # Sorted record indices by key and value label IDs.
+    postings: Dict[Tuple[int, int], List[int]] = {}
+    for i, record in enumerate(records):
+        entity_ids = []
+        for key, value in record.entities:
+            entity_ids.extend((label_id(str(key)), label_id(str(value))))
+        datatype = None if record.is_dir else get_relative_path_datatype(record.path)
+        fields = (
+            (_FIELD_KEY_IDS[SUFFIX_KEY], label_id(record.suffix)),
+            (_FIELD_KEY_IDS[EXTENSION_KEY], label_id(record.extension)),
+            (_FIELD_KEY_IDS[DATATYPE_KEY], label_id(datatype)),
+        )
+        for key_value in (*zip(entity_ids[::2], entity_ids[1::2]), *fields):
+            if key_value[1] != NO_LABEL:
+                postings.setdefault(key_value, []).append(i)
+        entity_ids.extend([NO_LABEL] * (2 * max_entities - len(entity_ids)))
+        packed_records.append(
+            record_struct.pack(
+                i,
+                fields[0][1],
+                fields[1][1],
+                fields[2][1],
+                record.is_dir,
+                record.size,
+                record.mtime_ns,
+                *entity_ids,
+            )
+        )
+    posting_table = bytearray()
+    posting_ids = []
+    for (key_id, value_id), ids in sorted(postings.items()):
+        posting_table += _POSTING.pack(key_id, value_id, len(posting_ids), len(ids))
+        posting_ids.extend(ids)
+
+    label_offsets, label_data = _pack_strings(list(label_ids))
+    path_offsets, path_data = _pack_strings([record.path for record in records])
+    root_data = root.encode("utf-8")
+    sections = [
+        label_offsets,
+        label_data,
+        path_offsets,
+        path_data,
+        root_data,
+        bytes(posting_table),
+        struct.pack(f"<{len(posting_ids)}I", *posting_ids),
+    ]
+    offsets = []
+    position = _align(len(INVENTORY_MAGIC) + _HEADER.size)
+    for section in sections:
+        offsets.append(position)
+        position = _align(position + len(section))
+    records_offset = position
+    layout = bytearray(records_offset + len(packed_records) * record_struct.size)
+    layout[: len(INVENTORY_MAGIC)] = INVENTORY_MAGIC
+    _HEADER.pack_into(
+        layout,
+        len(INVENTORY_MAGIC),
+        len(label_ids),
+        len(records),
+        max_entities,
+        offsets[0],
+        offsets[1],
+        offsets[2],
+        offsets[3],
+        records_offset,
+        offsets[4],
+        len(root_data),
+        len(postings),
+        offsets[5],
+        offsets[6],
+    )
+    for offset, section in zip(offsets, sections):
+        layout[offset : offset + len(section)] = section
+    layout[records_offset:] = b"".join(packed_records)
+    return bytes(layout)
+
+
+class Inventory:
+    """
+    Read-only inventory of the paths of a dataset in a flat layout of strings
+    and fixed-width records, which can be placed in shared memory or in a file
+    and mapped by many processes without copying, unpickling or scanning.
+
+    Only the distinct entity keys, values, suffixes and extensions and the
+    table of postings are decoded when an inventory is opened. Records and
+    paths are decoded on demand. Queries intersect the postings, i.e. the
+    sorted indices of the records with each value, stored in the layout.
+    Pickling an inventory that is backed by shared memory or a file pickles a
+    reference to it, so it can be passed cheaply to worker processes.
+    """
+
+    def __init__(
+        self,
+        buffer,
+        source: Optional[Tuple[str, str]] = None,
+        storage=None,
+    ):
+        """
+        Args:
+            buffer:
+                An object supporting the buffer protocol with the layout
+                created by build_inventory().
+
+            source:
+                An optional ("shm", name) or ("file", path) tuple identifying
+                the storage of the buffer, used for pickling.
+
+            storage:
+                An optional object with a close() method that owns the buffer,
+                such as a SharedMemory or mmap instance. It is closed by
+                close().
+
+        Raises:
+            InventoryError:
+                The buffer does not contain an inventory.
+        """
+        self._buffer = memoryview(buffer).cast("B")
+        self.source = source
+        self._storage = storage
+        if bytes(self._buffer[: len(INVENTORY_MAGIC)]) != INVENTORY_MAGIC:
+            raise InventoryError("The buffer does not contain an inventory.")
+        (
+            n_labels,
+            self.n_records,
+            max_entities,
+            label_offsets_offset,
+            self._label_data_offset,
+            self._path_offsets_offset,
+            self._path_data_offset,
+            self._records_offset,
+            root_offset,
+            root_size,
+            n_postings,
+            postings_offset,
+            self._posting_ids_offset,
+        ) = _HEADER.unpack_from(self._buffer, len(INVENTORY_MAGIC))
+        self._record_struct = _get_record_struct(max_entities)
+        self.root = pathlib.Path(
+            bytes(self._buffer[root_offset : root_offset + root_size]).decode("utf-8")
+        )
+        label_offsets = struct.unpack_from(
+            f"<{n_labels + 1}Q", self._buffer, label_offsets_offset
+        )
+        data = bytes(
+            self._buffer[
+                self._label_data_offset : self._label_data_offset + label_offsets[-1]
+            ]
+        )
+        self.labels = [
+            data[start:end].decode("utf-8")
+            for start, end in zip(label_offsets, label_offsets[1:])
+        ]
+        self._label_ids = {label: i for i, label in enumerate(self.labels)}
+        # Offsets and counts of the postings by key and value label IDs.
+        self._postings: Dict[int, Dict[int, Tuple[int, int]]] = {}
+        for key_id, value_id, offset, count in _POSTING.iter_unpack(
+            self._buffer[postings_offset : postings_offset + n_postings * _POSTING.size]
+        ):
+            self._postings.setdefault(key_id, {})[value_id] = (offset, count)
+
+    def __len__(self):
+        return self.n_records
+
+    def __repr__(self):
+        return f"{self.__class__.__qualname__}({self.root}, {self.n_records} records)"
+
+    def __reduce__(self):
+        if self.source is None:
+            return (self.__class__, (bytes(self._buffer),))
+        kind, location = self.source
+        if kind == SHM_SOURCE:
+            return (attach_inventory, (location,))
+        return (open_inventory, (location,))
+
+    def close(self):
+        """
+        Release the buffer and the underlying storage. Records that were
+        already decoded remain valid.
+        """
+        self._buffer.release()
+        if self._storage is not None:
+            self._storage.close()
+            self._storage = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_args):
+        self.close()
+
+    def get_path(self, i: int) -> str:
+        """
+        Get the relative path of a record, with "/" as the separator.
+        """
+        start, end = struct.unpack_from(
+            "<2Q", self._buffer, self._path_offsets_offset + 8 * i
+        )
+        offset = self._path_data_offset
+        return bytes(self._buffer[offset + start : offset + end]).decode("utf-8")
+
+    def get_record(self, i: int) -> IndexRecord:
+        """
+        Decode a record.
+
+        Args:
+            i:
+                The index of the record.
+
+        Returns:
+            The IndexRecord instance. Entity keys are strings.
+        """
+        if not 0 <= i < self.n_records:
+            raise IndexError(i)
+        labels = self.labels
+        path_id, suffix, ext, _datatype, is_dir, size, mtime_ns, *entity_ids = (
+            self._record_struct.unpack_from(
+                self._buffer, self._records_offset + i * self._record_struct.size
+            )
+        )
+        entities = tuple(
+            (labels[key], labels[value])
+            for key, value in zip(entity_ids[::2], entity_ids[1::2])
+            if key != NO_LABEL
+        )
+        return IndexRecord(
+            self.get_path(path_id),
+            bool(is_dir),
+            entities,
+            None if suffix == NO_LABEL else labels[suffix],
+            "" if ext == NO_LABEL else labels[ext],
+            size,
+            mtime_ns,
+        )
+
+    def _get_label_ids(self, value) -> frozenset:
+        """
+        Get the label IDs that match a query value.
+        """
+        if value is None:
+            return None
+        if isinstance(value, (list, tuple, set, frozenset)):
+            return frozenset().union(*(self._get_label_ids(item) for item in value))
+        if isinstance(value, int):
+            ids = []
+            for i, label in enumerate(self.labels):
+                try:
+                    if int(label) == value:
+                        ids.append(i)
+                except ValueError:
+                    continue
+            return frozenset(ids)
+        label_id = self._label_ids.get(value)
+        return frozenset() if label_id is None else frozenset((label_id,))
+
+    def _get_posting(self, offset: int, count: int) -> Tuple[int, ...]:
+        """
+        Get the record indices of a posting.
+        """
+        return struct.unpack_from(
+            f"<{count}I", self._buffer, self._posting_ids_offset + 4 * offset
+        )
+
+    def query_ids(self, include_dirs: bool = False, **entities) -> List[int]:
+        """
+        Get the indices of the records that match all of the given values. See
+        query().
+
+        Returns:
+            The sorted list of matching indices.
+        """
+        selections = []
+        for key, value in entities.items():
+            key_id = _FIELD_KEY_IDS.get(key)
+            if key_id is None:
+                key_id = self._label_ids.get(str(key))
+            postings = self._postings.get(key_id, {})
+            ids = self._get_label_ids(value)
+            if ids is None:
+                selected = list(postings.values())
+            else:
+                selected = [postings[i] for i in ids if i in postings]
+            if not selected:
+                return []
+            selections.append(selected)
+
+        # Start from the smallest selection to keep the intermediate sets small.
+        selections.sort(key=lambda selected: sum(count for _, count in selected))
+        matches = None
+        for selected in selections:
+            found = set()
+            for offset, count in selected:
+                found.update(self._get_posting(offset, count))
+            matches = found if matches is None else matches.intersection(found)
+            if not matches:
+                return []
+        if matches is None:
+            matches = range(self.n_records)
+        if include_dirs:
+            return sorted(matches)
+        buffer = self._buffer
+        offset = self._records_offset + _IS_DIR_OFFSET
+        size = self._record_struct.size
+        return sorted(i for i in matches if not buffer[offset + i * size])
+
+    def query(self, include_dirs: bool = False, **entities) -> List[IndexRecord]:
+        """
+        Get the records that match all of the given values.
+
+        Args:
+            include_dirs:
+                If True, include directories in the results.
+
+            **entities:
+                Values to match by entity, suffix, extension or datatype, as
+                for BIDSDataset.query().
+
+        Returns:
+            The list of matching IndexRecord instances, in inventory order.
+        """
+        return [
+            self.get_record(i)
+            for i in self.query_ids(include_dirs=include_dirs, **entities)
+        ]
+
+    def get_full_path(self, record: IndexRecord) -> pathlib.Path:
+        """
+        Get the absolute path of a record.
+        """
+        return self.root.joinpath(*record.path.split(INDEX_PATH_SEPARATOR))
+
+
+def create_shared_inventory(
+    root: PathArg, records: Iterable[IndexRecord], name: Optional[str] = None
+) -> Inventory:
+    """
+    Build an inventory in a new block of shared memory. The creator must call
+    unlink_inventory() when the inventory is no longer needed.
+
+    Args:
+        root:
+            The dataset directory.
+
+        records:
+            The records of the paths in the dataset.
+
+        name:
+            The name of the shared memory block. If None, a unique name is
+            generated.
+
+    Returns:
+        The Inventory instance. The second item of its source attribute is the
+        name of the block, which other processes pass to attach_inventory().
+    """
+    layout = build_inventory(str(get_path(root).absolute()), records)
+    shm = shared_memory.SharedMemory(name=name, create=True, size=len(layout))
+    shm.buf[: len(layout)] = layout
+    inventory = Inventory(
+        shm.buf[: len(layout)], source=(SHM_SOURCE, shm.name), storage=shm
+    )
+    LOGGER.debug("Created shared inventory %s of %d bytes", shm.name, len(layout))
+    return inventory
+
+
+def attach_inventory(name: str) -> Inventory:
+    """
+    Attach to an inventory in shared memory without copying it.
+
+    Args:
+        name:
+            The name of the shared memory block.
+
+    Returns:
+        The Inventory instance.
+    """
+    shm = shared_memory.SharedMemory(name=name)
+    # Only the creator may unlink the block. Attaching processes would
+    # otherwise remove it when they exit.
+    resource_tracker.unregister(shm._name, "shared_memory")  # pylint: disable=protected-access
+    return Inventory(shm.buf, source=(SHM_SOURCE, name), storage=shm)
+
+
+def unlink_inventory(inventory: Inventory):
+    """
+    Close an inventory created by create_shared_inventory() and remove its
+    block of shared memory. Processes that are attached to it keep their
+    mapping until they close it.
+    """
+    kind, name = inventory.source or (None, None)
+    if kind != SHM_SOURCE:
+        raise InventoryError(f"{inventory} is not in shared memory.")
+    inventory.close()
+    shm = shared_memory.SharedMemory(name=name)
+    shm.close()
+    shm.unlink()
+
+
+def save_inventory(root: PathArg, records: Iterable[IndexRecord], path: PathArg):
+    """
+    Build an inventory in a file, e.g. on a RAM-backed filesystem such as
+    /dev/shm or next to the dataset.
+
+    Args:
+        root:
+            The dataset directory.
+
+        records:
+            The records of the paths in the dataset.
+
+        path:
+            The path of the file.
+    """
+    path = get_path(path)
+    layout = build_inventory(str(get_path(root).absolute()), records)
+    tmp_path = get_temporary_path(path)
+    tmp_path.write_bytes(layout)
+    tmp_path.replace(path)
+
+
+def open_inventory(path: PathArg) -> Inventory:
+    """
+    Map an inventory file into memory without reading it.
+
+    Args:
+        path:
+            The path of the file.
+
+    Returns:
+        The Inventory instance.
+    """
+    path = get_path(path)
+    with path.open("rb") as handle:
+        mapping = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+    return Inventory(mapping, source=(FILE_SOURCE, str(path)), storage=mapping)
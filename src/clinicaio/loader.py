@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""Prefetching loader of samples for training loops."""
+
+import collections
+import concurrent.futures
+import logging
+import os
+from typing import Any, Callable, Iterable, Iterator, Sequence, Union
+
+from .path import BIDSPath, PathArg, get_path
+
+LOGGER = logging.getLogger(__name__)
+
+
+# Default maximum size of the files being read ahead of the consumer.
+DEFAULT_MAX_INFLIGHT_BYTES = 512 << 20
+
+# A sample is a single path or a sequence of paths, e.g. a T1w image and the
+# PET images of the same session.
+Sample = Union[PathArg, Sequence[PathArg]]
+
+
+def _get_sample_paths(sample: Sample):
+    """
+    Get the tuple of paths of a sample.
+    """
+    if isinstance(sample, (str, os.PathLike, BIDSPath)):
+        return (get_path(sample),)
+    return tuple(get_path(path) for path in sample)
+
+
+def get_sample_size(sample: Sample) -> int:
+    """
+    Get the total size of the files of a sample in bytes.
+
+    Args:
+        sample:
+            A path or a sequence of paths.
+
+    Returns:
+        The size, ignoring missing files.
+    """
+    size = 0
+    for path in _get_sample_paths(sample):
+        try:
+            size += path.stat().st_size
+        except OSError:
+            pass
+    return size
+
+
+def read_sample(sample: Sample):
+    """
+    Read the contents of the files of a sample.
+
+    Args:
+        sample:
+            A path or a sequence of paths.
+
+    Returns:
+        The bytes of the file for a single path, or a tuple of bytes for a
+        sequence of paths.
+    """
+    paths = _get_sample_paths(sample)
+    if isinstance(sample, (str, os.PathLike, BIDSPath)):
+        return paths[0].read_bytes()
+    return tuple(path.read_bytes() for path in paths)
+
+
+def advise_willneed(sample: Sample):
+    """
+    Tell the operating system that the files of a sample will be read soon so
+    that it can start reading them in the background. This does nothing on
+    systems without posix_fadvise.
+
+    Args:
+        sample:
+            A path or a sequence of paths.
+    """
+    fadvise = getattr(os, "posix_fadvise", None)
+    if fadvise is None:
+        return
+    for path in _get_sample_paths(sample):
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except OSError:
+            continue
+        try:
+            fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+        except OSError as err:
+            LOGGER.debug("Failed to advise %s: %s", path, err)
+        finally:
+            os.close(fd)
+
+
+class PrefetchLoader:
+    """
+    Iterable that loads samples on a thread pool ahead of the consumer and
+    yields them in their original order.
+
+    The number of bytes read ahead is bounded by the size of the files of the
+    samples that have been submitted but not yet yielded. The files of the
+    samples after those are announced to the operating system with
+    posix_fadvise(POSIX_FADV_WILLNEED) so that their reads overlap with the
+    loading of the current samples.
+    """
+
+    def __init__(
+        self,
+        samples: Iterable[Sample],
+        load_func: Callable[[Sample], Any] = read_sample,
+        max_workers: int = 4,
+        max_inflight_bytes: int = DEFAULT_MAX_INFLIGHT_BYTES,
+        advise_ahead: int = 8,
+    ):
+        """
+        Args:
+            samples:
+                The samples, each of which is a path (e.g. a BIDSPath from a
+                query) or a sequence of paths.
+
+            load_func:
+                The function that loads a sample. It is called on the worker
+                threads. By default, the contents of the files are read.
+
+            max_workers:
+                The maximum number of samples loaded concurrently. At most
+                twice as many samples are read ahead.
+
+            max_inflight_bytes:
+                The maximum total size of the files of the samples that are
+                loaded but not yet yielded. A single sample is always loaded
+                even if it exceeds the limit.
+
+            advise_ahead:
+                The number of upcoming samples announced to the operating
+                system, or 0 to disable the hints.
+        """
+        self.samples = samples
+        self.load_func = load_func
+        self.max_workers = max_workers
+        self.max_inflight_bytes = max_inflight_bytes
+        self.advise_ahead = advise_ahead
+
+    def __iter__(self) -> Iterator[Any]:
+        samples = iter(self.samples)
+        # Samples read from the input and announced but not yet submitted.
+        upcoming = collections.deque()
+        # Futures and sizes of the submitted samples, in order.
+        pending = collections.deque()
+        inflight = 0
+        exhausted = False
+
+        def peek():
+            """
+            Fill the window of upcoming samples.
+            """
+            nonlocal exhausted
+            while not exhausted and len(upcoming) < max(self.advise_ahead, 1):
+                try:
+                    sample = next(samples)
+                except StopIteration:
+                    exhausted = True
+                    break
+                if self.advise_ahead:
+                    advise_willneed(sample)
+                upcoming.append((sample, get_sample_size(sample)))
+
+        executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="clinicaio-loader"
+        )
+        try:
+            while True:
+                peek()
+                while upcoming and len(pending) < 2 * self.max_workers:
+                    sample, size = upcoming[0]
+                    if pending and inflight + size > self.max_inflight_bytes:
+                        break
+                    upcoming.popleft()
+                    pending.append((executor.submit(self.load_func, sample), size))
+                    inflight += size
+                    peek()
+                if not pending:
+                    break
+                future, size = pending.popleft()
+                result = future.result()
+                inflight -= size
+                yield result
+        finally:
+            for future, _size in pending:
+                future.cancel()
+            executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""JSON sidecar loading and resolution of the BIDS inheritance principle."""
+
+import concurrent.futures
+import json
+import logging
+import pathlib
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from .cache import LRUCache, get_cache
+from .exception import BIDSPathError
+from .path import BIDSPath, PathArg, get_path, parse_name
+from .scan import scan_directory
+from .subclasses.dataset import BIDSDataset
+
+LOGGER = logging.getLogger(__name__)
+
+
+# Extension of JSON sidecar files.
+SIDECAR_EXTENSION = ".json"
+
+# Name of the file that marks the root directory of a dataset.
+DATASET_DESCRIPTION_NAME = "dataset_description.json"
+
+
+class MetadataError(BIDSPathError):
+    """Exceptions raised when loading metadata."""
+
+
+class Sidecar(NamedTuple):
+    """
+    A JSON file in a directory that may apply to other files.
+
+    Attributes:
+        entities:
+            The frozenset of (key, value) pairs of the sidecar's entities.
+
+        suffix:
+            The suffix of the sidecar.
+
+        path:
+            The pathlib.Path of the sidecar.
+    """
+
+    entities: frozenset
+    suffix: Optional[str]
+    path: pathlib.Path
+
+
+# Kind of the parsed JSON files in the cache.
+JSON_CACHE_KIND = "json"
+
+
+def _read_json(path: pathlib.Path) -> Any:
+    """
+    Parse a JSON file.
+    """
+    LOGGER.debug("Loading %s", path)
+    with path.open("rb") as handle:
+        return json.load(handle)
+
+
+def load_json(path: PathArg, cache: Optional[LRUCache] = None) -> Any:
+    """
+    Load a JSON file through a cache so that it is parsed once until it
+    changes.
+
+    Args:
+        path:
+            The path to the file.
+
+        cache:
+            The LRUCache instance. If None, the shared cache is used.
+
+    Returns:
+        The parsed JSON data. It is shared between callers and must not be
+        modified.
+
+    Raises:
+        MetadataError:
+            The file could not be read or parsed.
+    """
+    try:
+        return get_cache(cache).get_or_load(JSON_CACHE_KIND, path, _read_json)
+    except (OSError, ValueError) as err:
+        raise MetadataError(f"Failed to load {get_path(path)}: {err}") from err
+
+
+def _list_sidecars(dir_path: pathlib.Path, entries) -> List[Sidecar]:
+    """
+    Get the JSON files among the entries of a directory listing.
+
+    Args:
+        dir_path:
+            The path of the directory.
+
+        entries:
+            The ChildEntry instances of the directory.
+
+    Returns:
+        The list of Sidecar instances, in the order of the entries.
+    """
+    sidecars = []
+    for entry in entries:
+        if entry.is_dir or not entry.name.endswith(SIDECAR_EXTENSION):
+            continue
+        parsed = parse_name(entry.name)
+        if parsed.extensions != (SIDECAR_EXTENSION,):
+            continue
+        sidecars.append(
+            Sidecar(frozenset(parsed.entities), parsed.suffix, dir_path / entry.name)
+        )
+    return sidecars
+
+
+def get_directory_sidecars(directory) -> List[Sidecar]:
+    """
+    Get the JSON files of a directory. The result is cached on the directory
+    and cleared by its refresh() method.
+
+    Args:
+        directory:
+            A BIDSDirectory instance.
+
+    Returns:
+        The list of Sidecar instances, sorted by name.
+    """
+    try:
+        return directory.__dict__["_sidecar_cache"]
+    except KeyError:
+        pass
+    sidecars = _list_sidecars(directory.path, directory.list_children())
+    directory.__dict__["_sidecar_cache"] = sidecars
+    return sidecars
+
+
+def _get_dataset_directories(path: pathlib.Path) -> List[pathlib.Path]:
+    """
+    Get a directory and its ancestors up to the root of the dataset that
+    contains it, i.e. the first one with a dataset_description.json file.
+
+    Args:
+        path:
+            The absolute path of the directory.
+
+    Returns:
+        The list of directories, starting with path and ending with the root.
+
+    Raises:
+        MetadataError:
+            No ancestor is the root of a dataset.
+    """
+    directories = []
+    for directory in (path, *path.parents):
+        directories.append(directory)
+        if (directory / DATASET_DESCRIPTION_NAME).is_file():
+            return directories
+    raise MetadataError(
+        f"{path} is not in a dataset: none of its ancestors contains "
+        f"{DATASET_DESCRIPTION_NAME}."
+    )
+
+
+def get_sidecar_paths(bids_path: BIDSPath) -> List[pathlib.Path]:
+    """
+    Get the JSON sidecars that apply to a path according to the inheritance
+    principle: a sidecar in the path's directory or in one of its ancestors
+    within the dataset applies if it has the same suffix and a subset of the
+    path's entities.
+
+    Args:
+        bids_path:
+            The path. Its parents are normally directories of a dataset. If
+            the chain of parents ends before a BIDSDataset, e.g. for a path
+            created with BIDSPath.from_path(), the remaining directories are
+            listed from the filesystem up to the root of the dataset.
+
+    Returns:
+        The list of sidecar paths from the least to the most specific, i.e. in
+        the order in which their values should be applied.
+
+    Raises:
+        MetadataError:
+            The parents of the path must be listed from the filesystem but it
+            is not in a dataset.
+    """
+    entities = frozenset(bids_path.entities.items())
+    suffix = bids_path.suffix
+    levels = []
+
+    def add_level(sidecars):
+        matches = [
+            sidecar
+            for sidecar in sidecars
+            if sidecar.suffix == suffix and sidecar.entities <= entities
+        ]
+        matches.sort(key=lambda sidecar: len(sidecar.entities))
+        levels.append([sidecar.path for sidecar in matches])
+
+    top = bids_path
+    node = bids_path.parent
+    while isinstance(node, BIDSPath):
+        add_level(get_directory_sidecars(node))
+        top = node
+        node = node.parent
+    if node is not None and not isinstance(top, BIDSDataset):
+        for dir_path in _get_dataset_directories(get_path(node)):
+            add_level(_list_sidecars(dir_path, scan_directory(dir_path)))
+    return [path for level in reversed(levels) for path in level]
+
+
+def merge_sidecars(
+    paths: Iterable[pathlib.Path], cache: Optional[LRUCache] = None
+) -> Dict[str, Any]:
+    """
+    Merge the values of JSON sidecars, with later values overriding earlier
+    ones.
+
+    Args:
+        paths:
+            The paths of the sidecars, e.g. from get_sidecar_paths().
+
+        cache:
+            The LRUCache instance. If None, the shared cache is used.
+
+    Returns:
+        A new dict of merged values.
+    """
+    metadata = {}
+    for path in paths:
+        data = load_json(path, cache=cache)
+        if not isinstance(data, dict):
+            raise MetadataError(f"{path} does not contain a JSON object.")
+        metadata.update(data)
+    return metadata
+
+
+def get_metadata(
+    bids_path: BIDSPath, cache: Optional[LRUCache] = None
+) -> Dict[str, Any]:
+    """
+    Get the metadata of a path from its inherited JSON sidecars.
+
+    Args:
+        bids_path:
+            The path.
+
+        cache:
+            The LRUCache instance. If None, the shared cache is used.
+
+    Returns:
+        A new dict of merged values.
+    """
+    return merge_sidecars(get_sidecar_paths(bids_path), cache=cache)
+
+
+def prefetch_metadata(
+    bids_paths: Iterable[BIDSPath],
+    max_workers: Optional[int] = None,
+    cache: Optional[LRUCache] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Get the metadata of many paths, such as the results of a query, loading
+    the distinct sidecars in parallel.
+
+    Args:
+        bids_paths:
+            The paths.
+
+        max_workers:
+            The maximum number of files to load concurrently.
+
+        cache:
+            The LRUCache instance. If None, the shared cache is used.
+
+    Returns:
+        The list of metadata dicts, in the same order as the paths.
+    """
+    sidecar_paths: List[Tuple[pathlib.Path, ...]] = [
+        tuple(get_sidecar_paths(bids_path)) for bids_path in bids_paths
+    ]
+    distinct = list(dict.fromkeys(path for paths in sidecar_paths for path in paths))
+    LOGGER.debug("Prefetching %d sidecars.", len(distinct))
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # Consume the results to propagate errors.
+        for _ in executor.map(lambda path: load_json(path, cache=cache), distinct):
+            pass
+    return [merge_sidecars(paths, cache=cache) for paths in sidecar_paths]
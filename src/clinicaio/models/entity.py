@@ -1,33 +1,120 @@
 
 
+from abc import ABCMeta
 from collections import UserString
 from typing import Union, Optional
 from pathlib import Path 
 from .enum import SUVRReferenceRegions, Tracer, AnatMRISuffix, PETSuffix, FMapSuffix, Modality, Extension
+from ..validators import is_valid_index, is_valid_label
+from .template import PathTemplate, get_path_template, to_string
 from enum import Enum
 from dataclasses import dataclass
 # questions: dependance à Pydantic ??
 
 
-class Label(UserString):
+# Interned instances by class and constructor arguments, and by class and
+# canonical value. Datasets contain few distinct subjects, sessions and other
+# entity values so these caches remain small.
+_INSTANCES_BY_ARGS = {}
+_INSTANCES_BY_VALUE = {}
+
+
+class _InternedMeta(ABCMeta):
+    """
+    Metaclass of immutable value objects. Calling a class with arguments that
+    were already used returns the existing instance with a dict lookup, without
+    running the constructor and its validation again. Instances with the same
+    canonical value (see _get_intern_key) are shared, so equal instances of the
+    same class are identical.
+    """
+
+    def __call__(cls, *args, **kwargs):
+        # The types are part of the key because arguments of different types
+        # may be equal, e.g. True and 1, while only some of them are valid.
+        key = (
+            cls,
+            args,
+            tuple(map(type, args)),
+            tuple(kwargs.items()),
+            tuple(map(type, kwargs.values())),
+        )
+        try:
+            return _INSTANCES_BY_ARGS[key]
+        except KeyError:
+            pass
+        except TypeError as exc:
+            raise ValueError(f"Invalid value for {cls.__name__}: {args}") from exc
+        instance = super().__call__(*args, **kwargs)
+        object.__setattr__(instance, "_frozen", True)
+        instance = _INSTANCES_BY_VALUE.setdefault(
+            (cls, instance._get_intern_key()), instance
+        )
+        return _INSTANCES_BY_ARGS.setdefault(key, instance)
+
+
+class _Interned(metaclass=_InternedMeta):
+    """
+    Base class of interned value objects, which cannot be modified after their
+    construction.
+    """
+
+    _frozen = False
+
+    def __setattr__(self, name, value):
+        if self._frozen:
+            raise AttributeError(f"{self.__class__.__name__} instances are immutable.")
+        super().__setattr__(name, value)
+
+    def _get_intern_key(self):
+        """
+        Get the canonical value shared by equal instances.
+        """
+        raise NotImplementedError
+
+
+class _InternedString(_Interned, UserString):
+    """
+    Interned string value. Instances of the same class are equal only if they
+    are identical.
+    """
+
+    def _get_intern_key(self):
+        return self.data
+
+    def __eq__(self, other):
+        if type(other) is type(self):
+            return self is other
+        return super().__eq__(other)
+
+    def __hash__(self):
+        return hash(self.data)
+
+
+class Label(_InternedString):
     def __init__(self, value: Union[str, Enum]):
         super().__init__(self.validate(value))
 
+    def __reduce__(self):
+        return (self.__class__, (self.data,))
+
     @classmethod
     def validate(cls, value: Union[str, Enum]) -> str:
         if isinstance(value, Enum):
             return value.value
-        elif isinstance(value, str) and value.isalnum():
+        elif isinstance(value, str) and is_valid_label(value):
             return value
         raise ValueError(
             f"Label '{value}' is not a valid BIDS label: it must be string composed only by letters and/or numbers."
         )
     
-class Index(UserString):
+class Index(_InternedString):
     
     def __init__(self, value: int, length_as_string: int = 1):
         super().__init__(self.validate(value, length_as_string))
 
+    def __reduce__(self):
+        return (self.__class__, (int(self.data), len(self.data)))
+
     @classmethod
     def validate(cls, value: int, length_as_string: int) -> str:
         if not isinstance(value, int):
@@ -37,18 +124,28 @@ class Index(UserString):
                 raise ValueError(
                     f"Index '{value}' is not a valid BIDS index: it must be a non-negative integer."
                 ) from exc
+        if not is_valid_index(str(value)):
+            raise ValueError(
+                f"Index '{value}' is not a valid BIDS index: it must be a non-negative integer."
+            )
 
         return str(value).zfill(length_as_string)
         
 
 
-class Entity:
+class Entity(_Interned):
     key: Label
     value : Union[Label, Index]
 
     def __str__(self) -> str:
         return f"{self.key}-{self.value}"
 
+    def _get_intern_key(self):
+        return self.value
+
+    def __reduce__(self):
+        return (self.__class__, (self.value.data,))
+
 
 # BIDS Entities
 
@@ -201,15 +298,21 @@ class BIDSPath:
     suffix: Optional[SuffixEntity] # is suffix optional ? 
     extension: Optional[Extension]
 
-    def get_image(self) -> Path:
-        path_ = Path(str(self.subject)) / str(self.session) / str(self.modality)
-
-        filename = str(self.subject) + "_" + str(self.session) 
-
-        for entity in self.entities:
-            filename += "_" + str(entity)
-        
-        filename += f".{(str(self.suffix) if self.suffix else '')}"
-        filename += f".{(str(self.extension) if self.extension else '')}"
+    def get_template(self) -> PathTemplate:
+        """
+        Get the compiled template of the paths with the same entity keys,
+        modality, suffix and extension as this one, to render or parse many
+        such paths at once.
+        """
+        entities = [self.subject, self.session, *(self.entities or ())]
+        return get_path_template(
+            tuple(to_string(entity.key) for entity in entities),
+            datatype=to_string(self.modality) if self.modality else None,
+            suffix=to_string(self.suffix) if self.suffix else None,
+            extension=to_string(self.extension) if self.extension else None,
+        )
 
-        return path_ / filename
\ No newline at end of file
+    def get_image(self) -> Path:
+        entities = [self.subject, self.session, *(self.entities or ())]
+        columns = {to_string(entity.key): (entity.value,) for entity in entities}
+        return Path(self.get_template().render(columns, validate=False)[0])
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""Compiled templates of BIDS paths for rendering and parsing in bulk."""
+
+import enum
+import functools
+import logging
+import os
+import pathlib
+import re
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+from ..validators import DEFAULT_FORMAT_PATTERNS, is_valid_label
+
+LOGGER = logging.getLogger(__name__)
+
+
+# Separator of the rendered paths, independent of the platform.
+PATH_SEPARATOR = "/"
+
+# Entities that are also directory levels, in order.
+DIRECTORY_KEYS = ("sub", "ses")
+
+
+def to_string(value: Any) -> str:
+    """
+    Convert an entity value to a string, using the values of enum members and
+    the string form of Label, Index and entity objects.
+    """
+    if isinstance(value, str) and not isinstance(value, enum.Enum):
+        return value
+    if isinstance(value, enum.Enum):
+        return str(value.value)
+    return str(getattr(value, "value", value))
+
+
+class PathTemplate:
+    """
+    Template of the relative paths of files with the same entity keys,
+    datatype, suffix and extension, e.g.
+    "sub-{sub}/ses-{ses}/pet/sub-{sub}_ses-{ses}_trc-{trc}_pet.nii.gz".
+
+    The template is compiled once into a format string for rendering and a
+    regular expression for parsing, which both work on columns of values so
+    that many paths are processed without per-path Python logic. Paths always
+    use "/" as the separator.
+    """
+
+    def __init__(
+        self,
+        keys: Sequence[str],
+        datatype: Optional[str] = None,
+        suffix: Optional[str] = None,
+        extension: Optional[str] = None,
+    ):
+        """
+        Args:
+            keys:
+                The entity keys in the order of the filename, e.g. ("sub",
+                "ses", "trc"). The "sub" and "ses" entities are also directory
+                levels.
+
+            datatype:
+                The optional datatype directory, e.g. "anat".
+
+            suffix:
+                The optional suffix, e.g. "T1w".
+
+            extension:
+                The optional extension with its leading dot, e.g. ".nii.gz".
+
+        Raises:
+            ValueError:
+                The keys are invalid.
+        """
+        self.keys = tuple(to_string(key) for key in keys)
+        self.datatype = None if datatype is None else to_string(datatype)
+        self.suffix = None if suffix is None else to_string(suffix)
+        self.extension = None if extension is None else to_string(extension)
+        if not self.keys:
+            raise ValueError("A template requires at least one entity key.")
+        if len(set(self.keys)) != len(self.keys):
+            raise ValueError(f"Duplicate entity keys: {self.keys}")
+        for key in self.keys:
+            if not is_valid_label(key):
+                raise ValueError(f"Invalid entity key: {key!r}")
+        if self.extension and not self.extension.startswith("."):
+            raise ValueError(f'The extension must start with ".": {self.extension}')
+
+        positions = {key: i for i, key in enumerate(self.keys)}
+        dir_keys = [key for key in DIRECTORY_KEYS if key in positions]
+        format_parts = [f"{key}-{{{positions[key]}}}" for key in dir_keys]
+        pattern_parts = [f"{key}-(?P<{key}>{{value}})" for key in dir_keys]
+        if self.datatype is not None:
+            format_parts.append(_escape_format(self.datatype))
+            pattern_parts.append(re.escape(self.datatype))
+
+        components = [f"{key}-{{{i}}}" for i, key in enumerate(self.keys)]
+        pattern_components = [
+            f"{key}-(?P={key})" if key in dir_keys else f"{key}-(?P<{key}>{{value}})"
+            for key in self.keys
+        ]
+        tail = self.extension or ""
+        if self.suffix is not None:
+            components.append(_escape_format(self.suffix))
+            pattern_components.append(re.escape(self.suffix))
+        format_parts.append("_".join(components) + _escape_format(tail))
+        pattern_parts.append("_".join(pattern_components) + re.escape(tail))
+
+        self.format = PATH_SEPARATOR.join(format_parts)
+        value_pattern = DEFAULT_FORMAT_PATTERNS["label"]
+        pattern = PATH_SEPARATOR.join(pattern_parts).replace("{value}", value_pattern)
+        self.pattern = re.compile(f"(?:^|{PATH_SEPARATOR}){pattern}$")
+
+    def __repr__(self):
+        return f"{self.__class__.__qualname__}({self.format!r})"
+
+    def _get_columns(self, columns: Mapping[str, Sequence[Any]]) -> List[List[str]]:
+        """
+        Get the columns of string values, in the order of the keys.
+        """
+        missing = set(self.keys).difference(columns)
+        if missing:
+            raise ValueError(f"Missing columns: {', '.join(sorted(missing))}")
+        string_columns = [list(map(to_string, columns[key])) for key in self.keys]
+        if len({len(column) for column in string_columns}) > 1:
+            raise ValueError("The columns have different lengths.")
+        return string_columns
+
+    def render(
+        self, columns: Mapping[str, Sequence[Any]], validate: bool = True
+    ) -> List[str]:
+        """
+        Render the relative paths of rows of entity values.
+
+        Args:
+            columns:
+                A dict mapping each entity key of the template to the sequence
+                of its values. Values may be strings, integers, enum members or
+                Label, Index and entity objects.
+
+            validate:
+                If True, check that each distinct value is a valid label.
+
+        Returns:
+            The list of paths as strings, one per row.
+
+        Raises:
+            ValueError:
+                A column is missing or invalid.
+        """
+        string_columns = self._get_columns(columns)
+        if validate:
+            for key, column in zip(self.keys, string_columns):
+                for value in set(column):
+                    if not is_valid_label(value):
+                        raise ValueError(f"Invalid value of entity {key}: {value!r}")
+        return list(map(self.format.format, *string_columns))
+
+    def render_paths(
+        self,
+        columns: Mapping[str, Sequence[Any]],
+        root: Optional[os.PathLike] = None,
+        validate: bool = True,
+    ) -> List[pathlib.Path]:
+        """
+        Render the paths of rows of entity values as pathlib.Path objects. See
+        render().
+
+        Args:
+            root:
+                An optional directory to which the paths are relative.
+        """
+        root = pathlib.Path(root) if root is not None else pathlib.Path()
+        return [root / path for path in self.render(columns, validate=validate)]
+
+    def parse(self, paths: Iterable[Any], strict: bool = True) -> Dict[str, List[str]]:
+        """
+        Parse paths rendered by this template back into columns of values.
+
+        Args:
+            paths:
+                The paths as strings or path-like objects. They may be absolute
+                or relative to any directory.
+
+            strict:
+                If True, raise an error for paths that do not match the
+                template. Otherwise they are skipped.
+
+        Returns:
+            A dict mapping each entity key to the list of its values, as
+            strings, in the order of the matching paths.
+
+        Raises:
+            ValueError:
+                A path does not match the template and strict is True.
+        """
+        search = self.pattern.search
+        keys = self.keys
+        columns = {key: [] for key in keys}
+        appends = [columns[key].append for key in keys]
+        for path in paths:
+            path = os.fspath(path)
+            if os.sep != PATH_SEPARATOR:
+                path = path.replace(os.sep, PATH_SEPARATOR)
+            match = search(path)
+            if match is None:
+                if strict:
+                    raise ValueError(f"{path} does not match {self}")
+                continue
+            values = match.group(*keys)
+            if len(keys) == 1:
+                # Match.group() returns a single value instead of a tuple.
+                values = (values,)
+            for append, value in zip(appends, values):
+                append(value)
+        return columns
+
+
+def _escape_format(text: str) -> str:
+    """
+    Escape the braces of literal text in a format string.
+    """
+    return text.replace("{", "{{").replace("}", "}}")
+
+
+@functools.lru_cache(maxsize=256)
+def get_path_template(
+    keys: Tuple[str, ...],
+    datatype: Optional[str] = None,
+    suffix: Optional[str] = None,
+    extension: Optional[str] = None,
+) -> PathTemplate:
+    """
+    Get a shared compiled PathTemplate instance. See PathTemplate.
+    """
+    return PathTemplate(keys, datatype=datatype, suffix=suffix, extension=extension)
@@ -0,0 +1,469 @@
+#!/usr/bin/env python3
+"""Header-only reader of NIfTI-1 and NIfTI-2 images."""
+
+import concurrent.futures
+import gzip
+import logging
+import math
+import struct
+import zlib
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+
+from .cache import LRUCache, get_cache
+from .exception import BIDSPathError
+from .path import PathArg, get_path
+
+LOGGER = logging.getLogger(__name__)
+
+
+# Sizes of the headers, which are also their first field.
+NIFTI1_HEADER_SIZE = 348
+NIFTI2_HEADER_SIZE = 540
+
+# Magic bytes of gzip streams.
+GZIP_MAGIC = b"\x1f\x8b"
+
+# Kinds of the data of NIfTI images in the cache.
+HEADER_CACHE_KIND = "nifti_header"
+ARRAY_CACHE_KIND = "nifti_array"
+
+# Size of the compressed chunks read from gzipped images.
+READ_CHUNK_SIZE = 1024
+
+# Map of NIfTI datatype codes to the type strings of the array interface (e.g.
+# numpy.dtype), without the byte order. RGB types are not supported.
+NIFTI_DATATYPES = {
+    2: "u1",
+    4: "i2",
+    8: "i4",
+    16: "f4",
+    32: "c8",
+    64: "f8",
+    256: "i1",
+    512: "u2",
+    768: "u4",
+    1024: "i8",
+    1280: "u8",
+    1536: "f16",
+    1792: "c16",
+    2048: "c32",
+}
+
+# Fields of the header at their offsets for each version. Descriptions are
+# decoded separately.
+_NIFTI1_FIELDS = (
+    (40, "8h", "dim"),
+    (70, "h", "datatype"),
+    (72, "h", "bitpix"),
+    (76, "8f", "pixdim"),
+    (108, "f", "vox_offset"),
+    (112, "f", "scl_slope"),
+    (116, "f", "scl_inter"),
+    (123, "B", "xyzt_units"),
+    (252, "h", "qform_code"),
+    (254, "h", "sform_code"),
+)
+_NIFTI2_FIELDS = (
+    (12, "h", "datatype"),
+    (14, "h", "bitpix"),
+    (16, "8q", "dim"),
+    (104, "8d", "pixdim"),
+    (168, "q", "vox_offset"),
+    (176, "d", "scl_slope"),
+    (184, "d", "scl_inter"),
+    (344, "i", "qform_code"),
+    (348, "i", "sform_code"),
+    (500, "i", "xyzt_units"),
+)
+_DESCRIP_OFFSETS = {1: 148, 2: 240}
+_DESCRIP_SIZE = 80
+
+
+class NiftiError(BIDSPathError):
+    """Exceptions raised when reading NIfTI headers."""
+
+
+class NiftiHeader(NamedTuple):
+    """
+    The decoded fields of a NIfTI header.
+
+    Attributes:
+        version:
+            The NIfTI version, 1 or 2.
+
+        byteorder:
+            The byte order of the file, "<" or ">".
+
+        shape:
+            The tuple of the dimensions of the image.
+
+        voxel_size:
+            The tuple of the voxel sizes along each dimension.
+
+        datatype:
+            The NIfTI datatype code.
+
+        bitpix:
+            The number of bits per voxel.
+
+        vox_offset:
+            The offset of the image data in the uncompressed file.
+
+        scl_slope:
+            The scaling slope of the data.
+
+        scl_inter:
+            The scaling intercept of the data.
+
+        xyzt_units:
+            The NIfTI code of the spatial and temporal units.
+
+        qform_code:
+            The NIfTI code of the qform transform.
+
+        sform_code:
+            The NIfTI code of the sform transform.
+
+        descrip:
+            The description string.
+    """
+
+    version: int
+    byteorder: str
+    shape: Tuple[int, ...]
+    voxel_size: Tuple[float, ...]
+    datatype: int
+    bitpix: int
+    vox_offset: int
+    scl_slope: float
+    scl_inter: float
+    xyzt_units: int
+    qform_code: int
+    sform_code: int
+    descrip: str
+
+    @property
+    def dtype(self) -> Optional[str]:
+        """
+        The type string of the voxels including the byte order, e.g. "<i2", or
+        None if the datatype is not supported.
+        """
+        typestr = NIFTI_DATATYPES.get(self.datatype)
+        if typestr is None:
+            return None
+        return f"{self.byteorder}{typestr}"
+
+
+def is_gzipped(path: PathArg) -> bool:
+    """
+    Check if a file is gzipped from its first bytes.
+    """
+    with get_path(path).open("rb") as handle:
+        return handle.read(len(GZIP_MAGIC)) == GZIP_MAGIC
+
+
+def read_prefix(path: PathArg, size: int) -> bytes:
+    """
+    Read the first bytes of a file, decompressing only as much of gzipped
+    files as necessary.
+
+    Args:
+        path:
+            The path to the file. Gzipped files are detected by their content.
+
+        size:
+            The number of bytes to read.
+
+    Returns:
+        The bytes, which may be fewer than requested if the file is shorter.
+    """
+    with get_path(path).open("rb") as handle:
+        data = handle.read(READ_CHUNK_SIZE)
+        if not data.startswith(GZIP_MAGIC):
+            if len(data) < size:
+                data += handle.read(size - len(data))
+            return data[:size]
+        decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16)
+        chunks = []
+        remaining = size
+        while remaining > 0 and data:
+            chunk = decompressor.decompress(data, remaining)
+            chunks.append(chunk)
+            remaining -= len(chunk)
+            data = decompressor.unconsumed_tail
+            if decompressor.eof:
+                # Continue with the next member of multi-member files.
+                data = decompressor.unused_data
+                decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16)
+            if not data:
+                data = handle.read(READ_CHUNK_SIZE)
+        return b"".join(chunks)
+
+
+def parse_nifti_header(data: bytes) -> NiftiHeader:
+    """
+    Decode a NIfTI-1 or NIfTI-2 header.
+
+    Args:
+        data:
+            The first bytes of the uncompressed file.
+
+    Returns:
+        The NiftiHeader instance.
+
+    Raises:
+        NiftiError:
+            The data is not a valid header.
+    """
+    for byteorder in "<>":
+        try:
+            (header_size,) = struct.unpack_from(f"{byteorder}i", data)
+        except struct.error as err:
+            raise NiftiError("The header is truncated.") from err
+        if header_size == NIFTI1_HEADER_SIZE:
+            version, fields = 1, _NIFTI1_FIELDS
+            break
+        if header_size == NIFTI2_HEADER_SIZE:
+            version, fields = 2, _NIFTI2_FIELDS
+            break
+    else:
+        raise NiftiError("The data does not start with a NIfTI header.")
+    if len(data) < header_size:
+        raise NiftiError(
+            f"The NIfTI-{version} header is truncated to {len(data)} bytes."
+        )
+
+    values = {}
+    for offset, fmt, name in fields:
+        value = struct.unpack_from(f"{byteorder}{fmt}", data, offset)
+        values[name] = value if len(value) > 1 else value[0]
+    ndim = values["dim"][0]
+    if not 0 <= ndim <= 7:
+        raise NiftiError(f"Invalid number of dimensions: {ndim}")
+    descrip_offset = _DESCRIP_OFFSETS[version]
+    descrip = data[descrip_offset : descrip_offset + _DESCRIP_SIZE]
+    return NiftiHeader(
+        version=version,
+        byteorder=byteorder,
+        shape=tuple(values["dim"][1 : ndim + 1]),
+        voxel_size=tuple(values["pixdim"][1 : ndim + 1]),
+        datatype=values["datatype"],
+        bitpix=values["bitpix"],
+        vox_offset=int(values["vox_offset"]),
+        scl_slope=values["scl_slope"],
+        scl_inter=values["scl_inter"],
+        xyzt_units=values["xyzt_units"],
+        qform_code=values["qform_code"],
+        sform_code=values["sform_code"],
+        descrip=descrip.split(b"\0", 1)[0].decode("latin-1"),
+    )
+
+
+def read_nifti_header(path: PathArg) -> NiftiHeader:
+    """
+    Read the header of a NIfTI image without reading the image data.
+
+    Args:
+        path:
+            The path to the .nii or .nii.gz file.
+
+    Returns:
+        The NiftiHeader instance.
+
+    Raises:
+        NiftiError:
+            The file could not be read or does not contain a valid header.
+    """
+    path = get_path(path)
+    try:
+        data = read_prefix(path, NIFTI2_HEADER_SIZE)
+    except (OSError, zlib.error) as err:
+        raise NiftiError(f"Failed to read {path}: {err}") from err
+    try:
+        return parse_nifti_header(data)
+    except NiftiError as err:
+        raise NiftiError(f"{path}: {err}") from err
+
+
+def load_nifti_header(path: PathArg, cache: Optional[LRUCache] = None) -> NiftiHeader:
+    """
+    Read the header of a NIfTI image through a cache so that it is read once
+    until the file changes. See read_nifti_header().
+
+    Args:
+        path:
+            The path to the .nii or .nii.gz file.
+
+        cache:
+            The LRUCache instance. If None, the shared cache is used.
+
+    Returns:
+        The NiftiHeader instance.
+    """
+    try:
+        return get_cache(cache).get_or_load(HEADER_CACHE_KIND, path, read_nifti_header)
+    except OSError as err:
+        raise NiftiError(f"Failed to read {get_path(path)}: {err}") from err
+
+
+def read_nifti_array(path: PathArg):
+    """
+    Read and decompress the voxels of a NIfTI image into memory.
+
+    This requires numpy.
+
+    Args:
+        path:
+            The path to the .nii or .nii.gz file.
+
+    Returns:
+        A read-only numpy array with the shape of the image in Fortran order
+        and the byte order of the file. The scaling given by scl_slope and
+        scl_inter is not applied.
+
+    Raises:
+        NiftiError:
+            The file could not be read or has an unsupported datatype.
+    """
+    try:
+        import numpy
+    except ImportError as err:
+        raise ImportError(
+            "Reading NIfTI voxels requires numpy: install the clinicaio[numpy] extra."
+        ) from err
+
+    path = get_path(path)
+    header = read_nifti_header(path)
+    if header.dtype is None:
+        raise NiftiError(f"{path} has an unsupported datatype: {header.datatype}")
+    try:
+        data = path.read_bytes()
+        if data.startswith(GZIP_MAGIC):
+            # Unlike zlib.decompress(), this reads all members of the file.
+            data = gzip.decompress(data)
+        array = numpy.frombuffer(
+            data,
+            dtype=header.dtype,
+            count=math.prod(header.shape),
+            offset=header.vox_offset,
+        )
+    except (OSError, EOFError, ValueError, zlib.error) as err:
+        raise NiftiError(f"Failed to read {path}: {err}") from err
+    return array.reshape(header.shape, order="F")
+
+
+def load_nifti_array(path: PathArg, cache: Optional[LRUCache] = None):
+    """
+    Read the voxels of a NIfTI image through a cache. See read_nifti_array().
+
+    Args:
+        path:
+            The path to the .nii or .nii.gz file.
+
+        cache:
+            The LRUCache instance. If None, the shared cache is used.
+
+    Returns:
+        The read-only numpy array, shared with other callers.
+    """
+    try:
+        return get_cache(cache).get_or_load(ARRAY_CACHE_KIND, path, read_nifti_array)
+    except OSError as err:
+        raise NiftiError(f"Failed to read {get_path(path)}: {err}") from err
+
+
+def memmap_nifti(path: PathArg, header: Optional[NiftiHeader] = None):
+    """
+    Map the voxels of an uncompressed NIfTI image into memory without reading
+    or copying them. Slicing the array only reads the accessed pages and
+    processes that map the same file share the operating system's page cache.
+
+    This requires numpy.
+
+    Args:
+        path:
+            The path to the .nii file.
+
+        header:
+            The header of the image, if already read.
+
+    Returns:
+        A read-only numpy.memmap with the shape of the image in Fortran order,
+        as stored in the file. The scaling given by scl_slope and scl_inter is
+        not applied.
+
+    Raises:
+        NiftiError:
+            The file is compressed, has an unsupported datatype or could not be
+            mapped.
+    """
+    try:
+        import numpy
+    except ImportError as err:
+        raise ImportError(
+            "Memory-mapping NIfTI images requires numpy: install the clinicaio[numpy] extra."
+        ) from err
+
+    path = get_path(path)
+    if header is None:
+        header = read_nifti_header(path)
+    if is_gzipped(path):
+        raise NiftiError(f"{path} is compressed and cannot be memory-mapped.")
+    dtype = header.dtype
+    if dtype is None:
+        raise NiftiError(f"{path} has an unsupported datatype: {header.datatype}")
+    try:
+        return numpy.memmap(
+            path,
+            dtype=dtype,
+            mode="r",
+            offset=header.vox_offset,
+            shape=header.shape,
+            order="F",
+        )
+    except (OSError, ValueError) as err:
+        raise NiftiError(f"Failed to map {path}: {err}") from err
+
+
+def read_nifti_headers(
+    paths: Iterable[PathArg],
+    max_workers: Optional[int] = None,
+    skip_errors: bool = False,
+    cache: Optional[LRUCache] = None,
+) -> List[Optional[NiftiHeader]]:
+    """
+    Read the headers of many NIfTI images on a thread pool.
+
+    Args:
+        paths:
+            The paths to the images.
+
+        max_workers:
+            The maximum number of files to read concurrently.
+
+        skip_errors:
+            If True, log errors and return None for the files that could not
+            be read instead of raising the first error.
+
+        cache:
+            The LRUCache instance. If None, the shared cache is used.
+
+    Returns:
+        The list of NiftiHeader instances, in the same order as the paths.
+
+    Raises:
+        NiftiError:
+            A file could not be read and skip_errors is False.
+    """
+
+    def read(path):
+        try:
+            return load_nifti_header(path, cache=cache)
+        except NiftiError as err:
+            if not skip_errors:
+                raise
+            LOGGER.warning("%s", err)
+            return None
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(read, paths))
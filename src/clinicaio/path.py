@@ -2,13 +2,17 @@
 """Path functions and classes."""
 
 import dataclasses
+import itertools
 import logging
 import pathlib
-from collections import OrderedDict
+import sys
+from collections.abc import Mapping
 from pathlib import Path
-from typing import Union, Optional, List
+from typing import Iterable, List, NamedTuple, Optional, Tuple, Union
 
 from .entities import Entity, EntityArg, EntityValue
+from .exception import BIDSPathError
+from .models.enum import Extension
 
 
 LOGGER = logging.getLogger(__name__)
@@ -21,12 +25,144 @@ KEY_DELIMITER = "-"
 COMPONENT_DELIMITER = "_"
 
 
+# Extension delimiter in filenames.
+EXTENSION_DELIMITER = "."
+
+
+class ParsedName(NamedTuple):
+    """
+    The components of a parsed filename.
+
+    Attributes:
+        entities:
+            The tuple of (key, value) pairs of the entities, in order. Keys are
+            interned and recognized keys are converted to Entity members.
+
+        suffix:
+            The shared suffix string, or None.
+
+        extensions:
+            The tuple of extensions, each starting with ".". Identical tuples
+            are shared between parsed names.
+
+        stem:
+            The part of the name before the extensions.
+    """
+
+    entities: Tuple[Tuple[str, str], ...]
+    suffix: Optional[str]
+    extensions: Tuple[str, ...]
+    stem: str
+
+
+# Caches of interned entity keys and suffixes, of extension tuples by
+# extension string, e.g. ".nii.gz", and of the shared extension tuples. These
+# have few distinct values so the caches remain small.
+_KEYS = {}
+_SUFFIXES = {}
+_EXTENSIONS = {}
+_EXTENSION_TUPLES = {}
+_new_tuple = tuple.__new__
+
+
+def _intern_key(key: str):
+    """
+    Intern an entity key and convert recognized keys to Entity members.
+    """
+    # Transform known keys into instances of Entity.
+    interned = _KEYS[key] = Entity.convert(sys.intern(key))
+    return interned
+
+
+def split_extensions(name: str):
+    """
+    Split a filename into its stem and its extensions. Unlike pathlib, all
+    extensions are removed from the stem, e.g. "sub-01_T1w.nii.gz" is split
+    into "sub-01_T1w" and (".nii", ".gz"). Leading dots are part of the stem.
+
+    Args:
+        name:
+            The filename.
+
+    Returns:
+        The stem and the tuple of extensions.
+    """
+    if name.startswith(EXTENSION_DELIMITER):
+        start = len(name) - len(name.lstrip(EXTENSION_DELIMITER))
+        index = name.find(EXTENSION_DELIMITER, start)
+    else:
+        index = name.find(EXTENSION_DELIMITER)
+    if index < 0:
+        return name, ()
+    extension = name[index:]
+    extensions = _EXTENSIONS.get(extension)
+    if extensions is None:
+        extensions = tuple(
+            f"{EXTENSION_DELIMITER}{ext}"
+            for ext in extension[1:].split(EXTENSION_DELIMITER)
+        )
+        extensions = _EXTENSIONS[extension] = _EXTENSION_TUPLES.setdefault(
+            extensions, extensions
+        )
+    return name[:index], extensions
+
+
+def parse_name(name: str) -> ParsedName:
+    """
+    Parse the entities, suffix and extensions of a filename.
+
+    Entities are "<key>-<value>" components delimited by "_". The suffix is
+    the final component, which has no key-value delimiter. If a component
+    without a key-value delimiter is followed by other components, they are all
+    kept in the suffix (e.g. "dataset_description").
+
+    Args:
+        name:
+            The filename, without any parent directory.
+
+    Returns:
+        The ParsedName instance.
+    """
+    stem, extensions = split_extensions(name)
+    entities = []
+    suffix = None
+    keys = _KEYS
+    components = stem.split(COMPONENT_DELIMITER)
+    for i, component in enumerate(components):
+        key, delimiter, value = component.partition(KEY_DELIMITER)
+        if not delimiter:
+            # Keep any remaining components in the suffix so that the name can
+            # be reconstructed, e.g. "dataset_description".
+            suffix = COMPONENT_DELIMITER.join(components[i:])
+            suffix = _SUFFIXES.get(suffix) or _SUFFIXES.setdefault(suffix, suffix)
+            break
+        entities.append((keys.get(key) or _intern_key(key), value))
+    # Bypass the Python-level constructor of the named tuple.
+    return _new_tuple(ParsedName, (tuple(entities), suffix, extensions, stem))
+
+
+def parse_names(names: Iterable[str]) -> List[ParsedName]:
+    """
+    Parse many filenames, e.g. from a directory listing or a manifest.
+
+    Args:
+        names:
+            An iterable over filenames.
+
+    Returns:
+        The list of ParsedName instances, in the same order as the names.
+    """
+    return list(map(parse_name, names))
+
+
 def get_path(path: "PathArg"):
     """
     Get the underlying Path object from a PathArg.
     """
     if isinstance(path, BIDSPath):
         return path.path
+    if isinstance(path, Path):
+        return path
     return Path(path)
 
 
@@ -46,47 +182,324 @@ def check_name(name):
         raise ValueError("Empty strings are not permitted.")
 
 
-@dataclasses.dataclass
+# Characters that are not allowed in entity keys and values because the
+# filename would not parse back to the same entities. Keys may contain dots,
+# e.g. the leading dot of ".bids-validator-config.json".
+_INVALID_KEY_CHARACTERS = frozenset(
+    (KEY_DELIMITER, COMPONENT_DELIMITER, "/", "\\", " ", "\t", "\n")
+)
+_INVALID_VALUE_CHARACTERS = (_INVALID_KEY_CHARACTERS - {KEY_DELIMITER}) | {
+    EXTENSION_DELIMITER
+}
+
+
+def check_entity(key, value):
+    """
+    Check an entity key and value.
+
+    Raises:
+        ValueError:
+            The key or value is invalid.
+    """
+    check_name(key)
+    if isinstance(value, str):
+        check_name(value)
+    # TODO: check if non-negativity is a criterion
+    elif isinstance(value, int):
+        if value < 0:
+            raise ValueError("Entity indices must be non-negative.")
+    else:
+        raise ValueError(
+            "Entity values must be either a valid string or a non-negative integer."
+        )
+
+
+def check_entity_characters(key, value):
+    """
+    Check that an entity key and value do not contain characters that would
+    prevent the filename from parsing back to the same entities. This is only
+    applied to entities set in code: names read from the filesystem are
+    accepted as they are so that scans do not fail on non-compliant names.
+
+    Raises:
+        ValueError:
+            The key or value contains an invalid character.
+    """
+    if any(char in key for char in _INVALID_KEY_CHARACTERS):
+        raise ValueError(f"Invalid entity key: {key!r}")
+    if isinstance(value, str) and any(
+        char in value for char in _INVALID_VALUE_CHARACTERS
+    ):
+        raise ValueError(f"Invalid value of entity {key}: {value!r}")
+
+
+# Cache of validated (key, value) pairs. Datasets contain few distinct pairs
+# relative to the number of paths so the pairs are shared between paths and
+# each one is only validated once.
+_ENTITY_PAIRS = {}
+
+# Pairs of _ENTITY_PAIRS that also passed check_entity_characters().
+_CHECKED_ENTITY_PAIRS = set()
+
+
+def intern_entity(key, value, strict: bool = True):
+    """
+    Get the shared instance of a validated (key, value) pair.
+
+    Args:
+        key:
+            The entity key.
+
+        value:
+            The entity value.
+
+        strict:
+            If True, also check the characters of the key and value with
+            check_entity_characters().
+
+    Raises:
+        ValueError:
+            The key or value is invalid.
+    """
+    pair = (key, value)
+    try:
+        shared = _ENTITY_PAIRS[pair]
+    except KeyError:
+        check_entity(key, value)
+        shared = _ENTITY_PAIRS.setdefault(pair, pair)
+    except TypeError as err:
+        raise ValueError(f"Invalid entity: {key}-{value}") from err
+    if strict and shared not in _CHECKED_ENTITY_PAIRS:
+        check_entity_characters(key, value)
+        _CHECKED_ENTITY_PAIRS.add(shared)
+    return shared
+
+
+def intern_extensions(extensions: Iterable[str]) -> Tuple[str, ...]:
+    """
+    Get the shared tuple of validated extensions.
+
+    Raises:
+        ValueError:
+            An extension does not start with ".".
+    """
+    extensions = tuple(extensions)
+    try:
+        return _EXTENSION_TUPLES[extensions]
+    except KeyError:
+        pass
+    if any(not ext.startswith(EXTENSION_DELIMITER) for ext in extensions):
+        raise ValueError('All extensions should start with ".".')
+    return _EXTENSION_TUPLES.setdefault(extensions, extensions)
+
+
+class EntityMap(Mapping):
+    """
+    Compact, immutable and ordered mapping of entity keys to values, stored as a
+    tuple of shared (key, value) pairs.
+    """
+
+    __slots__ = ("pairs",)
+
+    def __init__(
+        self, entities: Union[Mapping, Iterable[Tuple]] = (), strict: bool = True
+    ):
+        """
+        Args:
+            entities:
+                A mapping or an iterable of (key, value) pairs. The keys and
+                values are validated.
+
+            strict:
+                If False, skip the character checks of
+                check_entity_characters(), e.g. for entities parsed from names
+                on disk.
+
+        Raises:
+            ValueError:
+                A key or value is invalid.
+        """
+        if isinstance(entities, EntityMap):
+            pairs = entities.pairs
+        else:
+            if isinstance(entities, Mapping):
+                entities = entities.items()
+            pairs = tuple(
+                intern_entity(key, value, strict=strict) for key, value in entities
+            )
+            if len({key for key, _ in pairs}) != len(pairs):
+                raise ValueError("Entity keys must be unique.")
+        self.pairs: Tuple[Tuple[str, EntityValue], ...] = pairs
+
+    @classmethod
+    def from_pairs(cls, pairs: Tuple[Tuple[str, EntityValue], ...]):
+        """
+        Create an instance from a tuple of already validated pairs without
+        checking them.
+        """
+        entity_map = cls.__new__(cls)
+        entity_map.pairs = pairs
+        return entity_map
+
+    def __getitem__(self, key):
+        for pair_key, value in self.pairs:
+            if pair_key == key:
+                return value
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        for pair_key, value in self.pairs:
+            if pair_key == key:
+                return value
+        return default
+
+    def __contains__(self, key):
+        return any(pair_key == key for pair_key, _ in self.pairs)
+
+    def __iter__(self):
+        return (key for key, _ in self.pairs)
+
+    def __len__(self):
+        return len(self.pairs)
+
+    def items(self):
+        return self.pairs
+
+    def __eq__(self, other):
+        if isinstance(other, EntityMap):
+            return self.pairs == other.pairs
+        return super().__eq__(other)
+
+    def __hash__(self):
+        return hash(self.pairs)
+
+    def __repr__(self):
+        return f"{self.__class__.__qualname__}({dict(self.pairs)})"
+
+    def __reduce__(self):
+        return (self.__class__.from_pairs, (self.pairs,))
+
+
+# Fields that determine the filename of a BIDSPath, and those that determine
+# its path.
+_NAME_FIELDS = frozenset(("extensions", "entities", "suffix"))
+_PATH_FIELDS = _NAME_FIELDS | {"parent"}
+
+# Version of the paths of all BIDSPath instances. It changes when a field that
+# was used to compute a cached path is modified, which invalidates the cached
+# paths of the instance and of all its descendants at once. Cached paths are
+# thus checked with a single comparison instead of walking up the parents.
+_path_versions = itertools.count(1)
+_path_version = 0
+
+
+def _cache_field():
+    """
+    Create a dataclass field for lazily computed values of a BIDSPath.
+    """
+    return dataclasses.field(default=None, init=False, repr=False, compare=False)
+
+
+# Set attributes without invalidating cached values.
+_set_attribute = object.__setattr__
+
+
+@dataclasses.dataclass(slots=True)
 class BIDSPath:
     """
     BIDS path with parsed metadata.
+
+    Instances use slots, shared extension tuples and EntityMaps of shared
+    entity pairs to minimize their memory footprint.
     """
 
-    extensions: List[str]
-    entities: OrderedDict[str, Union[str, int]] = dataclasses.field(
-        default_factory=OrderedDict
-    )
+    extensions: Tuple[str, ...]
+    entities: EntityMap = dataclasses.field(default_factory=EntityMap)
     suffix: Optional[str] = None
     parent: Optional[Union["BIDSDirectory", pathlib.Path]] = None
 
+    # Lazily computed values. The filename is cleared when a field changes. The
+    # paths are stored with the value of _path_version at which they were
+    # computed and recomputed when it changes.
+    _name: Optional[str] = _cache_field()
+    _path: Optional[Tuple[int, pathlib.Path]] = _cache_field()
+    _relative_path: Optional[Tuple[int, pathlib.PurePath]] = _cache_field()
+
+    def __setattr__(self, name, value):
+        # Validate the fields on every assignment, not only in the constructor.
+        if name == "extensions":
+            value = intern_extensions(value)
+        elif name == "entities":
+            if not isinstance(value, EntityMap):
+                value = EntityMap(value)
+        elif name == "suffix":
+            if value is not None:
+                check_name(value)
+        _set_attribute(self, name, value)
+        if name in _PATH_FIELDS:
+            if name in _NAME_FIELDS:
+                _set_attribute(self, "_name", None)
+            # The cached values do not exist yet while the constructor runs.
+            path = getattr(self, "_path", None)
+            relative_path = getattr(self, "_relative_path", None)
+            if path is not None or relative_path is not None:
+                # Descendants only cache paths derived from the cached paths of
+                # this instance, so they are all invalidated.
+                global _path_version  # pylint: disable=global-statement
+                _path_version = next(_path_versions)
+                _set_attribute(self, "_path", None)
+                _set_attribute(self, "_relative_path", None)
+
     def __post_init__(self):
         """
-        Validate that the data is BIDS-compliant.
+        Validate that the data is BIDS-compliant. The fields are validated when
+        they are set.
         """
-        if any(not ext.startswith(".") for ext in self.extensions):
-            raise ValueError('All extensions should start with ".".')
-
         if not (self.entities or self.suffix):
             raise ValueError("BIDS paths must contain at least one entity or a suffix.")
 
-        if not isinstance(self.entities, OrderedDict):
-            self.entities = OrderedDict(self.entities)
+    @classmethod
+    def from_trusted_values(
+        cls,
+        extensions: Tuple[str, ...],
+        entities: EntityMap,
+        suffix: Optional[str],
+        parent: Optional[Union["BIDSDirectory", pathlib.Path]],
+        name: Optional[str] = None,
+    ):
+        """
+        Create an instance of this class without validating the values. This
+        is used to create paths from values that have already been validated,
+        e.g. when converting a path to a subclass.
 
-        for key, value in self.entities.items():
-            check_name(key)
-            if isinstance(value, str):
-                check_name(value)
-            # TODO: check if non-negativity is a criterion
-            elif isinstance(value, int):
-                if value < 0:
-                    raise ValueError("Entity indices must be non-negative.")
-            else:
-                raise ValueError(
-                    "Entity values must be either a valid string or a non-negative integer."
-                )
+        Args:
+            extensions:
+                A tuple of extensions returned by intern_extensions().
+
+            entities:
+                An EntityMap instance.
+
+            suffix:
+                A valid suffix, or None.
 
-        if self.suffix is not None:
-            check_name(self.suffix)
+            parent:
+                The parent, as for the constructor.
+
+            name:
+                The filename corresponding to the other values, if known.
+
+        Returns:
+            An instance of this class.
+        """
+        bids_path = cls.__new__(cls)
+        _set_attribute(bids_path, "extensions", extensions)
+        _set_attribute(bids_path, "entities", entities)
+        _set_attribute(bids_path, "suffix", suffix)
+        _set_attribute(bids_path, "parent", parent)
+        _set_attribute(bids_path, "_name", name)
+        _set_attribute(bids_path, "_path", None)
+        _set_attribute(bids_path, "_relative_path", None)
+        return bids_path
 
     def asdict(self):
         """
@@ -96,7 +509,7 @@ class BIDSPath:
             The shallow copy of dict of attributes that can be used to
             instantiate a new instance via unpacking.
         """
-        names = (field.name for field in dataclasses.fields(self))
+        names = (field.name for field in dataclasses.fields(self) if field.init)
         return {name: getattr(self, name) for name in names}
 
     @property
@@ -109,26 +522,75 @@ class BIDSPath:
         return None
 
     @property
-    def path(self):
+    def filename(self) -> str:
+        """
+        The filename of this path.
+        """
+        name = self._name
+        if name is None:
+            components = []
+            if self.entities:
+                components.append(
+                    COMPONENT_DELIMITER.join(
+                        KEY_DELIMITER.join((k, str(v)))
+                        for (k, v) in self.entities.items()
+                    )
+                )
+            if self.suffix:
+                components.append(self.suffix)
+
+            stem = COMPONENT_DELIMITER.join(components)
+            exts = "".join(self.extensions)
+            name = f"{stem}{exts}"
+            _set_attribute(self, "_name", name)
+        return name
+
+    @property
+    def path(self) -> pathlib.Path:
         """
-        The pathlib.Path object for this BIDSPath.
+        The pathlib.Path object for this BIDSPath. It is joined to the path of
+        the parent once and then cached.
         """
-        components = []
-        if self.entities:
-            components.append(
-                COMPONENT_DELIMITER.join(
-                    KEY_DELIMITER.join((k, str(v))) for (k, v) in self.entities.items()
-                )
-            )
-        if self.suffix:
-            components.append(self.suffix)
+        cached = self._path
+        if cached is not None and cached[0] == _path_version:
+            return cached[1]
+        version = _path_version
+        parent = self.parent
+        if parent:
+            path = get_path(parent) / self.filename
+        else:
+            path = pathlib.Path(self.filename)
+        _set_attribute(self, "_path", (version, path))
+        return path
 
-        stem = COMPONENT_DELIMITER.join(components)
-        exts = "".join(self.extensions)
-        name = f"{stem}{exts}"
-        if self.parent:
-            return get_path(self.parent) / name
-        return pathlib.Path(name)
+    @property
+    def anchor(self) -> Optional[pathlib.Path]:
+        """
+        The pathlib.Path at the top of the chain of parents, i.e. the directory
+        that contains the root of the dataset, or None if there is no parent.
+        """
+        node = self
+        while isinstance(node, BIDSPath):
+            node = node.parent
+        return node
+
+    @property
+    def relative_path(self) -> pathlib.PurePath:
+        """
+        The path relative to the anchor, e.g. "bids/sub-01/anat/sub-01_T1w.nii".
+        It is cached in the same way as the path.
+        """
+        cached = self._relative_path
+        if cached is not None and cached[0] == _path_version:
+            return cached[1]
+        version = _path_version
+        parent = self.parent
+        if isinstance(parent, BIDSPath):
+            path = parent.relative_path / self.filename
+        else:
+            path = pathlib.PurePath(self.filename)
+        _set_attribute(self, "_relative_path", (version, path))
+        return path
 
     def check(self):
         """
@@ -150,6 +612,7 @@ class BIDSPath:
         path: "PathArg",
         parent: Optional["BIDSDirectory"] = None,
         is_root: bool = False,
+        resolve: bool = False,
     ):
         """
         Create an instance of this class from a path and parent.
@@ -166,21 +629,37 @@ class BIDSPath:
                 If True, treat path as the root directory of a dataset and skip
                 entity checking. The filename's stem will be set to the suffix.
 
+            resolve:
+                If True and no parent is given, resolve symbolic links in the
+                path. Otherwise the path is only made absolute, which does not
+                require any filesystem access.
+
         Returns:
             An instance of this class.
         """
         path = get_path(path)
         if parent is None:
-            parent = path.resolve().parent
-        extensions = path.suffixes
+            parent = (path.resolve() if resolve else path.absolute()).parent
+        parsed = parse_name(path.name)
         if is_root:
             return cls(
-                extensions=extensions, entities={}, suffix=path.stem, parent=parent
+                extensions=parsed.extensions,
+                entities=EntityMap(),
+                suffix=parsed.stem,
+                parent=parent,
             )
 
-        entities, suffix = cls.get_entities_and_suffix(path)
-        return cls(
-            extensions=extensions, entities=entities, suffix=suffix, parent=parent
+        # The parser already returns valid, shared extension tuples so only the
+        # entities and suffix need to be validated. Names on disk are accepted
+        # even if they contain characters rejected in entities set in code.
+        entities = EntityMap(parsed.entities, strict=False)
+        suffix = parsed.suffix
+        if suffix is not None:
+            check_name(suffix)
+        elif not entities:
+            raise ValueError("BIDS paths must contain at least one entity or a suffix.")
+        return cls.from_trusted_values(
+            parsed.extensions, entities, suffix, parent, name=path.name
         )
 
     @classmethod
@@ -203,7 +682,14 @@ class BIDSPath:
         # not want to match subclasses.
         if type(bids_path) is cls:  # pylint: disable=unidiomatic-typecheck
             return bids_path
-        return cls(**bids_path.asdict())
+        # The values of existing instances have already been validated.
+        return cls.from_trusted_values(
+            bids_path.extensions,
+            bids_path.entities,
+            bids_path.suffix,
+            bids_path.parent,
+            name=bids_path.filename,
+        )
 
     @classmethod
     def get_entities_and_suffix(cls, path: pathlib.Path):
@@ -215,24 +701,10 @@ class BIDSPath:
                 The pathlib.Path object to parse.
 
         Returns:
-            The OrderedDict of entities and the suffix.
-        """
-        stem = path.stem
-        # Python dictionaries are not guaranteed to be ordered but this makes
-        # the intention explicit and guarantees retrocompatibility.
-        entities = OrderedDict()
-        for ent in stem.split(COMPONENT_DELIMITER):
-            # Try to split the entity. If it doesn't split into a key-value pair
-            # then it's the suffix, which mush appear as the final component.
-            try:
-                key, value = ent.split(KEY_DELIMITER, 1)
-            except ValueError:
-                return entities, ent
-            # Transform known keys into instances of BIDSKey.
-            key = Entity.convert(key)
-            entities[key] = value
-        # No suffix found.
-        return entities, None
+            The EntityMap of entities and the suffix.
+        """
+        parsed = parse_name(get_path(path).name)
+        return EntityMap(parsed.entities, strict=False), parsed.suffix
 
     def get_entity_value(self, entity: EntityArg):
         """
@@ -304,12 +776,17 @@ class BIDSPath:
 
     def resolve(self):
         """
-        Resolve the path (equivalent to pathlib.Path.resolve()).
+        Resolve the path (equivalent to pathlib.Path.resolve()). Symbolic
+        links are only resolved in the anchor, i.e. the pathlib.Path at the top
+        of the chain of parents.
         """
-        if self.parent:
-            self.parent.resolve()
-            return
-        self.parent = self.path.resolve().parent
+        parent = self.parent
+        if isinstance(parent, BIDSPath):
+            parent.resolve()
+        elif parent:
+            self.parent = parent.resolve()
+        else:
+            self.parent = self.path.resolve().parent
 
     def maybe_convert_child(self, bids_path: "BIDSPath"):
         """
@@ -340,14 +817,85 @@ class BIDSPath:
         Returns:
             The joined path as a BIDSPath or subclass thereof.
         """
-        my_type = type(self)
         value = get_path(value)
         child_path = self.path / value
+        return self.get_child(child_path, child_path.is_dir())
+
+    def get_child(self, path: "PathArg", is_dir: bool):
+        """
+        Create a child path of this path without accessing the filesystem. This
+        is used by the __div__ operator and by directory scans, which already
+        know the type of each child from the directory listing.
+
+        Args:
+            path:
+                The child path. Only its name is used to parse the entities.
+
+            is_dir:
+                True if the child path is a directory, else False.
+
+        Returns:
+            The child path as a BIDSPath or subclass thereof.
+        """
         # This handles BIDSDirectory instances without needing to know the type
         # here.
-        if child_path.is_dir():
-            return self.maybe_convert_child(my_type.from_path(child_path, parent=self))
-        return self.maybe_convert_child(BIDSPath.from_path(child_path, parent=self))
+        child_cls = type(self) if is_dir else BIDSPath
+        return self.maybe_convert_child(child_cls.from_path(path, parent=self))
+
+    @property
+    def metadata(self):
+        """
+        The metadata of this path from its JSON sidecars, merged according to
+        the inheritance principle. Each sidecar is parsed once and kept in a
+        shared cache. See the metadata module.
+        """
+        # Imported here because the metadata module depends on this one.
+        from .metadata import get_metadata
+
+        return get_metadata(self)
+
+    def read_nifti_header(self):
+        """
+        Read the header of this NIfTI image without reading the image data.
+        Only the first bytes of gzipped images are decompressed and headers are
+        kept in the shared cache.
+
+        Returns:
+            The NiftiHeader instance.
+
+        Raises:
+            BIDSPathError:
+                This path is not a NIfTI image or its header could not be read.
+        """
+        # Imported here because the nifti module depends on this one.
+        from .nifti import load_nifti_header
+
+        if "".join(self.extensions) not in (
+            Extension.NIFTI.value,
+            Extension.NIFTI_GZ.value,
+        ):
+            raise BIDSPathError(f"{self} is not a NIfTI image.")
+        return load_nifti_header(self.path)
+
+    def memmap_nifti(self):
+        """
+        Map the voxels of this uncompressed NIfTI image into memory. See
+        clinicaio.nifti.memmap_nifti().
+
+        Returns:
+            A read-only numpy.memmap.
+
+        Raises:
+            BIDSPathError:
+                This path is not an uncompressed NIfTI image or could not be
+                mapped.
+        """
+        # Imported here because the nifti module depends on this one.
+        from .nifti import memmap_nifti
+
+        if "".join(self.extensions) != Extension.NIFTI.value:
+            raise BIDSPathError(f"{self} is not an uncompressed NIfTI image.")
+        return memmap_nifti(self.path)
 
     @property
     def depth(self):
@@ -355,15 +903,9 @@ class BIDSPath:
         The depth of this path within a dataset's file hierarchy, or None if it
         is not part of one.
         """
-        parent = self.parent
-        if parent is None:
-            return None
-        if isinstance(parent, pathlib.Path):
-            return 0
-        depth = parent.depth
-        if depth is None:
+        if self.parent is None:
             return None
-        return depth + 1
+        return len(self.relative_path.parts) - 1
 
 
 PathArg = Union[str | Path | BIDSPath]
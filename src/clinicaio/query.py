@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""In-memory inverted index for querying paths by entity."""
+
+import logging
+from typing import Any, Dict, Iterable, List, Tuple
+
+from .directory import BIDSDirectory
+from .index import INDEX_PATH_SEPARATOR
+from .path import BIDSPath, parse_name
+
+LOGGER = logging.getLogger(__name__)
+
+
+# Query keys that do not correspond to entities.
+SUFFIX_KEY = "suffix"
+EXTENSION_KEY = "extension"
+DATATYPE_KEY = "datatype"
+
+
+def get_datatype(bids_path: BIDSPath):
+    """
+    Get the datatype of a path, i.e. the name of its parent directory if that
+    directory has no entities (e.g. "anat" or "dwi") and is not the root of the
+    dataset.
+
+    Args:
+        bids_path:
+            The path.
+
+    Returns:
+        The datatype as a string, or None if the path is not in a datatype
+        directory.
+    """
+    parent = bids_path.parent
+    if (
+        isinstance(parent, BIDSPath)
+        and isinstance(parent.parent, BIDSPath)
+        and not parent.entities
+    ):
+        return parent.suffix
+    return None
+
+
+def get_relative_path_datatype(relative_path: str):
+    """
+    Get the datatype of a path relative to the root of a dataset, with "/" as
+    the separator, e.g. the path of an IndexRecord. This follows the same rule
+    as get_datatype() without requiring BIDSPath instances.
+
+    Args:
+        relative_path:
+            The relative path.
+
+    Returns:
+        The datatype as a string, or None if the path is not in a datatype
+        directory.
+    """
+    parent, _, _ = relative_path.rpartition(INDEX_PATH_SEPARATOR)
+    if not parent:
+        return None
+    parsed = parse_name(parent.rpartition(INDEX_PATH_SEPARATOR)[2])
+    if parsed.entities:
+        return None
+    return parsed.suffix
+
+
+class _Posting:
+    """
+    The sorted IDs of the paths that share a value, with a lazily created set
+    for intersections.
+    """
+
+    __slots__ = ("ids", "_set")
+
+    def __init__(self):
+        self.ids = []
+        self._set = None
+
+    @property
+    def set(self):
+        """
+        The IDs as a frozenset.
+        """
+        if self._set is None:
+            self._set = frozenset(self.ids)
+        return self._set
+
+
+class QueryIndex:
+    """
+    Inverted index mapping entity values, suffixes, extensions and datatypes
+    to the paths that contain them. The index is built in a single pass over
+    the paths and queries do not access the filesystem.
+    """
+
+    def __init__(self, paths: Iterable[BIDSPath]):
+        """
+        Args:
+            paths:
+                The paths to index. Query results preserve the order of this
+                iterable.
+        """
+        self.paths: List[BIDSPath] = []
+        self._postings: Dict[Any, Dict[Any, _Posting]] = {}
+        self._files = _Posting()
+        self._int_values: Dict[Any, Dict[int, Tuple[Any, ...]]] = {}
+
+        postings = self._postings
+        for path_id, bids_path in enumerate(paths):
+            self.paths.append(bids_path)
+            items = list(bids_path.entities.items())
+            items.append((SUFFIX_KEY, bids_path.suffix))
+            items.append((EXTENSION_KEY, "".join(bids_path.extensions)))
+            if not isinstance(bids_path, BIDSDirectory):
+                self._files.ids.append(path_id)
+                items.append((DATATYPE_KEY, get_datatype(bids_path)))
+            for key, value in items:
+                if value is None:
+                    continue
+                by_value = postings.get(key)
+                if by_value is None:
+                    by_value = postings[key] = {}
+                posting = by_value.get(value)
+                if posting is None:
+                    posting = by_value[value] = _Posting()
+                posting.ids.append(path_id)
+        LOGGER.debug("Indexed %d paths for queries.", len(self.paths))
+
+    def __len__(self):
+        return len(self.paths)
+
+    def get_values(self, key) -> List[Any]:
+        """
+        Get the distinct values of an entity or other query key.
+
+        Args:
+            key:
+                The entity, or one of "suffix", "extension" or "datatype".
+
+        Returns:
+            The sorted list of values.
+        """
+        return sorted(self._postings.get(key, {}))
+
+    def _get_int_values(self, key):
+        """
+        Get a dict mapping integer values to the matching string values of a
+        key, e.g. 1 to ("1", "01").
+        """
+        try:
+            return self._int_values[key]
+        except KeyError:
+            pass
+        int_values = {}
+        for value in self._postings.get(key, {}):
+            try:
+                int_value = int(value)
+            except (TypeError, ValueError):
+                continue
+            int_values.setdefault(int_value, []).append(value)
+        int_values = {k: tuple(v) for k, v in int_values.items()}
+        self._int_values[key] = int_values
+        return int_values
+
+    def _get_postings(self, key, value):
+        """
+        Get the postings that match a value in a query.
+
+        Returns:
+            The list of matching postings, which should be combined by union.
+        """
+        by_value = self._postings.get(key, {})
+        if value is None:
+            return list(by_value.values())
+        if isinstance(value, (list, tuple, set, frozenset)):
+            return [
+                posting for item in value for posting in self._get_postings(key, item)
+            ]
+        if isinstance(value, int):
+            values = self._get_int_values(key).get(value, ())
+        else:
+            values = (value,)
+        return [by_value[v] for v in values if v in by_value]
+
+    def query_ids(self, include_dirs: bool = False, **entities) -> List[int]:
+        """
+        Get the IDs of the paths that match all of the given values. See
+        query().
+
+        Returns:
+            The sorted list of matching IDs.
+        """
+        candidates = []
+        for key, value in entities.items():
+            postings = self._get_postings(key, value)
+            if not postings:
+                return []
+            if len(postings) == 1:
+                candidates.append(postings[0])
+            else:
+                union = _Posting()
+                union.ids = sorted(set().union(*(p.ids for p in postings)))
+                candidates.append(union)
+        if not include_dirs:
+            candidates.append(self._files)
+        if not candidates:
+            return list(range(len(self.paths)))
+        candidates.sort(key=lambda posting: len(posting.ids))
+        smallest, *others = candidates
+        if not others:
+            return list(smallest.ids)
+        sets = [posting.set for posting in others]
+        return [
+            path_id
+            for path_id in smallest.ids
+            if all(path_id in id_set for id_set in sets)
+        ]
+
+    def query(self, include_dirs: bool = False, **entities) -> List[BIDSPath]:
+        """
+        Get the paths that match all of the given values.
+
+        Args:
+            include_dirs:
+                If True, include directories in the results.
+
+            **entities:
+                Values to match by entity (e.g. sub="001", run=1), or by
+                suffix, extension (e.g. ".nii.gz") or datatype (e.g. "anat").
+                Integer values match any integer-equivalent string, such as
+                "01" for 1. A list, tuple or set matches any of its values and
+                None matches any value of the entity.
+
+        Returns:
+            The list of matching paths, in indexed order.
+        """
+        paths = self.paths
+        return [paths[i] for i in self.query_ids(include_dirs=include_dirs, **entities)]
@@ -3,33 +3,322 @@
 Load and parse the BIDS schema.
 """
 
+import collections.abc
 import functools
 import importlib
-import importlib.resources
 import json
+import os
+import pathlib
+import pickle
+import struct
+import threading
+from typing import Any, Dict, Iterator, NamedTuple, Optional, Tuple, Union
 
+from .cachedir import get_cache_dir, get_path_digest, get_temporary_path
+from .exception import BIDSPathError
 
 THIS_PKG = __name__.rsplit(".", 1)[0]
 
+# Magic bytes of compiled schema files. Change the version when the layout
+# changes to recompile existing files.
+COMPILED_SCHEMA_MAGIC = b"CIOSCH01"
+
+# Length of the pickled header after the magic bytes.
+_HEADER_SIZE = struct.Struct("<Q")
+
+# Paths accepted by this module, which does not import .path to stay cheap to
+# import.
+SchemaPathArg = Union[str, os.PathLike]
+
+
+class SchemaError(BIDSPathError):
+    """Exceptions raised when loading the schema."""
+
+
+class EntityDefinition(NamedTuple):
+    """
+    An entity defined by the schema.
+
+    Attributes:
+        name:
+            The name of the entity in the schema, e.g. "subject".
+
+        key:
+            The key of the entity in filenames, e.g. "sub".
+
+        display_name:
+            The human-readable name of the entity, e.g. "Subject".
+
+        format:
+            The format of the values, e.g. "label" or "index".
+    """
+
+    name: str
+    key: str
+    display_name: str
+    format: str
+
+
+def get_default_schema_path() -> pathlib.Path:
+    """
+    Get the path to the schema in this package's resources.
+    """
+    # Imported here because it is slow to import and only needed without an
+    # explicit schema path.
+    import importlib.resources  # pylint: disable=import-outside-toplevel
+
+    resources = importlib.resources.files(f"{THIS_PKG}.resources")
+    return pathlib.Path(str(resources / "schema.json"))
+
+
+def get_entity_table(schema: Dict[str, Any]) -> Tuple[EntityDefinition, ...]:
+    """
+    Get the entities defined by a schema.
+
+    Args:
+        schema:
+            The schema data.
+
+    Returns:
+        The tuple of EntityDefinition instances in the order in which entities
+        appear in filenames.
+    """
+    definitions = schema.get("objects", {}).get("entities", {})
+    order = schema.get("rules", {}).get("entities") or list(definitions)
+    table = []
+    for name in order:
+        definition = definitions.get(name, {})
+        table.append(
+            EntityDefinition(
+                name,
+                definition.get("name", name),
+                definition.get("display_name", name),
+                definition.get("format", "label"),
+            )
+        )
+    return tuple(table)
+
+
+def compile_schema(schema: Dict[str, Any], path: SchemaPathArg, source_key: Tuple = ()):
+    """
+    Save a schema in the layout read by CompiledSchema: the magic bytes, the
+    length of a pickled header and the header, followed by each section of the
+    schema (i.e. top-level dict or list) pickled separately so that it can be
+    loaded on its own.
+
+    Args:
+        schema:
+            The schema data.
+
+        path:
+            The path of the file.
+
+        source_key:
+            A tuple that identifies the version of the source of the schema,
+            which CompiledSchema.open() compares to detect stale files.
+    """
+    path = pathlib.Path(path)
+    scalars = {}
+    sections = []
+    for name, value in schema.items():
+        if isinstance(value, (dict, list)):
+            sections.append((name, pickle.dumps(value, pickle.HIGHEST_PROTOCOL)))
+        else:
+            scalars[name] = value
+    offsets = {}
+    offset = 0
+    for name, data in sections:
+        offsets[name] = (offset, len(data))
+        offset += len(data)
+    header = pickle.dumps(
+        {
+            "source_key": tuple(source_key),
+            "scalars": scalars,
+            "sections": offsets,
+            "entities": get_entity_table(schema),
+        },
+        pickle.HIGHEST_PROTOCOL,
+    )
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Concurrent processes may compile the same schema.
+    tmp_path = get_temporary_path(path)
+    with tmp_path.open("wb") as handle:
+        handle.write(COMPILED_SCHEMA_MAGIC)
+        handle.write(_HEADER_SIZE.pack(len(header)))
+        handle.write(header)
+        for _name, data in sections:
+            handle.write(data)
+    tmp_path.replace(path)
+
+
+class CompiledSchema(collections.abc.Mapping):
+    """
+    Read-only mapping of the top-level fields of a compiled schema. The file
+    is read once but only its header is unpickled when it is opened. Each
+    section is unpickled on its first access.
+    """
+
+    def __init__(self, path: SchemaPathArg):
+        """
+        Args:
+            path:
+                The path of a file created by compile_schema().
+
+        Raises:
+            SchemaError:
+                The file is not a compiled schema.
+        """
+        self.path = pathlib.Path(path)
+        data = self.path.read_bytes()
+        start = len(COMPILED_SCHEMA_MAGIC) + _HEADER_SIZE.size
+        if data[: len(COMPILED_SCHEMA_MAGIC)] != COMPILED_SCHEMA_MAGIC:
+            raise SchemaError(f"{self.path} is not a compiled schema.")
+        try:
+            (header_size,) = _HEADER_SIZE.unpack_from(data, len(COMPILED_SCHEMA_MAGIC))
+            header = pickle.loads(data[start : start + header_size])
+        except (struct.error, pickle.UnpicklingError, EOFError) as err:
+            raise SchemaError(f"Failed to load {self.path}: {err}") from err
+        self._data = memoryview(data)[start + header_size :]
+        self.source_key = header["source_key"]
+        self.entities: Tuple[EntityDefinition, ...] = header["entities"]
+        self._scalars = header["scalars"]
+        self._offsets = header["sections"]
+        self._sections = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def open(cls, path: SchemaPathArg, source_key: Tuple) -> Optional["CompiledSchema"]:
+        """
+        Open a compiled schema if it exists and matches its source.
+
+        Args:
+            path:
+                The path of the file.
+
+            source_key:
+                The tuple that identifies the current version of the source.
+
+        Returns:
+            The CompiledSchema instance, or None if the file is missing,
+            invalid or stale.
+        """
+        try:
+            compiled = cls(path)
+        except (OSError, SchemaError, KeyError):
+            return None
+        if compiled.source_key != tuple(source_key):
+            return None
+        return compiled
+
+    def __repr__(self):
+        return f"{self.__class__.__qualname__}({self.path})"
+
+    def __len__(self):
+        return len(self._scalars) + len(self._offsets)
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self._scalars
+        yield from self._offsets
+
+    def __getitem__(self, key: str) -> Any:
+        try:
+            return self._scalars[key]
+        except KeyError:
+            pass
+        try:
+            return self._sections[key]
+        except KeyError:
+            pass
+        offset, size = self._offsets[key]
+        with self._lock:
+            if key not in self._sections:
+                self._sections[key] = pickle.loads(self._data[offset : offset + size])
+            return self._sections[key]
+
 
 class SchemaParser:
     """
     Parse schema data and generate corresponding code in this package.
+
+    The JSON schema is compiled into a file in the user's cache directory on
+    first use. Later instances, e.g. in other processes, open the compiled
+    file instead of parsing the JSON schema again, until the schema changes.
     """
 
+    def __init__(self, schema_path: Optional[SchemaPathArg] = None):
+        """
+        Args:
+            schema_path:
+                An optional path to a JSON schema. If None, the schema in this
+                package's resources is used.
+        """
+        self._schema_path = schema_path
+
     @functools.cached_property
-    def schema(self):
-        """
-        The schema data as a single object from this packages internal
-        resources.
-        """
-        resources_module = f'{THIS_PKG}.resources'
-        schema_path = importlib.resources.files(resources_module) / "schema.json"
-        with (
-            importlib.resources.as_file(schema_path) as schema_path,
-            schema_path.open("rb") as handle,
-        ):
-            return json.load(handle)
+    def schema_path(self) -> pathlib.Path:
+        """
+        The path to the JSON schema.
+        """
+        if self._schema_path is None:
+            try:
+                return get_default_schema_path()
+            except ModuleNotFoundError as err:
+                raise SchemaError(f"The schema resources are missing: {err}") from err
+        return pathlib.Path(self._schema_path)
+
+    def get_compiled_schema_path(self) -> pathlib.Path:
+        """
+        Get the path of the compiled schema in the user's cache directory.
+        """
+        return get_cache_dir() / "schema" / f"{get_path_digest(self.schema_path)}.bin"
+
+    def load_json(self) -> Dict[str, Any]:
+        """
+        Load the JSON schema.
+
+        Returns:
+            The schema data.
+
+        Raises:
+            SchemaError:
+                The schema could not be loaded.
+        """
+        try:
+            with self.schema_path.open("rb") as handle:
+                return json.load(handle)
+        except (OSError, ValueError) as err:
+            raise SchemaError(f"Failed to load {self.schema_path}: {err}") from err
+
+    @functools.cached_property
+    def schema(self) -> CompiledSchema:
+        """
+        The schema data as a read-only mapping whose sections are loaded on
+        first access.
+        """
+        try:
+            stat = self.schema_path.stat()
+        except OSError as err:
+            raise SchemaError(f"Failed to load {self.schema_path}: {err}") from err
+        source_key = (str(self.schema_path), stat.st_size, stat.st_mtime_ns)
+        compiled_path = self.get_compiled_schema_path()
+        compiled = CompiledSchema.open(compiled_path, source_key)
+        if compiled is None:
+            try:
+                compile_schema(self.load_json(), compiled_path, source_key)
+            except OSError as err:
+                raise SchemaError(
+                    f"Failed to compile {self.schema_path}: {err}"
+                ) from err
+            compiled = CompiledSchema(compiled_path)
+        return compiled
+
+    @property
+    def entities(self) -> Tuple[EntityDefinition, ...]:
+        """
+        The entities defined by the schema, in the order in which they appear
+        in filenames. This does not load any section of the schema.
+        """
+        return self.schema.entities
 
     @staticmethod
     def _get_submodule(submodule):
@@ -0,0 +1,382 @@
+#!/usr/bin/env python3
+"""Random access to the voxels of gzipped NIfTI images."""
+
+import logging
+import math
+import pathlib
+import struct
+import threading
+import zlib
+from array import array
+from typing import Optional
+
+from .cachedir import get_cache_dir, get_path_digest, get_temporary_path
+from .nifti import NiftiError, is_gzipped, read_nifti_header
+from .path import PathArg, get_path
+
+LOGGER = logging.getLogger(__name__)
+
+
+# Magic bytes of seek index files. Change the version to invalidate existing
+# files when the format changes.
+SEEK_INDEX_MAGIC = b"CIOSEEK1"
+
+# Header of seek index files after the magic bytes: source size, source
+# modification time, chunk size, number of chunks, uncompressed size and offset
+# of the chunk table.
+_SEEK_INDEX_HEADER = struct.Struct("<QqQQQQ")
+
+# Default size of the uncompressed chunks of seek index files.
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+# Size of the compressed blocks read from the source when building an index.
+_BUILD_READ_SIZE = 1 << 16
+
+
+def get_default_seek_index_path(path: PathArg) -> pathlib.Path:
+    """
+    Get the default location of the seek index of an image in the user's cache
+    directory.
+
+    Args:
+        path:
+            The path to the image.
+
+    Returns:
+        The path to the seek index file.
+    """
+    return get_cache_dir() / "seek" / f"{get_path_digest(get_path(path))}.idx"
+
+
+class SeekableNifti:
+    """
+    Random access to the uncompressed bytes of a NIfTI image.
+
+    Gzip streams can only be decompressed from the start. The standard zlib
+    module does not expose the block boundaries and bit-level state required to
+    resume decompression from an arbitrary point of the original stream, so on
+    first access the image is decompressed once into a seek index file of
+    independently compressed chunks with a table of their offsets. Subsequent
+    reads only decompress the chunks that overlap the requested range, whatever
+    their position in the image. The index is rebuilt when the size or
+    modification time of the image changes.
+
+    Uncompressed images are read directly.
+    """
+
+    def __init__(
+        self,
+        path: PathArg,
+        index_path: Optional[PathArg] = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        compression_level: int = 1,
+    ):
+        """
+        Args:
+            path:
+                The path to the .nii or .nii.gz image.
+
+            index_path:
+                The path to the seek index file. If None, the path returned by
+                get_default_seek_index_path() is used.
+
+            chunk_size:
+                The size of the uncompressed chunks of new index files. Smaller
+                chunks decompress less data per read but compress less.
+
+            compression_level:
+                The zlib compression level of the chunks of new index files.
+
+        Raises:
+            NiftiError:
+                The header of the image could not be read.
+        """
+        self.path = get_path(path)
+        self.header = read_nifti_header(self.path)
+        if index_path is None:
+            index_path = get_default_seek_index_path(self.path)
+        self.index_path = get_path(index_path)
+        self.chunk_size = chunk_size
+        self.compression_level = compression_level
+        self.is_compressed = is_gzipped(self.path)
+        self._lock = threading.Lock()
+        self._handle = None
+        self._offsets = None
+        self._data_offset = 0
+        self._index_chunk_size = chunk_size
+        self.size = None
+
+    def __repr__(self):
+        return f"{self.__class__.__qualname__}({self.path})"
+
+    def close(self):
+        """
+        Close the open files.
+        """
+        with self._lock:
+            if self._handle is not None:
+                self._handle.close()
+                self._handle = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_args):
+        self.close()
+
+    def _open(self):
+        """
+        Open the image or its seek index, building the index if necessary.
+        This must be called with the lock held.
+        """
+        if self._handle is not None:
+            return
+        if not self.is_compressed:
+            self._handle = self.path.open("rb")
+            self.size = self.path.stat().st_size
+            return
+        stat = self.path.stat()
+        if not self._load_index(stat):
+            self._build_index(stat)
+            if not self._load_index(stat):
+                raise NiftiError(f"Failed to build the seek index of {self.path}")
+
+    def _load_index(self, stat) -> bool:
+        """
+        Open the seek index file if it is valid for the current image.
+
+        Returns:
+            True if the index was opened, else False.
+        """
+        try:
+            handle = self.index_path.open("rb")
+        except FileNotFoundError:
+            return False
+        try:
+            prefix = handle.read(len(SEEK_INDEX_MAGIC) + _SEEK_INDEX_HEADER.size)
+            if not prefix.startswith(SEEK_INDEX_MAGIC):
+                raise ValueError("invalid magic bytes")
+            (
+                source_size,
+                source_mtime_ns,
+                chunk_size,
+                n_chunks,
+                size,
+                table_offset,
+            ) = _SEEK_INDEX_HEADER.unpack_from(prefix, len(SEEK_INDEX_MAGIC))
+            if (source_size, source_mtime_ns) != (stat.st_size, stat.st_mtime_ns):
+                LOGGER.debug("Discarding stale seek index %s", self.index_path)
+                handle.close()
+                return False
+            handle.seek(table_offset)
+            table_format = f"<{n_chunks + 1}Q"
+            table = handle.read(struct.calcsize(table_format))
+            offsets = array("Q", struct.unpack(table_format, table))
+        except (OSError, ValueError, struct.error) as err:
+            LOGGER.warning("Ignoring invalid seek index %s: %s", self.index_path, err)
+            handle.close()
+            return False
+        self._handle = handle
+        self._offsets = offsets
+        self._data_offset = len(prefix)
+        self._index_chunk_size = chunk_size
+        self.size = size
+        return True
+
+    def _build_index(self, stat):
+        """
+        Decompress the image into a new seek index file.
+        """
+        LOGGER.debug("Building seek index %s for %s", self.index_path, self.path)
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = get_temporary_path(self.index_path)
+        chunk_size = self.chunk_size
+        offsets = array("Q", [0])
+        size = 0
+        try:
+            with self.path.open("rb") as source, tmp_path.open("wb") as target:
+                target.write(SEEK_INDEX_MAGIC)
+                target.write(bytes(_SEEK_INDEX_HEADER.size))
+                buffer = bytearray()
+
+                def write_chunk(chunk):
+                    compressor = zlib.compressobj(
+                        self.compression_level, zlib.DEFLATED, -zlib.MAX_WBITS
+                    )
+                    data = compressor.compress(chunk) + compressor.flush()
+                    target.write(data)
+                    offsets.append(offsets[-1] + len(data))
+
+                decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16)
+                while True:
+                    data = source.read(_BUILD_READ_SIZE)
+                    if not data:
+                        break
+                    while data:
+                        buffer += decompressor.decompress(data)
+                        if decompressor.eof:
+                            # Continue with the next member of multi-member
+                            # files.
+                            data = decompressor.unused_data
+                            decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16)
+                        else:
+                            data = b""
+                    while len(buffer) >= chunk_size:
+                        write_chunk(bytes(buffer[:chunk_size]))
+                        del buffer[:chunk_size]
+                        size += chunk_size
+                if buffer:
+                    write_chunk(bytes(buffer))
+                    size += len(buffer)
+
+                table_offset = target.tell()
+                target.write(struct.pack(f"<{len(offsets)}Q", *offsets))
+                target.seek(len(SEEK_INDEX_MAGIC))
+                target.write(
+                    _SEEK_INDEX_HEADER.pack(
+                        stat.st_size,
+                        stat.st_mtime_ns,
+                        chunk_size,
+                        len(offsets) - 1,
+                        size,
+                        table_offset,
+                    )
+                )
+            tmp_path.replace(self.index_path)
+        except (OSError, zlib.error) as err:
+            tmp_path.unlink(missing_ok=True)
+            raise NiftiError(f"Failed to index {self.path}: {err}") from err
+
+    def read(self, offset: int, size: int) -> bytes:
+        """
+        Read bytes from the uncompressed image.
+
+        Args:
+            offset:
+                The offset in the uncompressed image, including the header.
+
+            size:
+                The number of bytes to read.
+
+        Returns:
+            The bytes, which may be fewer than requested at the end of the
+            image.
+        """
+        if offset < 0 or size < 0:
+            raise ValueError("The offset and size must be non-negative.")
+        with self._lock:
+            self._open()
+            handle = self._handle
+            end = min(offset + size, self.size)
+            if end <= offset:
+                return b""
+            if not self.is_compressed:
+                handle.seek(offset)
+                return handle.read(end - offset)
+            chunk_size = self._index_chunk_size
+            first = offset // chunk_size
+            last = (end - 1) // chunk_size
+            offsets = self._offsets
+            handle.seek(self._data_offset + offsets[first])
+            compressed = handle.read(offsets[last + 1] - offsets[first])
+        chunks = []
+        for i in range(first, last + 1):
+            start = offsets[i] - offsets[first]
+            stop = offsets[i + 1] - offsets[first]
+            chunks.append(zlib.decompress(compressed[start:stop], -zlib.MAX_WBITS))
+        data = b"".join(chunks)
+        start = offset - first * chunk_size
+        return data[start : start + end - offset]
+
+    @property
+    def itemsize(self) -> int:
+        """
+        The size of a voxel in bytes.
+
+        Raises:
+            NiftiError:
+                The voxels are not a whole number of bytes, e.g. 1-bit images.
+        """
+        bitpix = self.header.bitpix
+        if bitpix < 8 or bitpix % 8:
+            raise NiftiError(
+                f"Unsupported bit depth {bitpix} in {self.path}: random access "
+                "requires whole bytes per voxel."
+            )
+        return bitpix // 8
+
+    @property
+    def n_volumes(self) -> int:
+        """
+        The number of 3D volumes in the image.
+        """
+        return math.prod(self.header.shape[3:])
+
+    @property
+    def n_slices(self) -> int:
+        """
+        The number of 2D slices in each volume.
+        """
+        return math.prod(self.header.shape[2:3])
+
+    def _get_slice_size(self) -> int:
+        """
+        Get the size of a 2D slice in bytes.
+        """
+        return math.prod(self.header.shape[:2]) * self.itemsize
+
+    def _get_volume_size(self) -> int:
+        """
+        Get the size of a 3D volume in bytes.
+        """
+        return self._get_slice_size() * self.n_slices
+
+    def read_volume(self, t: int) -> bytes:
+        """
+        Read a 3D volume of a 4D image.
+
+        Args:
+            t:
+                The index of the volume.
+
+        Returns:
+            The raw voxels of the volume in the byte order of the file and
+            Fortran order, as stored on disk.
+
+        Raises:
+            IndexError:
+                The index is out of range.
+        """
+        if not 0 <= t < self.n_volumes:
+            raise IndexError(f"Volume {t} is out of range for {self}")
+        volume_size = self._get_volume_size()
+        return self.read(self.header.vox_offset + t * volume_size, volume_size)
+
+    def read_slab(self, z0: int, z1: int, t: int = 0) -> bytes:
+        """
+        Read consecutive 2D slices of a volume.
+
+        Args:
+            z0:
+                The index of the first slice.
+
+            z1:
+                The index after the last slice.
+
+            t:
+                The index of the volume.
+
+        Returns:
+            The raw voxels of the slices, as for read_volume().
+
+        Raises:
+            IndexError:
+                The indices are out of range.
+        """
+        if not 0 <= z0 <= z1 <= self.n_slices:
+            raise IndexError(f"Slices {z0}:{z1} are out of range for {self}")
+        if not 0 <= t < self.n_volumes:
+            raise IndexError(f"Volume {t} is out of range for {self}")
+        slice_size = self._get_slice_size()
+        offset = self.header.vox_offset + t * self._get_volume_size()
+        return self.read(offset + z0 * slice_size, (z1 - z0) * slice_size)
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""Deterministic assignment of dataset subtrees to workers."""
+
+import heapq
+import logging
+from typing import List, Optional, Sequence
+
+from .directory import BIDSDirectory
+from .index import INDEX_PATH_SEPARATOR, BIDSIndex
+
+LOGGER = logging.getLogger(__name__)
+
+
+# Ways of balancing the work of the shards.
+BALANCE_COUNT = "count"
+BALANCE_FILES = "files"
+BALANCE_BYTES = "bytes"
+BALANCE_MODES = (BALANCE_COUNT, BALANCE_FILES, BALANCE_BYTES)
+
+
+def check_rank(rank: int, world_size: int):
+    """
+    Check the rank of a worker and the number of workers.
+
+    Raises:
+        ValueError:
+            The values are invalid.
+    """
+    if world_size < 1:
+        raise ValueError(f"The world size must be positive: {world_size}")
+    if not 0 <= rank < world_size:
+        raise ValueError(f"The rank must be in [0, {world_size}): {rank}")
+
+
+def assign_shards(weights: Sequence[int], world_size: int) -> List[int]:
+    """
+    Assign weighted units of work to shards so that the total weights of the
+    shards are similar. The heaviest units are assigned first, each to the
+    currently lightest shard. The result only depends on the weights, so
+    workers that compute the same weights agree on the assignment. Equal
+    weights are assigned round-robin.
+
+    Args:
+        weights:
+            The weight of each unit.
+
+        world_size:
+            The number of shards.
+
+    Returns:
+        The list of shard indices of the units.
+    """
+    check_rank(0, world_size)
+    order = sorted(range(len(weights)), key=lambda i: (-weights[i], i))
+    loads = [(0, shard) for shard in range(world_size)]
+    assignment = [0] * len(weights)
+    for i in order:
+        load, shard = heapq.heappop(loads)
+        assignment[i] = shard
+        heapq.heappush(loads, (load + weights[i], shard))
+    return assignment
+
+
+def get_unit_weights(
+    units: Sequence[BIDSDirectory], balance: str, index: Optional[BIDSIndex] = None
+) -> List[int]:
+    """
+    Get the weights of units of work.
+
+    Args:
+        units:
+            The directories of the units, e.g. subjects or sessions.
+
+        balance:
+            "count" to give every unit the same weight, "files" to weight units
+            by their number of files or "bytes" to weight them by the total
+            size of their files.
+
+        index:
+            A BIDSIndex instance that contains the units. It is required to
+            weight the units by files or bytes, which would otherwise require
+            every worker to scan the whole dataset.
+
+    Returns:
+        The list of weights.
+
+    Raises:
+        ValueError:
+            The balance mode is invalid, or it requires an index and the index
+            is missing or does not contain the units.
+    """
+    if balance not in BALANCE_MODES:
+        raise ValueError(f"Invalid balance mode: {balance}")
+    if balance == BALANCE_COUNT:
+        return [1] * len(units)
+    use_bytes = balance == BALANCE_BYTES
+
+    if index is None:
+        raise ValueError(f'Balancing by "{balance}" requires an index.')
+    relpaths = [index.get_relative_path(unit.path) for unit in units]
+    if None in relpaths:
+        raise ValueError(f"Some units are not in {index}.")
+    weights_by_prefix = dict.fromkeys(relpaths, 0)
+    depths = {relpath.count(INDEX_PATH_SEPARATOR) + 1 for relpath in relpaths}
+    for record in index.iter_records():
+        if record.is_dir:
+            continue
+        parts = record.path.split(INDEX_PATH_SEPARATOR)
+        for depth in depths:
+            prefix = INDEX_PATH_SEPARATOR.join(parts[:depth])
+            if prefix in weights_by_prefix and len(parts) > depth:
+                weights_by_prefix[prefix] += record.size if use_bytes else 1
+    return [weights_by_prefix[relpath] for relpath in relpaths]
+
+
+def select_shard(
+    units: Sequence[BIDSDirectory],
+    rank: int,
+    world_size: int,
+    balance: str = BALANCE_COUNT,
+    index: Optional[BIDSIndex] = None,
+) -> List:
+    """
+    Select the units of work of a worker.
+
+    Args:
+        units:
+            The directories of all units, in a deterministic order.
+
+        rank:
+            The index of the worker, in [0, world_size).
+
+        world_size:
+            The number of workers.
+
+        balance:
+            The balance mode. See get_unit_weights().
+
+        index:
+            A BIDSIndex instance, which is required to balance by files or
+            bytes. See get_unit_weights().
+
+    Returns:
+        The list of units of the worker, in their original order.
+    """
+    check_rank(rank, world_size)
+    weights = get_unit_weights(units, balance, index=index)
+    assignment = assign_shards(weights, world_size)
+    LOGGER.debug(
+        "Shard %d/%d: %d of %d units",
+        rank,
+        world_size,
+        assignment.count(rank),
+        len(units),
+    )
+    return [unit for unit, shard in zip(units, assignment) if shard == rank]
@@ -6,9 +6,16 @@ import json
 import logging
 
 
+from ..availability import IMAGE_EXTENSIONS, AvailabilityMatrix
 from ..directory import BIDSDirectory
 from ..entities import Entity
 from ..exception import BIDSPathError
+from ..index import INDEX_PATH_SEPARATOR, BIDSIndex, IndexRecord
+from ..inventory import create_shared_inventory, open_inventory, save_inventory
+from ..path import parse_name
+from ..query import QueryIndex
+from ..shard import BALANCE_COUNT, select_shard
+from ..tsv import Table, load_tables, read_tsv
 from .subject import BIDSSubject
 
 
@@ -39,6 +46,284 @@ class BIDSDataset(BIDSDirectory):
         except (OSError, json.JSONDecodeError) as err:
             raise BIDSDatasetError(err) from err
 
+    def use_index(self, index_path=None, refresh: bool = True):
+        """
+        Open a persistent index of this dataset and use it to list directories.
+        Subsequent listings, such as those of the subjects property,
+        get_children_by_entity() and recurse_directory(), are then answered
+        from the index without accessing the filesystem.
+
+        Args:
+            index_path:
+                The path to the SQLite file of the index. It may be inside the
+                dataset or in a cache directory. If None, a file in the user's
+                cache directory is used.
+
+            refresh:
+                If True, update the index with the current state of the
+                dataset. Only the directories that have changed since the last
+                refresh are listed.
+
+        Returns:
+            The BIDSIndex instance.
+        """
+        if self.index is not None:
+            self.index.close()
+        self.index = BIDSIndex(self.path, index_path=index_path)
+        if refresh:
+            self.index.refresh()
+        return self.index
+
+    def refresh(self):
+        """
+        Clear the data cached on this instance, including the dataset
+        description and the query index, and refresh the index if one is used.
+        """
+        super().refresh()
+        for name in ("dataset_description", "query_index"):
+            self.__dict__.pop(name, None)
+        if self.index is not None:
+            self.index.refresh()
+
+    @functools.cached_property
+    def query_index(self):
+        """
+        The QueryIndex of all paths in this dataset, built in a single
+        traversal on first access.
+        """
+        return QueryIndex(self.recurse_directory())
+
+    def query(self, include_dirs: bool = False, **entities):
+        """
+        Get the paths in this dataset that match all of the given entity values,
+        without accessing the filesystem after the first query.
+
+        Args:
+            include_dirs:
+                If True, include directories in the results.
+
+            **entities:
+                Values to match by entity (e.g. sub="001", ses="M000", run=1), or
+                by suffix, extension (e.g. ".nii.gz") or datatype (e.g. "anat").
+                See QueryIndex.query() for details.
+
+        Returns:
+            The list of matching instances of BIDSPath or subclasses thereof, in
+            the order of recurse_directory().
+        """
+        return self.query_index.query(include_dirs=include_dirs, **entities)
+
+    def iter_inventory_records(self):
+        """
+        Iterate over the records of all paths in this dataset, from the index
+        if one is used (see use_index()) and otherwise by scanning the
+        dataset. As in the index, paths that cannot be stat'ed, e.g. dangling
+        symbolic links or files removed during the scan, are skipped with a
+        warning.
+
+        Returns:
+            A generator over IndexRecord instances, in the order of
+            recurse_directory().
+        """
+        index = self.get_index()
+        if index is not None and index.get_relative_path(self.path) == "":
+            yield from index.iter_records()
+            return
+        root = self.path
+        for bids_path in self.recurse_directory():
+            path = bids_path.path
+            try:
+                stat = path.stat()
+            except OSError:
+                LOGGER.warning("Failed to stat %s", path)
+                continue
+            parsed = parse_name(path.name)
+            yield IndexRecord(
+                INDEX_PATH_SEPARATOR.join(path.relative_to(root).parts),
+                isinstance(bids_path, BIDSDirectory),
+                tuple(parsed.entities),
+                parsed.suffix,
+                "".join(parsed.extensions),
+                stat.st_size,
+                stat.st_mtime_ns,
+            )
+
+    def freeze_inventory(self, path=None):
+        """
+        Freeze the paths of this dataset into an Inventory that worker
+        processes can share without copying or scanning. The inventory can be
+        passed to the workers, e.g. as an attribute of a PyTorch Dataset,
+        because pickling it only pickles a reference to its storage.
+
+        Args:
+            path:
+                An optional path of a file in which the inventory is saved and
+                which is then mapped into memory. If None, the inventory is
+                created in shared memory and must be removed with
+                unlink_inventory() when it is no longer needed.
+
+        Returns:
+            The Inventory instance.
+        """
+        records = self.iter_inventory_records()
+        if path is None:
+            return create_shared_inventory(self.path, records)
+        save_inventory(self.path, records, path)
+        return open_inventory(path)
+
+    def get_availability(self, extensions=IMAGE_EXTENSIONS) -> AvailabilityMatrix:
+        """
+        Get the modalities available in each session of each subject, from
+        the index if one is used (see use_index()) and otherwise from a single
+        traversal of the dataset.
+
+        Args:
+            extensions:
+                The extensions of the files to count, or None to count all
+                files.
+
+        Returns:
+            The AvailabilityMatrix instance.
+        """
+        return AvailabilityMatrix(self.iter_inventory_records(), extensions=extensions)
+
+    def get_shard_units(self, split_sessions: bool = False):
+        """
+        Get the units of work distributed by shard().
+
+        Args:
+            split_sessions:
+                If True, the units are sessions, except for subjects without
+                sessions. Otherwise the units are subjects.
+
+        Returns:
+            The list of BIDSSubject or BIDSSession instances, sorted by label.
+        """
+        units = []
+        for _sub, subject in sorted(self.subjects.items()):
+            sessions = subject.sessions if split_sessions else None
+            if sessions:
+                units.extend(session for _ses, session in sorted(sessions.items()))
+            else:
+                units.append(subject)
+        return units
+
+    def shard(
+        self,
+        rank: int,
+        world_size: int,
+        balance: str = BALANCE_COUNT,
+        split_sessions: bool = False,
+    ):
+        """
+        Get the subjects or sessions processed by one of several workers. All
+        workers get disjoint shards that cover the dataset, and a worker can
+        then scan only its own subtrees, e.g. with recurse_directory().
+
+        Args:
+            rank:
+                The index of the worker, in [0, world_size).
+
+            world_size:
+                The number of workers.
+
+            balance:
+                "count" to balance the number of units per worker, "files" to
+                balance the number of files or "bytes" to balance their total
+                size. The last two require an index (see use_index()) so
+                that workers do not all scan the whole dataset.
+
+            split_sessions:
+                If True, the sessions of a subject may be assigned to different
+                workers.
+
+        Returns:
+            The list of BIDSSubject or BIDSSession instances of the worker,
+            sorted by label.
+        """
+        return select_shard(
+            self.get_shard_units(split_sessions=split_sessions),
+            rank,
+            world_size,
+            balance=balance,
+            index=self.get_index(),
+        )
+
+    @property
+    def participants_tsv_path(self):
+        """
+        The path to the participants.tsv file.
+        """
+        return self.path / "participants.tsv"
+
+    def read_participants_tsv(self, dtypes=None):
+        """
+        Stream the rows of the participants.tsv file.
+
+        Args:
+            dtypes:
+                Passed through to read_tsv().
+
+        Returns:
+            A generator over dicts mapping column names to values.
+        """
+        return read_tsv(self.participants_tsv_path, dtypes=dtypes)
+
+    def load_sessions_tables(self, max_workers=None, dtypes=None, cache=None) -> Table:
+        """
+        Load the sessions files of all subjects in parallel.
+
+        Args:
+            max_workers:
+                The maximum number of files to read concurrently.
+
+            dtypes:
+                Passed through to read_tsv().
+
+            cache:
+                The LRUCache instance used to load the files. If None, the
+                shared cache is used.
+
+        Returns:
+            A Table keyed by the subject label and the session label from the
+            session_id column.
+        """
+        paths = {
+            (label, None): subject.sessions_tsv_path
+            for label, subject in sorted(self.subjects.items())
+        }
+        return load_tables(
+            paths,
+            max_workers=max_workers,
+            dtypes=dtypes,
+            session_column="session_id",
+            cache=cache,
+        )
+
+    def load_scans_tables(self, max_workers=None, dtypes=None, cache=None) -> Table:
+        """
+        Load the scans files of all sessions in parallel.
+
+        Args:
+            max_workers:
+                The maximum number of files to read concurrently.
+
+            dtypes:
+                Passed through to read_tsv().
+
+            cache:
+                The LRUCache instance used to load the files. If None, the
+                shared cache is used.
+
+        Returns:
+            A Table keyed by subject and session labels.
+        """
+        paths = {}
+        for sub, subject in sorted(self.subjects.items()):
+            for ses, session in sorted(subject.sessions.items()):
+                paths[(sub, ses)] = session.scans_tsv_path
+        return load_tables(paths, max_workers=max_workers, dtypes=dtypes, cache=cache)
+
     @property
     def name(self) -> str:
         """
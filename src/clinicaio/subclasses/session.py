@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""BIDS session class and functions."""
+
+from ..directory import BIDSDirectory
+from ..path import BIDSPath
+from ..tsv import read_tsv
+
+
+class BIDSSession(BIDSDirectory):
+    """
+    BIDS session.
+    """
+
+    @property
+    def scans_tsv_path(self):
+        """
+        The path to this session's scans file, e.g.
+        sub-01/ses-M000/sub-01_ses-M000_scans.tsv.
+        """
+        parent = self.parent
+        prefix = f"{parent.filename}_" if isinstance(parent, BIDSPath) else ""
+        return self.path / f"{prefix}{self.filename}_scans.tsv"
+
+    def read_scans_tsv(self, dtypes=None):
+        """
+        Stream the rows of this session's scans file.
+
+        Args:
+            dtypes:
+                Passed through to read_tsv().
+
+        Returns:
+            A generator over dicts mapping column names to values.
+        """
+        return read_tsv(self.scans_tsv_path, dtypes=dtypes)
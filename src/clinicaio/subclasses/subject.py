@@ -2,9 +2,34 @@
 """BIDS subject class and functions."""
 
 from ..directory import BIDSDirectory
+from ..entities import Entity
+from ..tsv import read_tsv
+from .session import BIDSSession
 
 
 class BIDSSubject(BIDSDirectory):
     """
     BIDS subject.
     """
+
+    SUBCLASSES_BY_ENTITY = {Entity.SESSION: BIDSSession}
+
+    @property
+    def sessions_tsv_path(self):
+        """
+        The path to this subject's sessions file, e.g. sub-01/sub-01_sessions.tsv.
+        """
+        return self.path / f"{self.filename}_sessions.tsv"
+
+    def read_sessions_tsv(self, dtypes=None):
+        """
+        Stream the rows of this subject's sessions file.
+
+        Args:
+            dtypes:
+                Passed through to read_tsv().
+
+        Returns:
+            A generator over dicts mapping column names to values.
+        """
+        return read_tsv(self.sessions_tsv_path, dtypes=dtypes)
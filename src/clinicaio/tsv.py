@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""Readers for the tabular files of BIDS datasets."""
+
+import concurrent.futures
+import csv
+import logging
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Mapping, Optional
+
+from .cache import LRUCache, get_cache
+from .entities import Entity
+from .exception import BIDSPathError
+from .path import KEY_DELIMITER, PathArg, get_path
+
+LOGGER = logging.getLogger(__name__)
+
+
+# Value of missing data in BIDS tabular files.
+NA_VALUE = "n/a"
+
+# Delimiter of BIDS tabular files.
+TSV_DELIMITER = "\t"
+
+# Kind of the rows of tabular files in the cache.
+TSV_CACHE_KIND = "tsv"
+
+
+class TSVError(BIDSPathError):
+    """Exceptions raised when reading tabular files."""
+
+
+def read_tsv(
+    path: PathArg,
+    dtypes: Optional[Mapping[str, Callable[[str], Any]]] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Stream the rows of a tabular file.
+
+    Args:
+        path:
+            The path to the file.
+
+        dtypes:
+            An optional dict mapping column names to functions that convert the
+            string values of the column, e.g. int or float. Values are not
+            guessed from their content so other columns keep their string
+            values, e.g. identifiers such as "001". Missing values ("n/a") are
+            always None.
+
+    Returns:
+        A generator over dicts mapping column names to values.
+
+    Raises:
+        TSVError:
+            The file could not be read.
+    """
+    path = get_path(path)
+    dtypes = dtypes or {}
+    LOGGER.debug("Reading %s", path)
+    try:
+        with path.open(encoding="utf-8", newline="") as handle:
+            reader = csv.reader(handle, delimiter=TSV_DELIMITER)
+            try:
+                header = next(reader)
+            except StopIteration:
+                return
+            # Ignore empty column names caused by trailing delimiters.
+            while header and not header[-1]:
+                header.pop()
+            converters = [dtypes.get(name, str) for name in header]
+            for values in reader:
+                if not values:
+                    continue
+                row = {}
+                for name, converter, value in zip(header, converters, values):
+                    if value == NA_VALUE or value == "":
+                        row[name] = None
+                    else:
+                        row[name] = converter(value)
+                for name in header[len(values) :]:
+                    row[name] = None
+                yield row
+    except (OSError, UnicodeDecodeError, csv.Error, ValueError) as err:
+        raise TSVError(f"Failed to read {path}: {err}") from err
+
+
+def _read_tsv_rows(path, dtypes_key):
+    """
+    Read all rows of a tabular file into a list.
+    """
+    return list(read_tsv(path, dtypes=dict(dtypes_key)))
+
+
+def load_tsv(
+    path: PathArg,
+    dtypes: Optional[Mapping[str, Callable[[str], Any]]] = None,
+    cache: Optional[LRUCache] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Read all rows of a tabular file through a cache so that the file is read
+    once until it changes.
+
+    Args:
+        path:
+            The path to the file.
+
+        dtypes:
+            Passed through to read_tsv(). The functions must be hashable.
+
+        cache:
+            The LRUCache instance. If None, the shared cache is used.
+
+    Returns:
+        The list of rows as returned by read_tsv(). It is shared with other
+        callers and must not be modified.
+
+    Raises:
+        TSVError:
+            The file could not be read.
+    """
+    dtypes_key = tuple(sorted(dtypes.items())) if dtypes else ()
+    try:
+        return get_cache(cache).get_or_load(
+            TSV_CACHE_KIND, path, _read_tsv_rows, dtypes_key
+        )
+    except OSError as err:
+        raise TSVError(f"Failed to read {get_path(path)}: {err}") from err
+
+
+class Table:
+    """
+    Columnar table of the rows of many tabular files, keyed by subject and
+    session labels.
+
+    Attributes:
+        columns:
+            A dict mapping column names to lists of values. All lists have one
+            item per row, with None for missing values.
+
+        keys:
+            The list of (subject, session) keys of the rows. The session is None
+            for tables without sessions.
+    """
+
+    def __init__(self):
+        self.columns: Dict[str, List[Any]] = {}
+        self.keys: List[tuple] = []
+        self._rows_by_key: Dict[tuple, List[int]] = {}
+
+    def __len__(self):
+        return len(self.keys)
+
+    def extend(self, key: tuple, rows: Iterable[Dict[str, Any]]):
+        """
+        Append rows to the table.
+
+        Args:
+            key:
+                The (subject, session) key of the rows.
+
+            rows:
+                An iterable over rows, as returned by read_tsv().
+        """
+        columns = self.columns
+        for row in rows:
+            n_rows = len(self.keys)
+            for name, value in row.items():
+                column = columns.get(name)
+                if column is None:
+                    column = columns[name] = [None] * n_rows
+                column.append(value)
+            self.keys.append(key)
+            self._rows_by_key.setdefault(key, []).append(n_rows)
+            for column in columns.values():
+                if len(column) == n_rows:
+                    column.append(None)
+
+    def get_row_indices(self, sub: Optional[str] = None, ses: Optional[str] = None):
+        """
+        Get the indices of the rows of a subject or session.
+
+        Args:
+            sub:
+                The subject label. If None, match all subjects.
+
+            ses:
+                The session label. If None, match all sessions.
+
+        Returns:
+            The sorted list of row indices.
+        """
+        if sub is not None and ses is not None:
+            return list(self._rows_by_key.get((sub, ses), ()))
+        return [
+            i
+            for i, (row_sub, row_ses) in enumerate(self.keys)
+            if (sub is None or row_sub == sub) and (ses is None or row_ses == ses)
+        ]
+
+    def get_rows(self, sub: Optional[str] = None, ses: Optional[str] = None):
+        """
+        Get the rows of a subject or session as dicts. See get_row_indices().
+        """
+        columns = self.columns
+        return [
+            {name: column[i] for name, column in columns.items()}
+            for i in self.get_row_indices(sub=sub, ses=ses)
+        ]
+
+
+def load_tables(
+    paths_by_key: Mapping[tuple, PathArg],
+    max_workers: Optional[int] = None,
+    dtypes: Optional[Mapping[str, Callable[[str], Any]]] = None,
+    session_column: Optional[str] = None,
+    cache: Optional[LRUCache] = None,
+) -> Table:
+    """
+    Load many tabular files in parallel into a single table. Missing files are
+    skipped.
+
+    Args:
+        paths_by_key:
+            A dict mapping (subject, session) keys to the paths of the files.
+            The rows of the table follow the order of this dict.
+
+        max_workers:
+            The maximum number of files to read concurrently.
+
+        dtypes:
+            Passed through to read_tsv().
+
+        session_column:
+            An optional column with the session of each row, such as the
+            session_id column of sessions files. If given, the session label
+            of the key of each row is taken from this column instead.
+
+        cache:
+            The LRUCache instance used to load the files. If None, the shared
+            cache is used.
+
+    Returns:
+        The Table instance.
+    """
+
+    def load(path):
+        path = get_path(path)
+        if not path.is_file():
+            LOGGER.debug("Skipping missing file %s", path)
+            return []
+        return load_tsv(path, dtypes=dtypes, cache=cache)
+
+    table = Table()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for key, rows in zip(paths_by_key, executor.map(load, paths_by_key.values())):
+            if session_column is None:
+                table.extend(key, rows)
+                continue
+            sub = key[0]
+            for row in rows:
+                ses = row.get(session_column)
+                if isinstance(ses, str):
+                    ses = ses.removeprefix(f"{Entity.SESSION}{KEY_DELIMITER}")
+                table.extend((sub, ses), (row,))
+    return table
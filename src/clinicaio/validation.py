@@ -0,0 +1,434 @@
+#!/usr/bin/env python3
+"""Parallel validation of directory trees with cached results."""
+
+import concurrent.futures
+import hashlib
+import json
+import logging
+import os
+import pathlib
+import sqlite3
+import threading
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from .cachedir import get_cache_dir
+from .directory import BIDSDirectory
+from .exception import BIDSPathError
+from .path import BIDSPath, PathArg, get_path
+
+LOGGER = logging.getLogger(__name__)
+
+
+# Version of the format of the validation cache. Increment this when the schema
+# changes to discard caches of older formats.
+VALIDATION_CACHE_FORMAT_VERSION = 2
+
+
+class ValidationError(BIDSPathError):
+    """
+    Exception raised when a validation finds violations.
+
+    Attributes:
+        report:
+            The ValidationReport instance.
+    """
+
+    def __init__(self, report: "ValidationReport"):
+        self.report = report
+        first = report.violations[0]
+        super().__init__(
+            f"{len(report.violations)} violation(s), first in {first.path}: "
+            f"{first.message}"
+        )
+
+
+class Violation(NamedTuple):
+    """
+    A failed check of a path.
+
+    Attributes:
+        path:
+            The pathlib.Path of the checked path.
+
+        error_type:
+            The name of the class of the exception raised by the check, e.g.
+            "BIDSPathError".
+
+        message:
+            The message of the exception.
+    """
+
+    path: pathlib.Path
+    error_type: str
+    message: str
+
+
+class ValidationReport(NamedTuple):
+    """
+    The result of the validation of a directory tree.
+
+    Attributes:
+        violations:
+            The list of Violation instances, in the order of
+            recurse_directory().
+
+        n_paths:
+            The number of validated paths.
+
+        n_checked:
+            The number of paths that were checked, i.e. that were not answered
+            from the cache.
+    """
+
+    violations: List[Violation]
+    n_paths: int
+    n_checked: int
+
+    @property
+    def is_valid(self) -> bool:
+        """
+        True if there are no violations.
+        """
+        return not self.violations
+
+    def raise_for_violations(self):
+        """
+        Raise an exception if there are violations.
+
+        Raises:
+            ValidationError:
+                There are violations.
+        """
+        if self.violations:
+            raise ValidationError(self)
+
+
+# The cached state of a path: the class of its BIDSPath instance, its size and
+# modification time, the key of its dependencies (see get_dependency_keys())
+# and the (error_type, message) pairs of its violations.
+_CacheEntry = Tuple[str, int, int, str, Tuple[Tuple[str, str], ...]]
+
+
+def get_default_validation_cache_path() -> pathlib.Path:
+    """
+    Get the default location of the validation cache.
+
+    Returns:
+        The path to the SQLite file.
+    """
+    return get_cache_dir() / "validation.sqlite"
+
+
+class ValidationCache:
+    """
+    Persistent cache of the results of the checks of paths, keyed by their
+    absolute path and class. A result is reused as long as the size and
+    modification time of the path and the key of its dependencies are
+    unchanged.
+
+    The cache can be shared between threads.
+    """
+
+    def __init__(self, cache_path: Optional[PathArg] = None):
+        """
+        Args:
+            cache_path:
+                The path to the SQLite file. If None, the path returned by
+                get_default_validation_cache_path() is used.
+        """
+        if cache_path is None:
+            cache_path = get_default_validation_cache_path()
+        self.cache_path = get_path(cache_path)
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        LOGGER.debug("Opening validation cache %s", self.cache_path)
+        try:
+            self._connection = sqlite3.connect(self.cache_path, check_same_thread=False)
+            self._create_tables()
+        except sqlite3.Error as err:
+            raise BIDSPathError(f"Failed to open {self.cache_path}: {err}") from err
+
+    def _create_tables(self):
+        """
+        Create the table if necessary, discarding caches of other formats.
+        """
+        con = self._connection
+        (version,) = con.execute("PRAGMA user_version").fetchone()
+        with con:
+            if version != VALIDATION_CACHE_FORMAT_VERSION:
+                con.execute("DROP TABLE IF EXISTS results")
+                con.execute(f"PRAGMA user_version = {VALIDATION_CACHE_FORMAT_VERSION}")
+            con.execute(
+                """
+                CREATE TABLE IF NOT EXISTS results (
+                    path TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    dependencies TEXT NOT NULL,
+                    violations TEXT NOT NULL
+                )
+                """
+            )
+
+    def close(self):
+        """
+        Close the database connection.
+        """
+        with self._lock:
+            self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_args):
+        self.close()
+
+    def __repr__(self):
+        return f"{self.__class__.__qualname__}({self.cache_path})"
+
+    def load(self, prefix: PathArg) -> Dict[str, _CacheEntry]:
+        """
+        Load the cached results of the paths within a directory.
+
+        Args:
+            prefix:
+                The directory.
+
+        Returns:
+            A dict mapping absolute paths as strings to cache entries.
+        """
+        prefix = str(get_path(prefix).absolute())
+        dir_prefix = prefix if prefix.endswith(os.sep) else prefix + os.sep
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT path, kind, size, mtime_ns, dependencies, violations "
+                "FROM results WHERE path = ? OR substr(path, 1, ?) = ?",
+                (prefix, len(dir_prefix), dir_prefix),
+            ).fetchall()
+        return {
+            path: (kind, size, mtime_ns, deps, tuple(map(tuple, json.loads(errors))))
+            for path, kind, size, mtime_ns, deps, errors in rows
+        }
+
+    def store(self, entries: Dict[str, _CacheEntry]):
+        """
+        Store the results of checks, replacing previous results.
+
+        Args:
+            entries:
+                A dict mapping absolute paths as strings to cache entries.
+        """
+        rows = [
+            (path, kind, size, mtime_ns, deps, json.dumps(violations))
+            for path, (kind, size, mtime_ns, deps, violations) in entries.items()
+        ]
+        with self._lock, self._connection as con:
+            con.executemany(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?)", rows
+            )
+
+    def delete(self, paths: Iterable[str]):
+        """
+        Remove the cached results of paths, e.g. of paths that no longer exist.
+
+        Args:
+            paths:
+                The absolute paths as strings.
+        """
+        with self._lock, self._connection as con:
+            con.executemany(
+                "DELETE FROM results WHERE path = ?", ((path,) for path in paths)
+            )
+
+    def clear(self):
+        """
+        Remove all cached results.
+        """
+        with self._lock, self._connection as con:
+            con.execute("DELETE FROM results")
+
+
+def check_path(bids_path: BIDSPath):
+    """
+    Run the checks of a single path. Directories are checked without their
+    contents.
+
+    Args:
+        bids_path:
+            The path.
+
+    Raises:
+        BIDSPathError:
+            The check failed.
+    """
+    if isinstance(bids_path, BIDSDirectory):
+        bids_path.check(recursive=False)
+    else:
+        bids_path.check()
+
+
+def _get_kind(bids_path: BIDSPath) -> str:
+    """
+    Get the name of the class of a path, which is part of the cache key because
+    subclasses may define different checks.
+    """
+    cls = bids_path.__class__
+    return f"{cls.__module__}.{cls.__qualname__}"
+
+
+def get_dependency_keys(
+    paths: Sequence[BIDSPath], stats: Sequence[Optional[os.stat_result]]
+) -> List[str]:
+    """
+    Get the keys of the inputs on which the checks of paths may depend besides
+    the paths themselves, such as inherited sidecars or the entities of parent
+    directories. The key of a file covers the entries of its directory and of
+    each ancestor directory within the validated tree, i.e. their names and
+    the sizes and modification times of their files. The key of a directory
+    also covers its own entries. Changing, adding or removing a file thus
+    invalidates the results of the paths of its directory and of all
+    directories below it.
+
+    Args:
+        paths:
+            The paths, in which each directory precedes its contents, e.g. a
+            directory followed by the results of its recurse_directory().
+
+        stats:
+            The stat results of the paths, or None for paths that could not be
+            accessed.
+
+    Returns:
+        The list of keys, one per path.
+    """
+    entries: Dict[pathlib.Path, List[Tuple]] = {}
+    for bids_path, stat in zip(paths, stats):
+        path = bids_path.path
+        if isinstance(bids_path, BIDSDirectory) or stat is None:
+            entry = (path.name,)
+        else:
+            entry = (path.name, stat.st_size, stat.st_mtime_ns)
+        entries.setdefault(path.parent, []).append(entry)
+    signatures: Dict[pathlib.Path, str] = {}
+    keys = []
+    for bids_path in paths:
+        path = bids_path.path
+        if isinstance(bids_path, BIDSDirectory):
+            digest = hashlib.blake2b(digest_size=16)
+            digest.update(signatures.get(path.parent, "").encode())
+            digest.update(repr(sorted(entries.get(path, ()))).encode())
+            signatures[path] = digest.hexdigest()
+            keys.append(signatures[path])
+        else:
+            keys.append(signatures.get(path.parent, ""))
+    return keys
+
+
+def _stat(bids_path: BIDSPath):
+    """
+    Get the stat result of a path, or the exception raised by os.stat().
+    """
+    try:
+        return bids_path.path.stat()
+    except OSError as err:
+        return err
+
+
+def validate_directory(
+    directory: BIDSDirectory,
+    max_workers: Optional[int] = None,
+    cache: Optional[ValidationCache] = None,
+) -> ValidationReport:
+    """
+    Check a directory and all paths within it on a thread pool and collect all
+    violations instead of stopping at the first one. Names that cannot be
+    parsed into paths are reported as violations and are not traversed.
+
+    Args:
+        directory:
+            The BIDSDirectory instance.
+
+        max_workers:
+            The maximum number of paths checked concurrently. It is also passed
+            to recurse_directory() to list directories concurrently.
+
+        cache:
+            An optional ValidationCache instance. If given, the paths whose
+            size and modification time and whose dependencies (see
+            get_dependency_keys()) have not changed since their last check are
+            not checked again. The new results are stored and the results of
+            paths that no longer exist are removed.
+
+    Returns:
+        The ValidationReport instance.
+    """
+    cached = {} if cache is None else cache.load(directory.path)
+    updates = {}
+    paths = [directory]
+    # Violations of the names that cannot be parsed into paths, by the position
+    # in paths at which they were found to keep the order of the traversal.
+    name_violations = {}
+
+    def on_error(path, err):
+        violation = Violation(path, err.__class__.__name__, str(err))
+        name_violations.setdefault(len(paths), []).append(violation)
+
+    for bids_path in directory.recurse_directory(
+        max_workers=max_workers, on_error=on_error
+    ):
+        paths.append(bids_path)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        stats = list(executor.map(_stat, paths))
+        dependency_keys = get_dependency_keys(
+            paths, [None if isinstance(stat, OSError) else stat for stat in stats]
+        )
+
+        def validate(item):
+            bids_path, stat, dependency_key = item
+            path = bids_path.path
+            if isinstance(stat, OSError):
+                return path, ((stat.__class__.__name__, str(stat)),), False
+            key = str(path.absolute())
+            state = (_get_kind(bids_path), stat.st_size, stat.st_mtime_ns)
+            state += (dependency_key,)
+            entry = cached.get(key)
+            if entry is not None and entry[:4] == state:
+                return path, entry[4], True
+            try:
+                check_path(bids_path)
+            except BIDSPathError as err:
+                errors = ((err.__class__.__name__, str(err)),)
+            else:
+                errors = ()
+            updates[key] = (*state, errors)
+            return path, errors, False
+
+        violations = []
+        n_paths = 0
+        n_checked = 0
+        for i, (path, errors, from_cache) in enumerate(
+            executor.map(validate, zip(paths, stats, dependency_keys))
+        ):
+            violations.extend(name_violations.get(i, ()))
+            n_paths += 1
+            n_checked += not from_cache
+            violations.extend(
+                Violation(path, error_type, message) for error_type, message in errors
+            )
+        violations.extend(name_violations.get(len(paths), ()))
+    if cache is not None:
+        if updates:
+            cache.store(updates)
+        seen = {str(bids_path.path.absolute()) for bids_path in paths}
+        stale = [path for path in cached if path not in seen]
+        if stale:
+            cache.delete(stale)
+    LOGGER.debug(
+        "Validated %d paths in %s (%d checked): %d violations",
+        n_paths,
+        directory,
+        n_checked,
+        len(violations),
+    )
+    return ValidationReport(violations, n_paths, n_checked)
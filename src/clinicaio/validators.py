@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""Validators of entity values and filenames compiled from the BIDS schema."""
+
+import functools
+import logging
+import re
+from typing import Any, Callable, Dict, FrozenSet, List, Mapping, NamedTuple, Optional
+
+from .path import KEY_DELIMITER, BIDSPath, parse_name
+
+LOGGER = logging.getLogger(__name__)
+
+
+# Patterns of the formats of entity values, as defined by the specification.
+# The patterns of a schema take precedence over these.
+DEFAULT_FORMAT_PATTERNS = {
+    "label": "[0-9a-zA-Z]+",
+    "index": "[0-9]+",
+}
+
+# Levels of entities in the file rules of the schema.
+REQUIRED_LEVEL = "required"
+
+
+@functools.lru_cache(maxsize=None)
+def get_format_matcher(pattern: str) -> Callable[[str], bool]:
+    """
+    Get a function that checks if a value matches a format, with a cache of the
+    checked values so that each distinct value is only matched once.
+
+    Args:
+        pattern:
+            The regular expression of the format.
+
+    Returns:
+        A function that accepts a string and returns True if it matches.
+    """
+    fullmatch = re.compile(pattern).fullmatch
+
+    @functools.lru_cache(maxsize=1 << 16)
+    def matches(value: str) -> bool:
+        return fullmatch(value) is not None
+
+    return matches
+
+
+def is_valid_label(value: str) -> bool:
+    """
+    Check if a string is a valid label, i.e. an alphanumeric string.
+    """
+    return get_format_matcher(DEFAULT_FORMAT_PATTERNS["label"])(value)
+
+
+def is_valid_index(value: str) -> bool:
+    """
+    Check if a string is a valid index, i.e. a non-negative integer.
+    """
+    return get_format_matcher(DEFAULT_FORMAT_PATTERNS["index"])(value)
+
+
+class FileRule(NamedTuple):
+    """
+    The compiled rules of the files with a given datatype and suffix.
+
+    Attributes:
+        extensions:
+            The allowed extensions, e.g. ".nii.gz".
+
+        entities:
+            The allowed entity keys.
+
+        required:
+            The required entity keys.
+    """
+
+    extensions: FrozenSet[str]
+    entities: FrozenSet[str]
+    required: FrozenSet[str]
+
+
+def _iter_file_rules(rules: Any):
+    """
+    Iterate over the rules with suffixes in the nested file rules of a schema.
+    """
+    if isinstance(rules, Mapping):
+        if "suffixes" in rules:
+            yield rules
+            return
+        for value in rules.values():
+            yield from _iter_file_rules(value)
+
+
+def _merge_rules(rules: List[FileRule]) -> FileRule:
+    """
+    Merge the rules of the same files, allowing what any of them allows.
+    """
+    return FileRule(
+        frozenset().union(*(rule.extensions for rule in rules)),
+        frozenset().union(*(rule.entities for rule in rules)),
+        frozenset.intersection(*(rule.required for rule in rules)),
+    )
+
+
+class FilenameValidator:
+    """
+    Validator of filenames compiled from the entity definitions, the entity
+    order, the formats and the file rules of a schema. The schema is processed
+    once into lookup tables of entity keys and ranks, of format matchers and of
+    the rules by datatype and suffix, so that checking a name only parses it
+    and looks up its components.
+    """
+
+    def __init__(self, schema: Mapping[str, Any]):
+        """
+        Args:
+            schema:
+                The schema data, e.g. SchemaParser().schema.
+        """
+        objects = schema.get("objects", {})
+        definitions = objects.get("entities", {})
+        patterns = dict(DEFAULT_FORMAT_PATTERNS)
+        for name, definition in objects.get("formats", {}).items():
+            if "pattern" in definition:
+                patterns[name] = definition["pattern"]
+
+        # Entity keys by schema name, ranks by key and matchers by key.
+        keys = {
+            name: definition.get("name", name)
+            for name, definition in definitions.items()
+        }
+        order = schema.get("rules", {}).get("entities") or list(definitions)
+        self.ranks: Dict[str, int] = {
+            keys.get(name, name): i for i, name in enumerate(order)
+        }
+        self.matchers: Dict[str, Callable[[str], bool]] = {}
+        for name, definition in definitions.items():
+            pattern = patterns.get(definition.get("format", "label"))
+            if pattern is not None:
+                self.matchers[keys[name]] = get_format_matcher(pattern)
+
+        # Rules by (datatype, suffix), with None for files outside of datatype
+        # directories, and by suffix for names checked without a datatype.
+        collected: Dict[Any, List[FileRule]] = {}
+        for rule in _iter_file_rules(schema.get("rules", {}).get("files", {})):
+            entities = {}
+            for name, level in rule.get("entities", {}).items():
+                if isinstance(level, Mapping):
+                    level = level.get("level")
+                entities[keys.get(name, name)] = level
+            compiled = FileRule(
+                frozenset(rule.get("extensions", ())),
+                frozenset(entities),
+                frozenset(
+                    key for key, level in entities.items() if level == REQUIRED_LEVEL
+                ),
+            )
+            for suffix in rule["suffixes"]:
+                for datatype in rule.get("datatypes") or (None,):
+                    collected.setdefault((datatype, suffix), []).append(compiled)
+                    collected.setdefault(suffix, []).append(compiled)
+        self.rules: Dict[Any, FileRule] = {
+            key: _merge_rules(rules) for key, rules in collected.items()
+        }
+        self.datatypes = frozenset(objects.get("datatypes", {})).union(
+            key[0] for key in collected if isinstance(key, tuple) and key[0]
+        )
+        LOGGER.debug(
+            "Compiled %d entities and %d file rules.", len(self.ranks), len(self.rules)
+        )
+
+    @classmethod
+    def from_schema_parser(cls, parser=None) -> "FilenameValidator":
+        """
+        Create a validator from the schema of a SchemaParser.
+
+        Args:
+            parser:
+                The SchemaParser instance. If None, the schema in this
+                package's resources is used.
+
+        Returns:
+            The FilenameValidator instance.
+        """
+        # Imported here to only load the schema machinery when it is needed.
+        from .schema import SchemaParser
+
+        if parser is None:
+            parser = SchemaParser()
+        return cls(parser.schema)
+
+    def check_entity(self, key: str, value: str) -> Optional[str]:
+        """
+        Check an entity.
+
+        Returns:
+            A description of the error, or None if the entity is valid.
+        """
+        matcher = self.matchers.get(key)
+        if matcher is None:
+            return f"Unknown entity: {key}"
+        if not matcher(value):
+            return f"Invalid value of entity {key}: {value!r}"
+        return None
+
+    def check_name(self, name: str, datatype: Optional[str] = None) -> List[str]:
+        """
+        Check a filename against the rules of the schema.
+
+        Args:
+            name:
+                The filename.
+
+            datatype:
+                The datatype of the file, i.e. the name of its parent directory
+                if it is a datatype directory. If None, the rules of all
+                datatypes are used.
+
+        Returns:
+            The list of descriptions of the errors, which is empty if the name
+            is valid.
+        """
+        parsed = parse_name(name)
+        errors = []
+        ranks = self.ranks
+        last_rank = -1
+        keys = []
+        for key, value in parsed.entities:
+            error = self.check_entity(key, value)
+            if error is not None:
+                errors.append(error)
+                continue
+            rank = ranks.get(key, -1)
+            if rank <= last_rank:
+                errors.append(f"Entity {key}{KEY_DELIMITER}{value} is out of order.")
+            last_rank = max(rank, last_rank)
+            keys.append(key)
+
+        if datatype is not None and datatype not in self.datatypes:
+            errors.append(f"Unknown datatype: {datatype}")
+            return errors
+        rule = self.rules.get(
+            parsed.suffix if datatype is None else (datatype, parsed.suffix)
+        )
+        if rule is None:
+            where = "" if datatype is None else f" in {datatype}"
+            errors.append(f"Unknown suffix{where}: {parsed.suffix}")
+            return errors
+        extension = "".join(parsed.extensions)
+        if extension not in rule.extensions:
+            errors.append(f"Invalid extension for {parsed.suffix}: {extension!r}")
+        errors.extend(
+            f"Entity {key} is not allowed for {parsed.suffix}"
+            for key in keys
+            if key not in rule.entities
+        )
+        missing = rule.required.difference(keys)
+        if missing:
+            errors.append(f"Missing required entities: {', '.join(sorted(missing))}")
+        return errors
+
+    def is_valid_name(self, name: str, datatype: Optional[str] = None) -> bool:
+        """
+        Check if a filename is valid. See check_name().
+        """
+        return not self.check_name(name, datatype=datatype)
+
+    def check_bids_path(self, bids_path: BIDSPath) -> List[str]:
+        """
+        Check the name of a file in a dataset, using the name of its parent
+        directory as its datatype if the parent is a datatype directory.
+
+        Args:
+            bids_path:
+                The path of the file.
+
+        Returns:
+            The list of descriptions of the errors.
+        """
+        parent = bids_path.parent
+        datatype = None
+        if isinstance(parent, BIDSPath) and parent.path.name in self.datatypes:
+            datatype = parent.path.name
+        return self.check_name(bids_path.path.name, datatype=datatype)
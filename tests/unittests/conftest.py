@@ -0,0 +1,17 @@
+from pathlib import Path
+
+import pytest
+
+DATA_DIR = Path(__file__).resolve().parent.parent / "data"
+
+
+@pytest.fixture
+def bids_dataset_path():
+    return DATA_DIR / "bids"
+
+
+@pytest.fixture
+def bids_dataset(bids_dataset_path):
+    from clinicaio.subclasses.dataset import BIDSDataset
+
+    return BIDSDataset.from_path(bids_dataset_path, is_root=True)
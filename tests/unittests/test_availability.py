@@ -0,0 +1,53 @@
+def test_availability(bids_dataset):
+    from clinicaio.availability import ModalityKey
+
+    matrix = bids_dataset.get_availability()
+    assert ("001", "M156") in matrix.visits
+    assert ModalityKey("pet", "pet", "18FAV45") in matrix.modalities
+    assert matrix.is_available("001", "M000", "T1w")
+    assert not matrix.is_available("001", "M000", (None, "pet", "18FAV45"))
+
+    # Check the matrix against queries.
+    for modality in matrix.modalities:
+        datatype, suffix, tracer = modality
+        entities = {"datatype": datatype, "suffix": suffix}
+        if tracer is not None:
+            entities["trc"] = tracer
+        expected = {
+            (str(path.entities["sub"]), path.entities.get("ses"))
+            for path in bids_dataset.query(extension=[".nii", ".nii.gz"], **entities)
+            if tracer is not None or "trc" not in path.entities
+        }
+        assert set(matrix.get_visits(matrix.get_mask(modality))) == expected
+
+
+def test_cohort_filters(bids_dataset):
+    matrix = bids_dataset.get_availability()
+    assert matrix.select_sessions("T1w", ("pet", "pet", "18FAV45")) == [("001", "M156")]
+    t1w_sessions = matrix.select_sessions("T1w")
+    dwi_sessions = matrix.select_sessions("dwi")
+    assert matrix.select_sessions("T1w", "dwi") == sorted(
+        set(t1w_sessions) & set(dwi_sessions)
+    )
+    longitudinal = matrix.select_subjects("T1w", "dwi", min_sessions=2)
+    assert longitudinal
+    for sub, sessions in longitudinal.items():
+        assert len(sessions) >= 2
+        assert all((sub, ses) in dwi_sessions for ses in sessions)
+    assert matrix.select_subjects("T1w", min_sessions=100) == {}
+    assert len(matrix.to_rows()) == len(matrix.visits)
+
+
+def test_availability_skips_unreadable_paths(tmp_path, caplog):
+    from clinicaio.subclasses.dataset import BIDSDataset
+
+    anat = tmp_path / "bids" / "sub-01" / "ses-M000" / "anat"
+    anat.mkdir(parents=True)
+    (anat / "sub-01_ses-M000_T1w.nii.gz").touch()
+    dangling = anat / "sub-01_ses-M000_T2w.nii.gz"
+    dangling.symlink_to(tmp_path / "missing.nii.gz")
+    dataset = BIDSDataset.from_path(tmp_path / "bids", is_root=True)
+    matrix = dataset.get_availability()
+    assert matrix.is_available("01", "M000", "T1w")
+    assert "T2w" not in {modality.suffix for modality in matrix.modalities}
+    assert str(dangling) in caplog.text
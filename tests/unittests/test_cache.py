@@ -0,0 +1,56 @@
+import os
+
+
+def test_lru_cache(tmp_path):
+    from clinicaio.cache import LRUCache
+
+    paths = []
+    for i in range(3):
+        path = tmp_path / f"{i}.bin"
+        path.write_bytes(bytes(1000))
+        paths.append(path)
+    cache = LRUCache(max_bytes=2500, sizeof=len)
+    loads = []
+
+    def loader(path):
+        loads.append(path.name)
+        return path.read_bytes()
+
+    for path in paths[:2]:
+        cache.get_or_load("bin", path, loader)
+    cache.get_or_load("bin", paths[0], loader)
+    # The least recently used value is evicted to stay within the budget.
+    cache.get_or_load("bin", paths[2], loader)
+    cache.get_or_load("bin", paths[0], loader)
+    assert loads == ["0.bin", "1.bin", "2.bin"]
+    assert tuple(cache.stats()) == (2, 3, 1, 2, 2000)
+
+    # Values of modified files are reloaded.
+    stat = paths[0].stat()
+    os.utime(paths[0], ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    cache.get_or_load("bin", paths[0], loader)
+    assert loads[-1] == "0.bin"
+
+    # Values larger than the budget are not cached.
+    paths[1].write_bytes(bytes(3000))
+    cache.get_or_load("bin", paths[1], loader)
+    assert cache.stats().bytes <= 2500
+    cache.resize(0)
+    assert len(cache) == 0
+
+
+def test_estimate_size():
+    from clinicaio.cache import estimate_size
+
+    value = {"key": ["a" * 1000, "b" * 1000]}
+    assert 2000 < estimate_size(value) < 3000
+
+
+def test_shared_loaders(bids_dataset):
+    from clinicaio.cache import LRUCache
+
+    cache = LRUCache()
+    bids_dataset.load_sessions_tables(cache=cache)
+    bids_dataset.load_sessions_tables(cache=cache)
+    stats = cache.stats()
+    assert stats.misses == stats.hits == 4
@@ -0,0 +1,153 @@
+import os
+from pathlib import Path
+
+
+def walk_depth_first(directory):
+    """
+    Expected order of recurse_directory(): the sorted subdirectories, each
+    followed by its contents, then the sorted files.
+    """
+    _, dirnames, filenames = next(os.walk(directory))
+    for name in sorted(dirnames):
+        yield directory / name
+        yield from walk_depth_first(directory / name)
+    for name in sorted(filenames):
+        yield directory / name
+
+
+def test_recurse_directory_order(bids_dataset, bids_dataset_path):
+    expected = list(walk_depth_first(bids_dataset_path))
+    paths = list(bids_dataset.recurse_directory())
+    assert [path.path for path in paths] == expected
+
+
+def test_recurse_directory_does_not_stat_children(bids_dataset, monkeypatch):
+    def fail(self):
+        raise AssertionError(f"Unexpected is_dir call on {self}")
+
+    monkeypatch.setattr(Path, "is_dir", fail)
+    assert any(path.suffix == "sessions" for path in bids_dataset.recurse_directory())
+
+
+def test_child_types(bids_dataset):
+    from clinicaio.subclasses.subject import BIDSSubject
+
+    subjects = bids_dataset.subjects
+    assert sorted(subjects) == ["001", "002", "003", "004"]
+    assert all(isinstance(subject, BIDSSubject) for subject in subjects.values())
+
+
+def test_recurse_directory_prune(bids_dataset, monkeypatch):
+    from clinicaio.directory import BIDSDirectory
+
+    listed = []
+    list_children = BIDSDirectory.list_children
+
+    def record(self):
+        listed.append(self.path.name)
+        return list_children(self)
+
+    monkeypatch.setattr(BIDSDirectory, "list_children", record)
+
+    def prune(directory):
+        return directory.depth == 3 and directory.suffix != "anat"
+
+    paths = list(bids_dataset.recurse_directory(prune_func=prune))
+    assert {"dwi", "func", "fmap", "pet"}.isdisjoint(listed)
+    assert "anat" in listed
+    assert all(path.parent.path.name != "dwi" for path in paths)
+
+
+def test_recurse_directory_max_depth(bids_dataset):
+    paths = list(bids_dataset.recurse_directory(max_depth=2))
+    assert paths
+    assert max(path.depth for path in paths) == 2
+    sessions = list(
+        bids_dataset.subjects["004"].recurse_directory(
+            max_depth=2, filter_func=lambda path: path.is_dir()
+        )
+    )
+    assert [path.path.name for path in sessions][:2] == ["ses-M000", "ses-M017"]
+
+
+def test_entity_accessors_are_cached(bids_dataset, monkeypatch):
+    from clinicaio.directory import BIDSDirectory
+
+    subject = bids_dataset.get_subject("003")
+    assert subject.path.name == "sub-003"
+    assert bids_dataset.get_subject("999") is None
+
+    def fail(self, *args, **kwargs):
+        raise AssertionError("Unexpected listing")
+
+    monkeypatch.setattr(BIDSDirectory, "get_child_mapping_by_entity", fail)
+    assert bids_dataset.get_subject("003") is subject
+    bids_dataset.refresh()
+    monkeypatch.undo()
+    assert bids_dataset.get_subject("003") is not subject
+
+
+def test_entity_accessors_check_mtime(bids_dataset_path, tmp_path):
+    import shutil
+
+    from clinicaio.subclasses.dataset import BIDSDataset
+
+    root = tmp_path / "bids"
+    shutil.copytree(bids_dataset_path, root)
+    dataset = BIDSDataset.from_path(root, is_root=True)
+    dataset.CACHE_CHECK_MTIME = True
+    assert len(dataset.subjects) == 4
+    (root / "sub-005").mkdir()
+    assert len(dataset.subjects) == 5
+
+
+def test_recurse_directory_parallel(bids_dataset, monkeypatch):
+    import threading
+    import time
+
+    from clinicaio.directory import BIDSDirectory
+
+    expected = list(bids_dataset.recurse_directory())
+    threads = set()
+    list_children = BIDSDirectory.list_children
+
+    def slow(self):
+        threads.add(threading.current_thread().name)
+        time.sleep(0.01)
+        return list_children(self)
+
+    monkeypatch.setattr(BIDSDirectory, "list_children", slow)
+    paths = list(bids_dataset.recurse_directory(max_workers=8))
+    assert [repr(path) for path in paths] == [repr(path) for path in expected]
+    assert len(threads) > 1
+
+    bids_dataset.SCAN_MAX_WORKERS = 4
+    anat = list(
+        bids_dataset.recurse_directory(
+            prune_func=lambda d: d.depth == 3 and d.suffix != "anat"
+        )
+    )
+    assert anat and all("dwi" not in str(path) for path in anat)
+
+
+def test_recurse_directory_non_compliant_names(tmp_path):
+    import pytest
+
+    from clinicaio.path import BIDSPath
+    from clinicaio.subclasses.dataset import BIDSDataset
+
+    anat = tmp_path / "bids" / "sub-01" / "anat"
+    anat.mkdir(parents=True)
+    (anat / "sub-01_acq-a b_T1w.nii").touch()
+    dataset = BIDSDataset.from_path(tmp_path / "bids", is_root=True)
+    paths = list(dataset.recurse_directory())
+    assert [path.path.name for path in paths] == [
+        "sub-01",
+        "anat",
+        "sub-01_acq-a b_T1w.nii",
+    ]
+    assert paths[-1].entities["acq"] == "a b"
+    with pytest.raises(ValueError):
+        BIDSPath(
+            extensions=[".nii"], entities={"sub": "01", "acq": "a b"}, suffix="T1w"
+        )
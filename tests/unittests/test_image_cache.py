@@ -0,0 +1,110 @@
+import gzip
+import os
+import struct
+
+import pytest
+
+
+def make_nifti1(shape):
+    """
+    Make the header of a NIfTI-1 image of 16-bit integers.
+    """
+    header = bytearray(352)
+    dim = (len(shape), *shape) + (1,) * (7 - len(shape))
+    struct.pack_into("<i", header, 0, 348)
+    struct.pack_into("<8h", header, 40, *dim)
+    struct.pack_into("<hh", header, 70, 4, 16)
+    struct.pack_into("<8f", header, 76, *(1.0,) * 8)
+    struct.pack_into("<fff", header, 108, 352.0, 1.0, 0.0)
+    header[344:348] = b"n+1\0"
+    return bytes(header)
+
+
+@pytest.fixture
+def gz_dataset(tmp_path):
+    from clinicaio.subclasses.dataset import BIDSDataset
+
+    for sub in ("01", "02", "03"):
+        anat = tmp_path / "bids" / f"sub-{sub}" / "anat"
+        anat.mkdir(parents=True)
+        data = make_nifti1((10, 10, 10)) + os.urandom(2000)
+        (anat / f"sub-{sub}_T1w.nii.gz").write_bytes(gzip.compress(data))
+    return BIDSDataset.from_path(tmp_path / "bids", is_root=True)
+
+
+def test_image_cache(gz_dataset, tmp_path):
+    from clinicaio.image_cache import ImageCache
+
+    sources = gz_dataset.query(suffix="T1w")
+    with ImageCache(tmp_path / "caps", budget=2 * 2352) as cache:
+        entries = cache.fill(sources[:2], max_workers=2)
+        entries.append(cache.get(sources[2]))
+        assert entries[0] == (tmp_path / "caps/subjects/sub-01/anat/sub-01_T1w.nii")
+        # Only the two most recently used entries fit in the budget.
+        assert [entry.exists() for entry in entries] == [False, True, True]
+        assert entries[1].read_bytes() == gzip.decompress(sources[1].path.read_bytes())
+        assert cache.total_size == 2 * 2352
+
+        # Valid entries are reused.
+        mtime_ns = entries[2].stat().st_mtime_ns
+        assert cache.get(sources[2]) == entries[2]
+        assert entries[2].stat().st_mtime_ns == mtime_ns
+
+        # Entries of modified sources are replaced.
+        stat = sources[2].path.stat()
+        os.utime(sources[2].path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        cache.get(sources[2])
+        assert entries[2].stat().st_mtime_ns != mtime_ns
+
+
+def test_image_cache_hash(gz_dataset, tmp_path):
+    from clinicaio.image_cache import ImageCache
+
+    (source, *_) = gz_dataset.query(suffix="T1w")
+    with ImageCache(tmp_path / "caps", use_hash=True) as cache:
+        entry = cache.get(source)
+        mtime_ns = entry.stat().st_mtime_ns
+        # Touching the source does not invalidate the entry.
+        stat = source.path.stat()
+        os.utime(source.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        assert cache.get(source) == entry
+        assert entry.stat().st_mtime_ns == mtime_ns
+
+
+def test_image_cache_npy(gz_dataset, tmp_path):
+    numpy = pytest.importorskip("numpy")
+    from clinicaio.image_cache import ImageCache
+
+    (source, *_) = gz_dataset.query(suffix="T1w")
+    with ImageCache(tmp_path / "caps", extension=".npy") as cache:
+        array = cache.load(source)
+    assert array.shape == (10, 10, 10)
+    assert array.dtype == numpy.dtype("<i2")
+
+
+@pytest.mark.parametrize("extension", [".nii", ".npy"])
+def test_convert_multi_member_gzip(tmp_path, extension):
+    from clinicaio.image_cache import ImageCacheError, convert_image
+
+    if extension == ".npy":
+        pytest.importorskip("numpy")
+    data = make_nifti1((10, 10, 12)) + os.urandom(2400)
+    source = tmp_path / "sub-01_T1w.nii.gz"
+    # Files compressed in blocks, e.g. by bgzip, consist of several members.
+    source.write_bytes(
+        b"".join(gzip.compress(data[i : i + 1000]) for i in (0, 1000, 2000))
+    )
+    target = tmp_path / f"sub-01_T1w{extension}"
+    convert_image(source, target)
+    if extension == ".nii":
+        assert target.read_bytes() == data
+    else:
+        import numpy
+
+        array = numpy.load(target)
+        assert array.shape == (10, 10, 12)
+        assert array.tobytes(order="F") == data[352:]
+
+    source.write_bytes(gzip.compress(data)[:-2000])
+    with pytest.raises(ImageCacheError):
+        convert_image(source, tmp_path / "truncated.nii")
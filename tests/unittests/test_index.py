@@ -0,0 +1,56 @@
+import shutil
+
+
+def test_index_matches_filesystem(bids_dataset, tmp_path, monkeypatch):
+    from clinicaio import directory
+
+    expected = [repr(path) for path in bids_dataset.recurse_directory()]
+    index = bids_dataset.use_index(tmp_path / "index.sqlite")
+    assert index.refresh() == 0
+
+    def fail(path):
+        raise AssertionError(f"Unexpected listing of {path}")
+
+    monkeypatch.setattr(directory, "scan_directory", fail)
+    assert [repr(path) for path in bids_dataset.recurse_directory()] == expected
+    assert sorted(bids_dataset.subjects) == ["001", "002", "003", "004"]
+    records = list(index.iter_records())
+    assert len(records) == len(expected)
+    assert records[0].path == "sub-001"
+    assert records[0].entities == (("sub", "001"),)
+    assert records[0].is_dir
+    index.close()
+
+
+def test_index_incremental_refresh(bids_dataset_path, tmp_path):
+    from clinicaio.index import BIDSIndex
+
+    root = tmp_path / "bids"
+    shutil.copytree(bids_dataset_path, root)
+    with BIDSIndex(root, tmp_path / "index.sqlite") as index:
+        n_dirs = index.refresh()
+        assert n_dirs > 10
+        assert index.refresh() == 0
+
+        (root / "sub-003" / "ses-M000" / "anat" / "sub-003_ses-M000_T1w.json").touch()
+        shutil.rmtree(root / "sub-004")
+        assert index.refresh() == 2
+        paths = [record.path for record in index.iter_records()]
+        assert "sub-003/ses-M000/anat/sub-003_ses-M000_T1w.json" in paths
+        assert not any(path.startswith("sub-004") for path in paths)
+        assert index.list_children(root / "sub-004") is None
+
+
+def test_index_refresh_missing_root(bids_dataset_path, tmp_path):
+    from clinicaio.index import BIDSIndex
+
+    root = tmp_path / "bids"
+    shutil.copytree(bids_dataset_path, root)
+    with BIDSIndex(root, tmp_path / "index.sqlite") as index:
+        index.refresh()
+        assert list(index.iter_records())
+        shutil.rmtree(root)
+        index.refresh()
+        assert not list(index.iter_records())
+        assert index.list_children(root) is None
+        assert index.list_children(root / "sub-001") is None
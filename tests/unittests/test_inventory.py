@@ -0,0 +1,80 @@
+import pickle
+
+import pytest
+
+QUERIES = [
+    {},
+    {"sub": "001"},
+    {"suffix": "T1w", "extension": ".nii.gz"},
+    {"datatype": "anat"},
+    {"ses": ["M000", "M006"], "run": 1},
+    {"sub": "999"},
+    {"extension": ""},
+    {"run": None, "datatype": ["anat", "func"]},
+]
+
+
+def _relpaths(bids_dataset, bids_paths):
+    return [
+        "/".join(bids_path.path.relative_to(bids_dataset.path).parts)
+        for bids_path in bids_paths
+    ]
+
+
+@pytest.mark.parametrize("entities", QUERIES)
+def test_inventory_query(bids_dataset, tmp_path, entities):
+    inventory = bids_dataset.freeze_inventory(tmp_path / "inventory.bin")
+    with inventory:
+        records = inventory.query(**entities)
+        assert [record.path for record in records] == _relpaths(
+            bids_dataset, bids_dataset.query(**entities)
+        )
+        for record in records:
+            assert inventory.get_full_path(record).is_file()
+
+
+def test_inventory_from_index(bids_dataset, tmp_path):
+    scanned = list(bids_dataset.iter_inventory_records())
+    bids_dataset.use_index(tmp_path / "index.sqlite")
+    assert list(bids_dataset.iter_inventory_records()) == scanned
+    bids_dataset.index.close()
+
+
+def test_shared_inventory(bids_dataset):
+    from clinicaio.inventory import attach_inventory, unlink_inventory
+
+    inventory = bids_dataset.freeze_inventory()
+    try:
+        expected = list(bids_dataset.iter_inventory_records())
+        assert len(inventory) == len(expected)
+        assert [inventory.get_record(i) for i in range(len(inventory))] == expected
+
+        # Pickling attaches to the same block of shared memory.
+        data = pickle.dumps(inventory)
+        assert len(data) < 200
+        with pickle.loads(data) as attached:
+            assert attached.query(sub="001") == inventory.query(sub="001")
+        with attach_inventory(inventory.source[1]) as attached:
+            assert len(attached) == len(inventory)
+    finally:
+        unlink_inventory(inventory)
+    with pytest.raises(FileNotFoundError):
+        attach_inventory(inventory.source[1])
+
+
+def test_inventory_buffer(bids_dataset):
+    from clinicaio.inventory import (
+        Inventory,
+        InventoryError,
+        build_inventory,
+        unlink_inventory,
+    )
+
+    records = list(bids_dataset.iter_inventory_records())
+    inventory = Inventory(build_inventory(str(bids_dataset.path), records))
+    copy = pickle.loads(pickle.dumps(inventory))
+    assert copy.query(include_dirs=True) == records
+    with pytest.raises(InventoryError):
+        unlink_inventory(copy)
+    with pytest.raises(InventoryError):
+        Inventory(b"not an inventory")
@@ -0,0 +1,50 @@
+import threading
+
+
+def test_prefetch_loader(tmp_path):
+    from clinicaio.loader import PrefetchLoader
+
+    paths = []
+    for i in range(20):
+        path = tmp_path / f"sub-{i:02d}_T1w.nii"
+        path.write_bytes(bytes([i]) * 100)
+        paths.append(path)
+    samples = list(zip(paths[::2], paths[1::2]))
+    lock = threading.Lock()
+    loading = []
+    max_loading = 0
+    # The first three samples only finish once they are all being loaded, so
+    # the test fails if the loader does not overlap them.
+    barrier = threading.Barrier(3, timeout=10)
+
+    def load(sample):
+        nonlocal max_loading
+        with lock:
+            loading.append(sample)
+            max_loading = max(max_loading, len(loading))
+        if sample in samples[:3]:
+            barrier.wait()
+        with lock:
+            loading.remove(sample)
+        return sample[0].read_bytes()[0], sample[1].read_bytes()[0]
+
+    loader = PrefetchLoader(samples, load, max_workers=8, max_inflight_bytes=600)
+    assert list(loader) == [(i, i + 1) for i in range(0, 20, 2)]
+    # Each sample is 200 bytes so at most three are loaded concurrently.
+    assert max_loading == 3
+
+
+def test_prefetch_loader_defaults(bids_dataset, monkeypatch):
+    import os
+
+    from clinicaio import loader
+
+    advised = []
+    monkeypatch.setattr(
+        os, "posix_fadvise", lambda *args: advised.append(args), raising=False
+    )
+    monkeypatch.setattr(os, "POSIX_FADV_WILLNEED", 3, raising=False)
+    paths = bids_dataset.query(extension=".json")
+    results = list(loader.PrefetchLoader(paths, max_workers=2))
+    assert results == [path.path.read_bytes() for path in paths]
+    assert len(advised) == len(paths)
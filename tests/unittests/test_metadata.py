@@ -0,0 +1,78 @@
+import json
+import os
+
+import pytest
+
+
+@pytest.fixture
+def inherited_dataset(tmp_path):
+    from clinicaio.subclasses.dataset import BIDSDataset
+
+    root = tmp_path / "bids"
+    anat = root / "sub-01" / "anat"
+    anat.mkdir(parents=True)
+    files = {
+        "T1w.json": {"A": 1, "B": 1},
+        "bold.json": {"A": "bold"},
+        "sub-01/sub-01_T1w.json": {"B": 2, "C": 2},
+        "sub-01/anat/sub-01_T1w.json": {"C": 3, "D": 3},
+        "sub-01/anat/sub-01_run-1_T1w.json": {"D": 4},
+    }
+    for name, data in files.items():
+        (root / name).write_text(json.dumps(data))
+    for name in ("sub-01_run-1_T1w.nii.gz", "sub-01_run-2_T1w.nii.gz"):
+        (anat / name).touch()
+    return BIDSDataset.from_path(root, is_root=True)
+
+
+def test_inheritance(inherited_dataset):
+    run_1, run_2 = inherited_dataset.query(suffix="T1w", extension=".nii.gz")
+    assert run_1.metadata == {"A": 1, "B": 2, "C": 3, "D": 4}
+    assert run_2.metadata == {"A": 1, "B": 2, "C": 3, "D": 3}
+
+
+def test_cache_and_prefetch(inherited_dataset):
+    from clinicaio.cache import LRUCache
+    from clinicaio.metadata import prefetch_metadata
+
+    cache = LRUCache()
+    paths = inherited_dataset.query(suffix="T1w", extension=".nii.gz")
+    results = prefetch_metadata(paths, max_workers=4, cache=cache)
+    assert results == [path.metadata for path in paths]
+    # The four T1w sidecars are each parsed once.
+    stats = cache.stats()
+    assert (stats.entries, stats.misses, stats.hits) == (4, 4, 7)
+
+    # Changing a file invalidates its cached value.
+    sidecar = inherited_dataset.path / "T1w.json"
+    sidecar.write_text(json.dumps({"A": 5}))
+    stat = sidecar.stat()
+    os.utime(sidecar, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert prefetch_metadata(paths[:1], cache=cache)[0]["A"] == 5
+
+
+def test_dataset_sidecars(bids_dataset):
+    (path,) = bids_dataset.query(sub="003", suffix="T1w", extension=".nii.gz")
+    assert path.metadata["MagneticFieldStrength"] == 3
+
+
+def test_shared_cache(inherited_dataset, monkeypatch):
+    from clinicaio import cache
+
+    shared = cache.LRUCache()
+    monkeypatch.setattr(cache, "SHARED_CACHE", shared)
+    run_1, run_2 = inherited_dataset.query(suffix="T1w", extension=".nii.gz")
+    assert run_1.metadata != run_2.metadata
+    stats = shared.stats()
+    assert (stats.entries, stats.misses, stats.hits) == (4, 4, 3)
+
+
+def test_standalone_path(inherited_dataset):
+    from clinicaio.metadata import MetadataError
+    from clinicaio.path import BIDSPath
+
+    image = inherited_dataset.path / "sub-01" / "anat" / "sub-01_run-1_T1w.nii.gz"
+    with pytest.raises(MetadataError):
+        BIDSPath.from_path(image).metadata
+    (inherited_dataset.path / "dataset_description.json").write_text("{}")
+    assert BIDSPath.from_path(image).metadata == {"A": 1, "B": 2, "C": 3, "D": 4}
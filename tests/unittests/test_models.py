@@ -0,0 +1,33 @@
+import pickle
+
+import pytest
+
+
+def test_interned_values():
+    from clinicaio.models.entity import Index, Label, SessionEntity, SubjectEntity
+
+    assert Label("M000") is Label("M000")
+    assert Label("M000") == "M000"
+    assert Index(1, 2) is Index("1", 2)
+    assert SubjectEntity("001") is SubjectEntity("001")
+    assert SubjectEntity("001").value is SessionEntity("001").value
+    assert SubjectEntity("001") is not SessionEntity("001")
+    assert pickle.loads(pickle.dumps(SubjectEntity("001"))) is SubjectEntity("001")
+
+
+def test_interned_values_are_immutable():
+    from clinicaio.models.entity import Label, SubjectEntity
+
+    with pytest.raises(AttributeError):
+        SubjectEntity("001").value = Label("002")
+    with pytest.raises(ValueError):
+        SubjectEntity("0-1")
+
+
+def test_interned_values_check_argument_types():
+    from clinicaio.models.entity import Index
+
+    assert Index(1) is Index("1")
+    # True == 1 but is not a valid index, regardless of the cached instances.
+    with pytest.raises(ValueError):
+        Index(True)
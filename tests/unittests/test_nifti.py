@@ -0,0 +1,173 @@
+import gzip
+import struct
+
+import pytest
+
+
+def make_nifti1(shape, voxel_size, datatype=4, bitpix=16, byteorder="<"):
+    header = bytearray(352)
+    dim = (len(shape), *shape) + (1,) * (7 - len(shape))
+    pixdim = (1.0, *voxel_size) + (1.0,) * (7 - len(voxel_size))
+    struct.pack_into(f"{byteorder}i", header, 0, 348)
+    struct.pack_into(f"{byteorder}8h", header, 40, *dim)
+    struct.pack_into(f"{byteorder}hh", header, 70, datatype, bitpix)
+    struct.pack_into(f"{byteorder}8f", header, 76, *pixdim)
+    struct.pack_into(f"{byteorder}fff", header, 108, 352.0, 1.0, 0.0)
+    header[148:152] = b"test"
+    header[344:348] = b"n+1\0"
+    return bytes(header)
+
+
+def make_nifti2(shape, voxel_size, byteorder=">"):
+    header = bytearray(544)
+    dim = (len(shape), *shape) + (1,) * (7 - len(shape))
+    pixdim = (1.0, *voxel_size) + (1.0,) * (7 - len(voxel_size))
+    struct.pack_into(f"{byteorder}i", header, 0, 540)
+    header[4:12] = b"n+2\0\r\n\x1a\n"
+    struct.pack_into(f"{byteorder}hh8q", header, 12, 16, 32, *dim)
+    struct.pack_into(f"{byteorder}8dq", header, 104, *pixdim, 544)
+    return bytes(header)
+
+
+def test_read_headers(tmp_path):
+    from clinicaio.nifti import read_nifti_header, read_nifti_headers
+
+    nii = tmp_path / "sub-01_T1w.nii"
+    nii.write_bytes(make_nifti1((4, 5, 6), (1.0, 1.5, 2.0)) + bytes(240))
+    header = read_nifti_header(nii)
+    assert header.version == 1
+    assert header.shape == (4, 5, 6)
+    assert header.voxel_size == (1.0, 1.5, 2.0)
+    assert header.dtype == "<i2"
+    assert header.vox_offset == 352
+    assert header.descrip == "test"
+
+    # Only the header of a large compressed image is decompressed.
+    nii_gz = tmp_path / "sub-01_bold.nii.gz"
+    data = make_nifti2((64, 64, 32, 100), (3.0, 3.0, 3.0, 2.0)) + bytes(10**7)
+    nii_gz.write_bytes(gzip.compress(data))
+    header = read_nifti_header(nii_gz)
+    assert (header.version, header.byteorder, header.dtype) == (2, ">", ">f4")
+    assert header.shape == (64, 64, 32, 100)
+    assert header.voxel_size == (3.0, 3.0, 3.0, 2.0)
+
+    headers = read_nifti_headers([nii, nii_gz] * 10, max_workers=4)
+    assert [h.version for h in headers] == [1, 2] * 10
+
+
+def test_errors(tmp_path, bids_dataset):
+    from clinicaio.exception import BIDSPathError
+    from clinicaio.nifti import NiftiError, read_nifti_headers
+
+    # The images of the test dataset are empty.
+    (path,) = bids_dataset.query(sub="003", suffix="T1w", extension=".nii.gz")
+    with pytest.raises(NiftiError):
+        path.read_nifti_header()
+    assert read_nifti_headers([path.path], skip_errors=True) == [None]
+
+    (sidecar,) = bids_dataset.query(sub="003", suffix="T1w", extension=".json")
+    with pytest.raises(BIDSPathError):
+        sidecar.read_nifti_header()
+
+
+def test_memmap(tmp_path):
+    numpy = pytest.importorskip("numpy")
+    from clinicaio.exception import BIDSPathError
+    from clinicaio.subclasses.dataset import BIDSDataset
+
+    anat = tmp_path / "bids" / "sub-01" / "anat"
+    anat.mkdir(parents=True)
+    voxels = numpy.arange(4 * 5 * 6, dtype="<i2").reshape((4, 5, 6), order="F")
+    (anat / "sub-01_T1w.nii").write_bytes(
+        make_nifti1((4, 5, 6), (1.0, 1.0, 1.0)) + voxels.tobytes(order="F")
+    )
+    (anat / "sub-01_T2w.nii.gz").write_bytes(
+        gzip.compress(make_nifti1((4, 5, 6), (1.0, 1.0, 1.0)))
+    )
+    dataset = BIDSDataset.from_path(tmp_path / "bids", is_root=True)
+
+    (t1w,) = dataset.query(suffix="T1w")
+    array = t1w.memmap_nifti()
+    assert isinstance(array, numpy.memmap)
+    assert not array.flags.writeable
+    numpy.testing.assert_array_equal(array[:, 2, :], voxels[:, 2, :])
+
+    (t2w,) = dataset.query(suffix="T2w")
+    with pytest.raises(BIDSPathError):
+        t2w.memmap_nifti()
+
+
+def test_seekable(tmp_path):
+    from clinicaio.seekable import SeekableNifti
+
+    shape = (4, 5, 6, 7)
+    voxels = bytes(i % 251 for i in range(2 * 4 * 5 * 6 * 7))
+    data = make_nifti1(shape, (1.0, 1.0, 1.0, 2.0)) + voxels
+    nii_gz = tmp_path / "sub-01_task-rest_bold.nii.gz"
+    # Use multiple gzip members to check that they are all decompressed.
+    nii_gz.write_bytes(gzip.compress(data[:1000]) + gzip.compress(data[1000:]))
+    index_path = tmp_path / "cache" / "bold.idx"
+    volume_size = 2 * 4 * 5 * 6
+
+    with SeekableNifti(nii_gz, index_path=index_path, chunk_size=100) as image:
+        assert image.n_volumes == 7
+        assert image.read_volume(3) == voxels[3 * volume_size : 4 * volume_size]
+        slab = image.read_slab(2, 4, t=6)
+        start = 6 * volume_size + 2 * 2 * 4 * 5
+        assert slab == voxels[start : start + 2 * 2 * 4 * 5]
+        with pytest.raises(IndexError):
+            image.read_volume(7)
+    mtime_ns = index_path.stat().st_mtime_ns
+
+    # The index is reused until the image changes.
+    with SeekableNifti(nii_gz, index_path=index_path) as image:
+        assert image.read_volume(0) == voxels[:volume_size]
+    assert index_path.stat().st_mtime_ns == mtime_ns
+    nii_gz.write_bytes(gzip.compress(data[:352] + bytes(len(voxels))))
+    with SeekableNifti(nii_gz, index_path=index_path) as image:
+        assert image.read_volume(0) == bytes(volume_size)
+
+    # Uncompressed images are read directly.
+    nii = tmp_path / "sub-01_task-rest_bold.nii"
+    nii.write_bytes(data)
+    with SeekableNifti(nii, index_path=tmp_path / "unused.idx") as image:
+        assert image.read_volume(6) == voxels[6 * volume_size :]
+    assert not (tmp_path / "unused.idx").exists()
+
+
+def test_seekable_concurrent_builds(tmp_path):
+    import concurrent.futures
+    import threading
+
+    from clinicaio.seekable import SeekableNifti
+
+    shape = (4, 5, 6, 7)
+    voxels = bytes(i % 251 for i in range(2 * 4 * 5 * 6 * 7))
+    nii_gz = tmp_path / "sub-01_task-rest_bold.nii.gz"
+    nii_gz.write_bytes(gzip.compress(make_nifti1(shape, (1.0, 1.0, 1.0, 2.0)) + voxels))
+    index_path = tmp_path / "cache" / "bold.idx"
+    barrier = threading.Barrier(4, timeout=10)
+
+    def read(t):
+        barrier.wait()
+        with SeekableNifti(nii_gz, index_path=index_path, chunk_size=100) as image:
+            return image.read_volume(t)
+
+    with concurrent.futures.ThreadPoolExecutor(4) as executor:
+        volumes = list(executor.map(read, range(4)))
+    volume_size = 2 * 4 * 5 * 6
+    assert volumes == [
+        voxels[t * volume_size : (t + 1) * volume_size] for t in range(4)
+    ]
+    assert [path.name for path in index_path.parent.iterdir()] == ["bold.idx"]
+
+
+def test_seekable_bit_depth(tmp_path):
+    from clinicaio.nifti import NiftiError
+    from clinicaio.seekable import SeekableNifti
+
+    nii = tmp_path / "sub-01_mask.nii"
+    nii.write_bytes(make_nifti1((8, 8, 8), (1.0, 1.0, 1.0), datatype=1, bitpix=1))
+    with SeekableNifti(nii, index_path=tmp_path / "mask.idx") as image:
+        with pytest.raises(NiftiError):
+            image.read_volume(0)
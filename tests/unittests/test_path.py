@@ -0,0 +1,96 @@
+import pytest
+
+
+@pytest.mark.parametrize(
+    "name,entities,suffix,extensions",
+    [
+        (
+            "sub-01_ses-M000_run-01_T1w.nii.gz",
+            (("sub", "01"), ("ses", "M000"), ("run", "01")),
+            "T1w",
+            (".nii", ".gz"),
+        ),
+        ("sub-01", (("sub", "01"),), None, ()),
+        (".bidsignore", (), ".bidsignore", ()),
+        ("sub-01_foo_bar.tsv", (("sub", "01"),), "foo_bar", (".tsv",)),
+        ("dataset_description.json", (), "dataset_description", (".json",)),
+    ],
+)
+def test_parse_name(name, entities, suffix, extensions):
+    from clinicaio.path import parse_name
+
+    parsed = parse_name(name)
+    assert parsed.entities == entities
+    assert parsed.suffix == suffix
+    assert parsed.extensions == extensions
+
+
+def test_parse_names_shares_components():
+    from clinicaio.path import intern_extensions, parse_names
+
+    first, second = parse_names(["sub-01_T1w.nii.gz", "sub-02_T2w.nii.gz"])
+    assert first.extensions is second.extensions
+    assert intern_extensions([".nii", ".gz"]) is first.extensions
+    assert first.entities[0][0] is second.entities[0][0]
+
+
+def test_from_path_round_trip(tmp_path):
+    from clinicaio.path import BIDSPath
+
+    path = tmp_path / "sub-01_ses-M000_T1w.nii.gz"
+    bids_path = BIDSPath.from_path(path)
+    assert bids_path.suffix == "T1w"
+    assert bids_path.path == path.resolve()
+
+
+def test_compact_representation(tmp_path):
+    from clinicaio.path import BIDSPath, EntityMap
+
+    first = BIDSPath.from_path("sub-01_ses-M000_T1w.nii.gz", parent=tmp_path)
+    second = BIDSPath.from_path("sub-01_ses-M000_T2w.nii.gz", parent=tmp_path)
+    assert not hasattr(first, "__dict__")
+    assert isinstance(first.entities, EntityMap)
+    assert first.entities == {"sub": "01", "ses": "M000"}
+    assert first.entities.pairs[0] is second.entities.pairs[0]
+    assert first.extensions is second.extensions
+    assert first.get_entity_value("ses") == "M000"
+    assert first.matches_entity_value("sub", 1)
+
+
+def test_validation():
+    from clinicaio.path import BIDSPath
+
+    with pytest.raises(ValueError):
+        BIDSPath.from_path("sub-_T1w.nii")
+    with pytest.raises(ValueError):
+        BIDSPath(extensions=["json"], suffix="T1w")
+    bids_path = BIDSPath(extensions=[".json"], entities={"run": 1}, suffix="T1w")
+    assert bids_path.extensions == (".json",)
+    assert bids_path.path.name == "run-1_T1w.json"
+
+
+def test_cached_paths(bids_dataset, tmp_path):
+    from clinicaio.path import BIDSPath, EntityMap
+
+    subject = bids_dataset.subjects["003"]
+    session = next(subject.get_child_bids_paths())
+    assert session.path is session.path
+    assert str(session.relative_path) == "bids/sub-003/ses-M000"
+    assert session.depth == 2
+    assert session.anchor == bids_dataset.path.parent
+
+    session.entities = {"ses": "M006"}
+    assert isinstance(session.entities, EntityMap)
+    assert session.path.name == "ses-M006"
+    with pytest.raises(ValueError):
+        session.entities = {"ses": "M 006"}
+    with pytest.raises(ValueError):
+        session.extensions = ["json"]
+    subject.suffix = "T1w"
+    assert session.path.parent.name == "sub-003_T1w"
+
+    link = tmp_path / "link"
+    link.symlink_to(bids_dataset.path)
+    assert BIDSPath.from_path(link / "README").path == link / "README"
+    resolved = BIDSPath.from_path(link / "README", resolve=True)
+    assert resolved.path == bids_dataset.path / "README"
@@ -0,0 +1,28 @@
+def test_query(bids_dataset):
+    paths = bids_dataset.query(sub="004", ses="M000", datatype="func", run=1)
+    assert [path.path.name for path in paths] == [
+        "sub-004_ses-M000_task-rest_run-01_bold.json",
+        "sub-004_ses-M000_task-rest_run-01_bold.nii.gz",
+    ]
+    assert [path.suffix for path in paths] == ["bold", "bold"]
+    images = bids_dataset.query(
+        sub="004", ses="M000", suffix="bold", run=1, extension=".nii.gz"
+    )
+    assert [path.path.name for path in images] == [
+        "sub-004_ses-M000_task-rest_run-01_bold.nii.gz"
+    ]
+    jsons = bids_dataset.query(sub=["003", "004"], extension=".json", suffix="T1w")
+    assert len(jsons) == 8
+    assert all(path.suffix == "T1w" for path in jsons)
+    assert bids_dataset.query(sub="999") == []
+    assert bids_dataset.query(trc=None, run=5) == []
+
+
+def test_query_include_dirs(bids_dataset):
+    paths = bids_dataset.query(include_dirs=True, ses="M070")
+    dirs = [path for path in paths if path.is_dir()]
+    assert [str(path.path.relative_to(bids_dataset.path)) for path in dirs] == [
+        "sub-002/ses-M070"
+    ]
+    assert len(paths) > len(bids_dataset.query(ses="M070"))
+    assert bids_dataset.query_index.get_values("ses")[:2] == ["M000", "M017"]
@@ -0,0 +1,60 @@
+import json
+
+import pytest
+
+SCHEMA = {
+    "bids_version": "1.10.0",
+    "schema_version": "1.0.0",
+    "objects": {
+        "entities": {
+            "session": {"name": "ses", "display_name": "Session", "format": "label"},
+            "subject": {"name": "sub", "display_name": "Subject", "format": "label"},
+            "run": {"name": "run", "display_name": "Run", "format": "index"},
+        }
+    },
+    "rules": {"entities": ["subject", "session", "run"]},
+}
+
+
+@pytest.fixture
+def schema_path(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    path = tmp_path / "schema.json"
+    path.write_text(json.dumps(SCHEMA))
+    return path
+
+
+def test_compiled_schema(schema_path, monkeypatch):
+    from clinicaio.schema import SchemaParser
+
+    parser = SchemaParser(schema_path)
+    assert dict(parser.schema) == SCHEMA
+    assert [entity.key for entity in parser.entities] == ["sub", "ses", "run"]
+    assert parser.entities[2].format == "index"
+    assert parser.get_compiled_schema_path().is_file()
+
+    # Other instances use the compiled schema without parsing the JSON file.
+    def fail(_self):
+        raise AssertionError("The JSON schema was parsed again.")
+
+    monkeypatch.setattr(SchemaParser, "load_json", fail)
+    schema = SchemaParser(schema_path).schema
+    assert schema["schema_version"] == "1.0.0"
+    assert not schema._sections
+    assert schema["rules"] == SCHEMA["rules"]
+    assert list(schema._sections) == ["rules"]
+
+
+def test_compiled_schema_is_refreshed(schema_path):
+    from clinicaio.schema import SchemaParser
+
+    assert SchemaParser(schema_path).schema["bids_version"] == "1.10.0"
+    schema_path.write_text(json.dumps({**SCHEMA, "bids_version": "1.11.10"}))
+    assert SchemaParser(schema_path).schema["bids_version"] == "1.11.10"
+
+
+def test_missing_schema(tmp_path):
+    from clinicaio.schema import SchemaError, SchemaParser
+
+    with pytest.raises(SchemaError):
+        SchemaParser(tmp_path / "missing.json").schema
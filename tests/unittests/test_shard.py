@@ -0,0 +1,47 @@
+import pytest
+
+
+def test_assign_shards():
+    from clinicaio.shard import assign_shards
+
+    assert assign_shards([1] * 5, 2) == [0, 1, 0, 1, 0]
+    assert assign_shards([1, 10, 3, 6], 2) == [1, 0, 1, 1]
+
+
+@pytest.mark.parametrize("balance", ["count", "files", "bytes"])
+@pytest.mark.parametrize("split_sessions", [False, True])
+def test_shards_cover_dataset(bids_dataset, tmp_path, balance, split_sessions):
+    if balance != "count":
+        # Only the index gives file and byte weights without a full scan.
+        with pytest.raises(ValueError):
+            bids_dataset.shard(0, 3, balance=balance)
+        bids_dataset.use_index(tmp_path / "index.sqlite")
+    shards = [
+        bids_dataset.shard(rank, 3, balance=balance, split_sessions=split_sessions)
+        for rank in range(3)
+    ]
+    units = [repr(unit) for shard in shards for unit in shard]
+    expected = bids_dataset.get_shard_units(split_sessions=split_sessions)
+    assert sorted(units) == sorted(repr(unit) for unit in expected)
+    if not split_sessions:
+        assert all(unit.prime_entity == "sub" for shard in shards for unit in shard)
+    if bids_dataset.index is not None:
+        bids_dataset.index.close()
+
+
+def test_file_weights(bids_dataset, tmp_path):
+    from clinicaio.shard import get_unit_weights
+
+    subjects = bids_dataset.get_shard_units()
+    bids_dataset.use_index(tmp_path / "index.sqlite")
+    weights = get_unit_weights(subjects, "files", index=bids_dataset.index)
+    assert weights == [
+        sum(1 for path in subject.path.rglob("*") if path.is_file())
+        for subject in subjects
+    ]
+    bids_dataset.index.close()
+
+
+def test_invalid_rank(bids_dataset):
+    with pytest.raises(ValueError):
+        bids_dataset.shard(2, 2)
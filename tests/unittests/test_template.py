@@ -0,0 +1,55 @@
+import pytest
+
+
+def test_render_and_parse():
+    from clinicaio.models.template import PathTemplate
+
+    template = PathTemplate(["sub", "ses", "trc"], "pet", "pet", ".nii.gz")
+    columns = {"sub": ["001", "002"], "ses": ["M000", "M006"], "trc": ["18FFDG"] * 2}
+    paths = template.render(columns)
+    assert paths == [
+        "sub-001/ses-M000/pet/sub-001_ses-M000_trc-18FFDG_pet.nii.gz",
+        "sub-002/ses-M006/pet/sub-002_ses-M006_trc-18FFDG_pet.nii.gz",
+    ]
+    assert template.parse(paths) == columns
+    assert template.parse(template.render_paths(columns, root="/caps")) == columns
+
+    mismatched = ["sub-001/ses-M006/pet/sub-001_ses-M000_trc-18FFDG_pet.nii.gz"]
+    with pytest.raises(ValueError):
+        template.parse(mismatched)
+    assert template.parse(mismatched, strict=False) == {key: [] for key in columns}
+    with pytest.raises(ValueError):
+        template.render({**columns, "trc": ["18F_FDG"] * 2})
+    with pytest.raises(ValueError):
+        template.render({**columns, "trc": ["18FFDG"]})
+
+
+def test_get_image():
+    from clinicaio.models.entity import (
+        BIDSPath,
+        SessionEntity,
+        SubjectEntity,
+        SuffixEntity,
+        SUVREntity,
+        TracerEntity,
+    )
+    from clinicaio.models.enum import Extension
+
+    bids_path = BIDSPath(
+        SubjectEntity("001"),
+        SessionEntity("M000"),
+        "pet",
+        [TracerEntity("18FFDG"), SUVREntity("pons")],
+        SuffixEntity("pet"),
+        Extension.NIFTI_GZ,
+    )
+    image = bids_path.get_image()
+    assert image.as_posix() == (
+        "sub-001/ses-M000/pet/sub-001_ses-M000_trc-18FFDG_suvr-pons_pet.nii.gz"
+    )
+    assert bids_path.get_template().parse([image]) == {
+        "sub": ["001"],
+        "ses": ["M000"],
+        "trc": ["18FFDG"],
+        "suvr": ["pons"],
+    }
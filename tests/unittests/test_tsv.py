@@ -0,0 +1,46 @@
+def test_read_participants(bids_dataset):
+    rows = list(bids_dataset.read_participants_tsv())
+    assert [row["participant_id"] for row in rows] == [
+        "sub-001",
+        "sub-002",
+        "sub-003",
+        "sub-004",
+    ]
+    # Values are not guessed per cell, so a column never mixes types.
+    assert [row["age"] for row in rows] == ["20", "30", "40,9", "50,3"]
+    assert rows[3]["handedness"] == "right"
+
+
+def test_read_tsv_types(tmp_path):
+    from clinicaio.tsv import read_tsv
+
+    path = tmp_path / "sub-01_sessions.tsv"
+    path.write_text(
+        "session_id\tage\tscore\tsite\t\nses-01\t70\t1.5\t001\nses-02\tn/a\t1_000\n"
+    )
+    rows = list(read_tsv(path, dtypes={"age": int}))
+    assert rows == [
+        {"session_id": "ses-01", "age": 70, "score": "1.5", "site": "001"},
+        {"session_id": "ses-02", "age": None, "score": "1_000", "site": None},
+    ]
+
+
+def test_subject_and_session_tables(bids_dataset):
+    from clinicaio.subclasses.session import BIDSSession
+
+    subject = bids_dataset.get_subject("003")
+    assert [row["session_id"] for row in subject.read_sessions_tsv()] == ["ses-M000"]
+    session = subject.get_session("M000")
+    assert isinstance(session, BIDSSession)
+    scans = list(session.read_scans_tsv())
+    assert len(scans) == 7
+    assert scans[0]["number_of_parts"] == "2.0"
+
+
+def test_bulk_tables(bids_dataset):
+    sessions = bids_dataset.load_sessions_tables(max_workers=4)
+    assert ("004", "M017") in sessions.keys
+    assert [row["session_id"] for row in sessions.get_rows(sub="003")] == ["ses-M000"]
+    scans = bids_dataset.load_scans_tables(max_workers=4)
+    assert len(scans.get_rows("003", "M000")) == 7
+    assert len(scans.columns["modality"]) == len(scans)
@@ -0,0 +1,103 @@
+import os
+import shutil
+
+import pytest
+
+
+@pytest.fixture
+def failing_check(monkeypatch):
+    from clinicaio.exception import BIDSPathError
+    from clinicaio.path import BIDSPath
+
+    checked = []
+
+    def check(self):
+        checked.append(self.path)
+        if self.suffix == "T1w":
+            raise BIDSPathError(f"Invalid T1w image: {self.path.name}")
+
+    monkeypatch.setattr(BIDSPath, "check", check)
+    return checked
+
+
+@pytest.mark.parametrize("max_workers", [1, 4])
+def test_validate_collects_violations(bids_dataset, failing_check, max_workers):
+    from clinicaio.validation import ValidationError
+
+    report = bids_dataset.validate(max_workers=max_workers)
+    expected = [path.path for path in bids_dataset.query(suffix="T1w")]
+    assert [violation.path for violation in report.violations] == expected
+    assert all(v.error_type == "BIDSPathError" for v in report.violations)
+    assert report.n_paths == report.n_checked == len(failing_check)
+    assert not report.is_valid
+
+    with pytest.raises(ValidationError) as info:
+        bids_dataset.check()
+    assert info.value.report.violations == report.violations
+
+
+def test_validate_reports_malformed_names(bids_dataset_path, tmp_path):
+    from clinicaio.subclasses.dataset import BIDSDataset
+    from clinicaio.validation import ValidationError
+
+    dataset_path = tmp_path / "bids"
+    shutil.copytree(bids_dataset_path, dataset_path)
+    malformed = (
+        dataset_path / "sub-001" / "ses-M156" / "anat" / "sub-001_sub-002_T1w.nii"
+    )
+    malformed.touch()
+    dataset = BIDSDataset.from_path(dataset_path, is_root=True)
+    report = dataset.validate()
+    assert (malformed, "ValueError", "Entity keys must be unique.") in report.violations
+    # The dataset itself is counted and the malformed name is not.
+    n_paths = sum(len(dirs) + len(files) for _, dirs, files in os.walk(dataset_path))
+    assert report.n_paths == n_paths
+
+    with pytest.raises(ValidationError) as info:
+        dataset.check()
+    assert info.value.report.violations == report.violations
+
+
+def test_validate_cache(bids_dataset_path, tmp_path, failing_check):
+    from clinicaio.subclasses.dataset import BIDSDataset
+    from clinicaio.validation import ValidationCache
+
+    dataset_path = tmp_path / "bids"
+    shutil.copytree(bids_dataset_path, dataset_path)
+    dataset = BIDSDataset.from_path(dataset_path, is_root=True)
+    with ValidationCache(tmp_path / "validation.sqlite") as cache:
+        first = dataset.validate(cache=cache)
+        assert first.n_checked == first.n_paths
+
+        failing_check.clear()
+        second = dataset.validate(cache=cache)
+        assert second == first._replace(n_checked=0)
+        assert not failing_check
+
+        # Only the paths of the directory of a modified file, whose checks may
+        # depend on it, are checked again.
+        modified = dataset.query(suffix="T1w")[0].path
+        stat = modified.stat()
+        os.utime(modified, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        failing_check.clear()
+        third = dataset.validate(cache=cache)
+        anat = modified.parent
+        assert failing_check == [anat, *sorted(anat.iterdir())]
+        assert third == first._replace(n_checked=len(failing_check))
+
+        # Removing a file invalidates the paths below its directory and removes
+        # its cached result.
+        removed = dataset.path / "sub-001" / "sub-001_sessions.tsv"
+        removed.unlink()
+        dataset.refresh()
+        failing_check.clear()
+        fourth = dataset.validate(cache=cache)
+        assert all(path.is_relative_to(removed.parent) for path in failing_check)
+        assert fourth.n_checked == len(failing_check) > 1
+        assert str(removed) not in cache.load(dataset.path)
+
+
+def test_check_valid_dataset(bids_dataset):
+    report = bids_dataset.validate()
+    assert report.is_valid
+    bids_dataset.check()
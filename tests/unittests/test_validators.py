@@ -0,0 +1,89 @@
+import pytest
+
+SCHEMA = {
+    "objects": {
+        "entities": {
+            "subject": {"name": "sub", "format": "label"},
+            "session": {"name": "ses", "format": "label"},
+            "tracer": {"name": "trc", "format": "label"},
+            "run": {"name": "run", "format": "index"},
+        },
+        "formats": {"label": {"pattern": "[0-9a-zA-Z]+"}},
+    },
+    "rules": {
+        "entities": ["subject", "session", "tracer", "run"],
+        "files": {
+            "raw": {
+                "anat": {
+                    "nonparametric": {
+                        "suffixes": ["T1w", "T2w"],
+                        "extensions": [".nii.gz", ".nii", ".json"],
+                        "datatypes": ["anat"],
+                        "entities": {
+                            "subject": "required",
+                            "session": "optional",
+                            "run": "optional",
+                        },
+                    }
+                },
+                "pet": {
+                    "pet": {
+                        "suffixes": ["pet"],
+                        "extensions": [".nii.gz", ".json"],
+                        "datatypes": ["pet"],
+                        "entities": {
+                            "subject": "required",
+                            "session": "optional",
+                            "tracer": {"level": "optional"},
+                        },
+                    }
+                },
+            }
+        },
+    },
+}
+
+
+@pytest.mark.parametrize(
+    "name,datatype,n_errors",
+    [
+        ("sub-001_ses-M000_T1w.nii.gz", "anat", 0),
+        ("sub-001_run-01_T2w.json", None, 0),
+        ("sub-001_ses-M000_trc-18FFDG_pet.nii.gz", "pet", 0),
+        ("ses-M000_sub-001_T1w.nii.gz", "anat", 1),
+        ("sub-00_1_T1w.nii.gz", "anat", 1),
+        ("sub-001_run-a_T1w.nii.gz", "anat", 1),
+        ("sub-001_foo-bar_T1w.nii.gz", "anat", 1),
+        ("sub-001_T1w.tsv", "anat", 1),
+        ("sub-001_trc-18FFDG_T1w.nii.gz", "anat", 1),
+        ("ses-M000_T1w.nii.gz", "anat", 1),
+        ("sub-001_pet.nii.gz", "anat", 1),
+        ("sub-001_T1w.nii.gz", "func", 1),
+    ],
+)
+def test_check_name(name, datatype, n_errors):
+    from clinicaio.validators import FilenameValidator
+
+    validator = FilenameValidator(SCHEMA)
+    errors = validator.check_name(name, datatype=datatype)
+    assert len(errors) == n_errors, errors
+
+
+def test_check_bids_path(bids_dataset):
+    from clinicaio.validators import FilenameValidator
+
+    validator = FilenameValidator(SCHEMA)
+    for bids_path in bids_dataset.query(suffix="T1w", extension=".nii.gz"):
+        assert validator.check_bids_path(bids_path) == []
+
+
+def test_label_and_index():
+    from clinicaio.models.entity import Index, Label
+
+    assert str(Label("M000")) == "M000"
+    assert str(Index(3, 2)) == "03"
+    for value in ("a-b", "", "é"):
+        with pytest.raises(ValueError):
+            Label(value)
+    with pytest.raises(ValueError):
+        Index(-1)